@@ -166,6 +166,7 @@ from sqlalchemy import text
 from dotenv import load_dotenv
 import os
 from backend.app.core.database import get_db
+from backend.app.utils import site_rollup
 
 # SDK IMPORTS
 from google import genai 
@@ -227,18 +228,10 @@ class SiteRequest(BaseModel):
 @router.post("/agent/analyze-site")
 def analyze_site_risk(req: SiteRequest, db: Session = Depends(get_db)):
     try:
-        # Metrics
-        mp_sql = text("SELECT COUNT(*) FROM raw_missing_pages WHERE site_id = :site AND study_name = :study")
-        missing = db.execute(mp_sql, {"site": req.site_id, "study": req.study_name}).scalar() or 0
-        
-        # Inactivated (Join needed for study filter usually, but simplistic here)
-        # Better query: JOIN subjects to ensure study match if site_ids are not unique across studies
-        inactive_sql = text("""
-            SELECT COUNT(*) FROM raw_inactivated_forms f
-            JOIN subjects s ON f.subject_id = s.subject_id
-            WHERE s.site_id = :site AND s.study_name = :study
-        """)
-        inactive = db.execute(inactive_sql, {"site": req.site_id, "study": req.study_name}).scalar() or 0
+        # Metrics (precomputed per site in site_rollup, study-scoped via subjects)
+        rollup = site_rollup.get_site(db, req.study_name, req.site_id)
+        missing = rollup["missing_pages"] if rollup else 0
+        inactive = rollup["inactivated_forms"] if rollup else 0
 
         prompt = f"""
         Analyze Site {req.site_id} ({req.study_name}).
@@ -278,19 +271,22 @@ def cluster_queries(study: str, db: Session = Depends(get_db)):
     Groups lab issues by Test Name for the specific study.
     Fixed to JOIN subjects table to filter by study_name.
     """
+    return compute_query_clusters(db, study)
+
+CLUSTER_SQL = """
+    SELECT l.site_id, l.lab_category, l.test_name, COUNT(*) as count 
+    FROM raw_lab_issues l
+    JOIN subjects s ON l.subject_id = s.subject_id
+    WHERE s.study_name = :study
+    GROUP BY l.site_id, l.lab_category, l.test_name
+    HAVING COUNT(*) > 1
+    ORDER BY count DESC
+    LIMIT 10
+"""
+
+def compute_query_clusters(db: Session, study: str) -> list:
     try:
-        sql = text("""
-            SELECT l.site_id, l.lab_category, l.test_name, COUNT(*) as count 
-            FROM raw_lab_issues l
-            JOIN subjects s ON l.subject_id = s.subject_id
-            WHERE s.study_name = :study
-            GROUP BY l.site_id, l.lab_category, l.test_name
-            HAVING COUNT(*) > 1
-            ORDER BY count DESC
-            LIMIT 10
-        """)
-        
-        rows = db.execute(sql, {"study": study}).fetchall()
+        rows = db.execute(text(CLUSTER_SQL), {"study": study}).fetchall()
         
         clusters = []
         for r in rows:
@@ -307,4 +303,5 @@ def cluster_queries(study: str, db: Session = Depends(get_db)):
         return clusters
     except Exception as e:
         print(f"Cluster Error: {e}")
-        return []
\ No newline at end of file
+        db.rollback()  # keep the session usable for whatever runs next on it (see /analytics/bundle)
+        return []
@@ -1,9 +1,17 @@
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request, Response, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from backend.app.core.database import get_db
+from backend.app.core.database import get_db, SessionLocal, idle_connections
+from backend.app.core.config import ANALYTICS_BUNDLE_WORKERS
+from backend.app.utils.helpers import date_window
+from backend.app.utils import dqi, response_cache, subject_analytics, site_rollup
+from backend.app.api import sentinel, agent
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+import threading
 import datetime
+import contextvars
 
 router = APIRouter()
 
@@ -45,96 +53,80 @@ def get_ai_governance_logs():
         }
     }
 
+def _site_scores(db: Session, study: str, date_from=None, date_to=None) -> list:
+    """ Per-site DQI: from site_rollup, or computed live when a date window is requested """
+    if date_from is None and date_to is None:
+        return site_rollup.site_scores(db, study)
+    return dqi.site_scores(db, study, date_from, date_to)
+
 @router.get("/analytics/dashboard-metrics")
-def get_dashboard_metrics(study: str = "Study 1", db: Session = Depends(get_db)):
+def get_dashboard_metrics(request: Request, response: Response, study: str = "Study 1",
+                          date_from: Optional[datetime.date] = None, date_to: Optional[datetime.date] = None,
+                          db: Session = Depends(get_db)):
+    """ Cached per study data version (ETag / 304 between ingests); see compute_dashboard_metrics """
+    return response_cache.serve(
+        request, response, db, "dashboard-metrics", {"study": study, "date_from": date_from, "date_to": date_to},
+        lambda: compute_dashboard_metrics(db, study, date_from, date_to), study=study
+    )
+
+# Endpoint SQL lives in module constants so core/explain_check.py EXPLAINs exactly what runs;
+# {window} is a date_window() filter (empty when no window is requested)
+SUBJECT_COUNT_SQL = "SELECT COUNT(*) FROM subjects WHERE study_name = :study"
+MISSING_COUNT_SQL = "SELECT COUNT(*) FROM raw_missing_pages mp WHERE study_name = :study{window}"
+DEVIATION_COUNT_SQL = "SELECT COUNT(*) FROM raw_protocol_deviations pd WHERE study_name = :study{window}"
+# Sites through the subject's current site, like dqi.build_sql and site_rollup
+MISSING_BY_SITE_SQL = f"""
+    SELECT COALESCE(s.site_id, '{dqi.UNKNOWN_SITE}') AS site_id, COUNT(*) as c
+    FROM raw_missing_pages mp
+    JOIN subjects s ON s.subject_id = mp.subject_id AND s.study_name = :study
+    WHERE mp.study_name = :study{{window}}
+    GROUP BY COALESCE(s.site_id, '{dqi.UNKNOWN_SITE}') ORDER BY c DESC LIMIT 5
+"""
+
+def compute_dashboard_metrics(db: Session, study: str, date_from: datetime.date = None,
+                              date_to: datetime.date = None) -> dict:
     """
     ENTERPRISE DQI ENGINE (Compatible Format):
     Calculates the Weighted Data Quality Index (0-100) but returns the JSON 
     structure your Frontend already expects.
+    date_from / date_to (optional, inclusive) restrict visits, missing pages and
+    deviations to that window (index range scans on the native DATE columns).
     """
+    mp_window, window = date_window("mp.visit_date", date_from, date_to)
+    pd_window, _ = date_window("pd.visit_date", date_from, date_to)
+    params = {"study": study, **window}
     
     # --- 1. ROBUST COUNTS (Direct Queries) ---
     try:
         # Total Subjects
-        sql_sub = text("SELECT COUNT(*) FROM subjects WHERE study_name = :study")
-        total_subjects = db.execute(sql_sub, {"study": study}).scalar() or 0
+        total_subjects = db.execute(text(SUBJECT_COUNT_SQL), {"study": study}).scalar() or 0
         
         # Missing Pages
-        sql_mp = text("SELECT COUNT(*) FROM raw_missing_pages WHERE study_name = :study")
-        total_missing = db.execute(sql_mp, {"study": study}).scalar() or 0
+        total_missing = db.execute(text(MISSING_COUNT_SQL.format(window=mp_window)), params).scalar() or 0
         
         # Protocol Deviations
-        sql_pd = text("SELECT COUNT(*) FROM raw_protocol_deviations WHERE study_name = :study")
-        total_pds = db.execute(sql_pd, {"study": study}).scalar() or 0
+        total_pds = db.execute(text(DEVIATION_COUNT_SQL.format(window=pd_window)), params).scalar() or 0
         
     except Exception as e:
         print(f"⚠️ Basic Count Error: {e}")
+        response_cache.mark_degraded(f"dashboard counts: {e}")
         total_subjects, total_missing, total_pds = 0, 0, 0
 
     # --- 2. DQI AGGREGATION (The Smart Math) ---
     # We use this to replace the simple "Clean Patient Rate" with the advanced "DQI Score"
-    dqi_sql = text("""
-    WITH SiteMetrics AS (
-        SELECT 
-            s.site_id,
-            
-            -- 1. VISIT SCORE (30%)
-            COALESCE(
-                CAST(SUM(CASE WHEN vp.days_outstanding <= 0 THEN 1 ELSE 0 END) AS FLOAT) / 
-                NULLIF(COUNT(vp.id), 0) * 100, 
-            100) as visit_score,
-
-            -- 2. QUERY SCORE (30%)
-            GREATEST(0, 100 - (
-                (SELECT COUNT(*) FROM raw_protocol_deviations pd 
-                 WHERE pd.site_id = s.site_id AND pd.study_name = :study) * 5
-            )) as query_score,
-
-            -- 3. SAFETY SCORE (25%)
-            GREATEST(0, 100 - (
-                (SELECT COUNT(*) FROM raw_sae_safety sae 
-                 WHERE sae.site_id = s.site_id AND sae.case_status = 'Open') * 20
-            )) as safety_score,
-
-            -- 4. CODING SCORE (15%)
-            COALESCE(
-                (SELECT CAST(SUM(CASE WHEN cm.coding_status = 'Coded' THEN 1 ELSE 0 END) AS FLOAT) / 
-                 NULLIF(COUNT(*), 0) * 100
-                 FROM raw_coding_meddra cm
-                 JOIN subjects sub ON cm.subject_id = sub.subject_id
-                 WHERE sub.site_id = s.site_id),
-            100) as coding_score
-
-        FROM subjects s
-        LEFT JOIN raw_visit_projections vp ON s.subject_id = vp.subject_id
-        WHERE s.study_name = :study
-        GROUP BY s.site_id
-    )
-    SELECT 
-        site_id,
-        ROUND(
-            (visit_score * 0.30) + 
-            (query_score * 0.30) + 
-            (safety_score * 0.25) + 
-            (coding_score * 0.15)
-        ) as final_dqi
-    FROM SiteMetrics
-    ORDER BY final_dqi ASC
-    """)
-
+    # (precomputed per site in site_rollup; computed live only for a date window)
     try:
-        results = db.execute(dqi_sql, {"study": study}).fetchall()
+        results = _site_scores(db, study, date_from, date_to)
         
         risky_sites = []
         dqi_values = []
         
         for row in results:
-            site_id = row[0]
-            dqi = row[1] or 100
-            dqi_values.append(dqi)
+            site_id = row["site_id"]
+            dqi_values.append(row["dqi"])
             
             # Risk is the inverse of Quality (100 - DQI)
-            risk_score = 100 - dqi
+            risk_score = 100 - row["dqi"]
             if risk_score > 0:
                 risky_sites.append({"site": site_id, "issues": risk_score}) # Mapped to 'issues' for frontend
         
@@ -146,15 +138,17 @@ def get_dashboard_metrics(study: str = "Study 1", db: Session = Depends(get_db))
 
     except Exception as e:
         print(f"⚠️ DQI Logic Error: {e}")
+        response_cache.mark_degraded(f"dashboard DQI: {e}")
+        db.rollback()  # Failed statement aborts the transaction; the fallback needs a fresh one
         avg_dqi = 100
         risky_sites = []
         
         # Fallback Risk Chart
         try:
-             fallback_risk = db.execute(text("""
-                SELECT site_id, COUNT(*) as c FROM raw_missing_pages 
-                WHERE study_name = :study GROUP BY site_id ORDER BY c DESC LIMIT 5
-             """), {"study": study}).fetchall()
+             if mp_window:
+                 fallback_risk = db.execute(text(MISSING_BY_SITE_SQL.format(window=mp_window)), params).fetchall()
+             else:
+                 fallback_risk = site_rollup.sites_over(db, study, "missing_pages", 0)[:5]
              risky_sites = [{"site": r[0], "issues": r[1]} for r in fallback_risk]
         except: pass
 
@@ -172,39 +166,83 @@ def get_dashboard_metrics(study: str = "Study 1", db: Session = Depends(get_db))
         "top_risky_sites": risky_sites
     }
 
+@router.get("/analytics/dqi-breakdown")
+def get_dqi_breakdown(request: Request, response: Response, study: str, date_from: Optional[datetime.date] = None,
+                      date_to: Optional[datetime.date] = None, db: Session = Depends(get_db)):
+    """
+    Per-site DQI with its four component scores (visit, query, safety, coding)
+    and the counts behind them, lowest DQI first. Same single pass as the dashboard.
+    """
+    return response_cache.serve(
+        request, response, db, "dqi-breakdown", {"study": study, "date_from": date_from, "date_to": date_to},
+        lambda: {
+            "study_name": study,
+            "weights": {name: round(weight, 4) for name, weight in dqi.DQI_WEIGHTS.items()},
+            "sites": _site_scores(db, study, date_from, date_to)
+        },
+        study=study
+    )
+
 # --- KEEP EXISTING ENDPOINTS ---
+SITE_DETAILS_SQL = """
+    SELECT 
+        s.subject_id,
+        s.status,
+        sa.missing_pages,
+        sa.protocol_deviations,
+        sa.is_clean_patient,
+        sa.risk_score,
+        sa.last_calculated >= CURRENT_DATE AS current
+    FROM subjects s
+    LEFT JOIN subject_analytics sa ON sa.subject_id = s.subject_id
+    WHERE s.study_name = :study AND s.site_id = :site_id
+"""
+
 @router.get("/analytics/site-details")
 def get_site_details(study: str, site_id: str, db: Session = Depends(get_db)):
-    sql = text("""
-        SELECT 
-            s.subject_id,
-            s.status,
-            (SELECT COUNT(*) FROM raw_missing_pages mp WHERE mp.subject_id = s.subject_id AND mp.study_name = :study) as missing,
-            (SELECT COUNT(*) FROM raw_protocol_deviations pd WHERE pd.subject_id = s.subject_id AND pd.study_name = :study) as deviations
-        FROM subjects s
-        WHERE s.study_name = :study AND s.site_id = :site_id
-    """)
+    """ Per-subject counts from the precomputed subject_analytics rows (see utils/subject_analytics.py) """
     try:
-        results = db.execute(sql, {"study": study, "site_id": site_id}).fetchall()
-        subjects = [{
-            "subject_id": row[0],
-            "status": row[1] or "Active",
-            "missing_pages": row[2],
-            "deviations": row[3],
-            "is_clean": (row[2] == 0 and row[3] == 0)
-        } for row in results]
+        results = db.execute(text(SITE_DETAILS_SQL), {"study": study, "site_id": site_id}).fetchall()
+        # Subjects without a row (loaded before the analytics step existed) or with one from an
+        # earlier day (risk counts overdue visits): computed live, a GET never writes
+        live = subject_analytics.compute_subjects(db, [row[0] for row in results if not row[6]])
+
+        subjects = []
+        for row in results:
+            counts = live.get(row[0])
+            missing, deviations, is_clean, risk = (
+                (counts["missing_pages"], counts["protocol_deviations"], counts["is_clean_patient"], counts["risk_score"])
+                if counts is not None else row[2:6]
+            )
+            subjects.append({
+                "subject_id": row[0],
+                "status": row[1] or "Active",
+                "missing_pages": missing or 0,
+                "deviations": deviations or 0,
+                "is_clean": bool(is_clean),
+                "risk_score": risk or 0
+            })
         return {"site_id": site_id, "subjects": subjects}
     except:
         return {"site_id": site_id, "subjects": []}
 
 @router.get("/analytics/sites-list")
-def get_sites_list(study: str, db: Session = Depends(get_db)):
-    sql = text("SELECT DISTINCT site_id FROM subjects WHERE study_name = :study ORDER BY site_id")
-    results = db.execute(sql, {"study": study}).fetchall()
+def get_sites_list(request: Request, response: Response, study: str, db: Session = Depends(get_db)):
+    return response_cache.serve(request, response, db, "sites-list", {"study": study},
+                                lambda: list_sites(db, study), study=study)
+
+SITES_LIST_SQL = "SELECT DISTINCT site_id FROM subjects WHERE study_name = :study ORDER BY site_id"
+
+def list_sites(db: Session, study: str) -> list:
+    results = db.execute(text(SITES_LIST_SQL), {"study": study}).fetchall()
     return [row[0] for row in results if row[0]]
 
 @router.get("/analytics/study-list")
-def get_study_list(db: Session = Depends(get_db)):
+def get_study_list(request: Request, response: Response, db: Session = Depends(get_db)):
+    # Any study's ingest can add a study: keyed on the combined version of all studies
+    return response_cache.serve(request, response, db, "study-list", {}, lambda: list_studies(db))
+
+def list_studies(db: Session) -> list:
     sql = text("SELECT DISTINCT study_name FROM subjects ORDER BY study_name")
     results = db.execute(sql).fetchall()
     return [row[0] for row in results if row[0]]
@@ -212,49 +250,96 @@ def get_study_list(db: Session = Depends(get_db)):
 
 # backend/app/api/analytics.py (Add to bottom)
 
+SUBJECT_SQL = "SELECT site_id, status FROM subjects WHERE subject_id = :sid AND study_name = :study"
+SUBJECT_ANALYTICS_SQL = """
+    SELECT missing_pages, protocol_deviations, saes, open_saes, overdue_visits,
+           is_clean_patient, risk_score, total_open_issues, last_calculated,
+           last_calculated >= CURRENT_DATE AS current
+    FROM subject_analytics WHERE subject_id = :sid
+"""
+SUBJECT_MISSING_SQL = """
+    SELECT form_name, visit_date, days_missing FROM raw_missing_pages
+    WHERE subject_id = :sid AND study_name = :study{window}
+    ORDER BY visit_date NULLS LAST
+"""
+SUBJECT_DEVIATIONS_SQL = """
+    SELECT category, pd_status, visit_date FROM raw_protocol_deviations
+    WHERE subject_id = :sid AND study_name = :study{window}
+    ORDER BY visit_date NULLS LAST
+"""
+SUBJECT_TIMELINE_SQL = """
+    SELECT visit_name, projected_date,
+           COALESCE(CURRENT_DATE - projected_date, days_outstanding) AS overdue_by,
+           projected_date_raw
+    FROM raw_visit_projections
+    WHERE subject_id = :sid AND study_name = :study{window}
+    ORDER BY projected_date NULLS LAST
+"""
+SUBJECT_SAES_SQL = "SELECT case_status, review_status FROM raw_sae_safety WHERE subject_id = :sid"
+
 @router.get("/analytics/subject-details")
-def get_subject_details(study: str, subject_id: str, db: Session = Depends(get_db)):
+def get_subject_details(study: str, subject_id: str, date_from: Optional[datetime.date] = None,
+                        date_to: Optional[datetime.date] = None, db: Session = Depends(get_db)):
     """
     PATIENT 360 API:
     Aggregates all clinical data for a single subject into one view.
+    Optional date_from / date_to limit the lists to visits in that window.
     """
+    visit_window, window = date_window("visit_date", date_from, date_to)
+    projected_window, _ = date_window("projected_date", date_from, date_to)
+    params = {"sid": subject_id, "study": study, **window}
     # 1. Subject Demographics (Mocked from Subject ID structure usually)
     # In a real DB, this comes from a 'Demographics' form.
-    sub_sql = text("SELECT site_id, status FROM subjects WHERE subject_id = :sid AND study_name = :study")
-    sub_row = db.execute(sub_sql, {"sid": subject_id, "study": study}).fetchone()
+    sub_row = db.execute(text(SUBJECT_SQL), {"sid": subject_id, "study": study}).fetchone()
     
     if not sub_row:
         return {"error": "Subject not found"}
 
+    # Precomputed whole-subject counts (refreshed after each ingest touching this subject);
+    # a subject without a row, or with one from an earlier day (overdue visits follow the
+    # calendar), is computed live, the GET never writes
+    sa_row = None
+    if not window:
+        sa_row = db.execute(text(SUBJECT_ANALYTICS_SQL), {"sid": subject_id}).mappings().fetchone()
+        if sa_row is None or not sa_row["current"]:
+            sa_row = subject_analytics.compute_subjects(db, [subject_id]).get(subject_id)
+
     # 2. Missing Pages List
-    mp_sql = text("SELECT form_name, visit_date, days_missing FROM raw_missing_pages WHERE subject_id = :sid AND study_name = :study")
-    missing_pages = db.execute(mp_sql, {"sid": subject_id, "study": study}).fetchall()
+    missing_pages = db.execute(text(SUBJECT_MISSING_SQL.format(window=visit_window)), params).fetchall()
     
     # 3. Protocol Deviations
-    pd_sql = text("SELECT category, pd_status, visit_date FROM raw_protocol_deviations WHERE subject_id = :sid AND study_name = :study")
-    deviations = db.execute(pd_sql, {"sid": subject_id, "study": study}).fetchall()
+    deviations = db.execute(text(SUBJECT_DEVIATIONS_SQL.format(window=visit_window)), params).fetchall()
 
-    # 4. Visit Projections (Timeline)
-    vp_sql = text("SELECT visit_name, projected_date, days_outstanding FROM raw_visit_projections WHERE subject_id = :sid AND study_name = :study ORDER BY projected_date")
-    timeline = db.execute(vp_sql, {"sid": subject_id, "study": study}).fetchall()
+    # 4. Visit Projections (Timeline) - chronological, overdue days as of today
+    timeline = db.execute(text(SUBJECT_TIMELINE_SQL.format(window=projected_window)), params).fetchall()
 
     # 5. Safety / SAEs
-    sae_sql = text("SELECT case_status, review_status FROM raw_sae_safety WHERE subject_id = :sid")
-    saes = db.execute(sae_sql, {"sid": subject_id}).fetchall()
+    saes = db.execute(text(SUBJECT_SAES_SQL), {"sid": subject_id}).fetchall()
 
     return {
         "subject_id": subject_id,
         "site_id": sub_row[0],
         "status": sub_row[1],
+        # Counts of the lists below when a date window is applied, else the precomputed totals
         "metrics": {
             "missing_count": len(missing_pages),
             "deviation_count": len(deviations),
             "sae_count": len(saes)
+        } if sa_row is None else {
+            "missing_count": sa_row["missing_pages"],
+            "deviation_count": sa_row["protocol_deviations"],
+            "sae_count": sa_row["saes"],
+            "open_sae_count": sa_row["open_saes"],
+            "overdue_visits": sa_row["overdue_visits"],
+            "is_clean": sa_row["is_clean_patient"],
+            "risk_score": sa_row["risk_score"],
+            "total_open_issues": sa_row["total_open_issues"],
+            "calculated_at": sa_row.get("last_calculated")
         },
         "data": {
             "missing_pages": [{"form": r[0], "date": r[1], "lag": r[2]} for r in missing_pages],
             "deviations": [{"category": r[0], "status": r[1], "date": r[2]} for r in deviations],
-            "timeline": [{"visit": r[0], "date": r[1], "overdue_by": r[2]} for r in timeline],
+            "timeline": [{"visit": r[0], "date": r[1] or r[3], "overdue_by": r[2]} for r in timeline],
             "saes": [{"status": r[0], "review": r[1]} for r in saes]
         }
     }
@@ -268,37 +353,41 @@ def get_data_lineage(db: Session = Depends(get_db)):
     """
     REAL DATA: Returns the actual row counts for all system tables.
     """
-    # The list of tables we care about (from your diagnostic report)
-    tables = [
-        "subjects",
-        "raw_missing_pages",
-        "raw_lab_issues", 
-        "raw_inactivated_forms",
-        "raw_visit_projections", 
-        "raw_protocol_deviations",
-        "raw_cpid_metrics"
-    ]
-    
+    return compute_data_lineage(db)
+
+# The list of tables we care about (from your diagnostic report)
+LINEAGE_TABLES = [
+    "subjects",
+    "raw_missing_pages",
+    "raw_lab_issues", 
+    "raw_inactivated_forms",
+    "raw_visit_projections", 
+    "raw_protocol_deviations",
+    "raw_cpid_metrics"
+]
+
+def compute_data_lineage(db: Session) -> list:
+    # All counts in one statement (one round trip); table by table only if one of them fails
+    counts = {}
+    try:
+        one_shot = text("SELECT " + ", ".join(f"(SELECT COUNT(*) FROM {t}) AS {t}" for t in LINEAGE_TABLES))
+        counts = dict(db.execute(one_shot).mappings().one())
+    except Exception as e:
+        print(f"Lineage count error, counting per table: {e}")
+        db.rollback()
+        for table_name in LINEAGE_TABLES:
+            try:
+                counts[table_name] = db.execute(text(f"SELECT COUNT(*) FROM {table_name}")).scalar()
+            except Exception as e:
+                print(f"Error checking {table_name}: {e}")
+                response_cache.mark_degraded(f"lineage count {table_name}: {e}")
+                db.rollback()
+                counts[table_name] = None
+
     stats = []
-    
-    for table_name in tables:
-        try:
-            # Dynamic count query
-            count_sql = text(f"SELECT COUNT(*) FROM {table_name}")
-            row_count = db.execute(count_sql).scalar() or 0
-            
-            # Determine source type based on name
-            source_type = "System Core" if table_name == "subjects" else "Ingested (CSV/Excel)"
-            
-            stats.append({
-                "name": table_name,
-                "rows": row_count,
-                "status": "Active",
-                "type": source_type,
-                "last_updated": "Live" # In a real system, you'd check a timestamp column
-            })
-        except Exception as e:
-            print(f"Error checking {table_name}: {e}")
+    for table_name in LINEAGE_TABLES:
+        row_count = counts.get(table_name)
+        if row_count is None:
             stats.append({
                 "name": table_name,
                 "rows": 0,
@@ -306,5 +395,114 @@ def get_data_lineage(db: Session = Depends(get_db)):
                 "type": "Unknown",
                 "last_updated": "-"
             })
+            continue
+
+        # Determine source type based on name
+        source_type = "System Core" if table_name == "subjects" else "Ingested (CSV/Excel)"
+
+        stats.append({
+            "name": table_name,
+            "rows": row_count or 0,
+            "status": "Active",
+            "type": source_type,
+            "last_updated": "Live" # In a real system, you'd check a timestamp column
+        })
             
-    return stats
\ No newline at end of file
+    return stats
+
+
+# --- STUDY BUNDLE (one round trip for everything the study view opens with) ---
+BUNDLE_SECTIONS = ("kpis", "sites", "alerts", "clusters", "lineage")
+
+_bundle_executor = None
+_bundle_lock = threading.Lock()
+
+def _get_bundle_executor() -> ThreadPoolExecutor:
+    global _bundle_executor
+    with _bundle_lock:
+        if _bundle_executor is None:
+            _bundle_executor = ThreadPoolExecutor(max_workers=max(1, ANALYTICS_BUNDLE_WORKERS - 1),
+                                                  thread_name_prefix="analytics-bundle")
+        return _bundle_executor
+
+def parse_sections(sections: Optional[str]) -> tuple:
+    """ 'kpis, alerts' -> ('kpis', 'alerts') in BUNDLE_SECTIONS order; None/'' -> all """
+    if not sections:
+        return BUNDLE_SECTIONS
+    wanted = {s.strip().lower() for s in sections.split(",") if s.strip()}
+    unknown = wanted.difference(BUNDLE_SECTIONS)
+    if unknown:
+        raise HTTPException(status_code=400,
+                            detail=f"Unknown sections {sorted(unknown)}; choose from {list(BUNDLE_SECTIONS)}")
+    return tuple(s for s in BUNDLE_SECTIONS if s in wanted)
+
+@router.get("/analytics/bundle")
+def get_study_bundle(request: Request, response: Response, study: str, sections: Optional[str] = None,
+                     date_from: Optional[datetime.date] = None, date_to: Optional[datetime.date] = None,
+                     db: Session = Depends(get_db)):
+    """
+    KPIs, sites list, sentinel alerts, query clusters and data lineage in one request.
+    sections: comma-separated subset of kpis,sites,alerts,clusters,lineage (default: all).
+    Each section has the same shape as its own endpoint; the date window applies to kpis and alerts.
+    Cached like the others; lineage counts every study, so it keys on all studies' versions.
+    """
+    wanted = parse_sections(sections)
+    params = {"study": study, "sections": wanted, "date_from": date_from, "date_to": date_to}
+    return response_cache.serve(
+        request, response, db, "bundle", params,
+        lambda: compute_bundle(db, study, wanted, date_from, date_to),
+        study=None if "lineage" in wanted else study
+    )
+
+def _run_on_own_session(build):
+    session = SessionLocal()
+    try:
+        return build(session)
+    finally:
+        session.close()
+
+def compute_bundle(db: Session, study: str, sections=BUNDLE_SECTIONS, date_from: datetime.date = None,
+                   date_to: datetime.date = None) -> dict:
+    """
+    Builds the requested sections with the same compute functions as the individual endpoints.
+    A psycopg2 connection runs one statement at a time, so concurrency means more connections:
+    sections go to pooled connections only while some are idle, the rest run back to back on db.
+    A failing section is reported under "errors" instead of failing the bundle.
+    """
+    builders = {
+        "kpis": lambda s: compute_dashboard_metrics(s, study, date_from, date_to),
+        "sites": lambda s: list_sites(s, study),
+        "alerts": lambda s: sentinel.compute_alerts(s, study, date_from, date_to),
+        "clusters": lambda s: agent.compute_query_clusters(s, study),
+        "lineage": lambda s: compute_data_lineage(s),
+    }
+    payload = {"study_name": study, "sections": list(sections)}
+    errors = {}
+
+    spare = min(idle_connections(), ANALYTICS_BUNDLE_WORKERS - 1, len(sections) - 1)
+    offloaded = sections[1:1 + spare] if spare > 0 else ()
+    # Each section runs in a copy of this context so mark_degraded() still reaches serve()
+    futures = {name: _get_bundle_executor().submit(contextvars.copy_context().run, _run_on_own_session, builders[name])
+               for name in offloaded}
+
+    for name in sections:
+        if name in futures:
+            continue
+        try:
+            payload[name] = builders[name](db)
+        except Exception as e:
+            print(f"⚠️ Bundle section {name} failed: {e}")
+            db.rollback()
+            errors[name] = str(e)
+
+    for name, future in futures.items():
+        try:
+            payload[name] = future.result()
+        except Exception as e:
+            print(f"⚠️ Bundle section {name} failed: {e}")
+            errors[name] = str(e)
+
+    if errors:
+        payload["errors"] = errors
+        response_cache.mark_degraded(f"bundle sections failed: {sorted(errors)}")
+    return payload
@@ -48,7 +48,7 @@ Tables & Columns:
    - NOTE: Use this table to filter by study_name for tables that don't have it.
 
 2. raw_missing_pages
-   - Columns: subject_id (text), site_id (text), form_name (text), days_missing (int), study_name (text)
+   - Columns: subject_id (text), site_id (text), form_name (text), visit_date (date), days_missing (int), study_name (text)
    - NOTE: Has 'study_name'. No join needed.
 
 3. raw_inactivated_forms
@@ -60,7 +60,7 @@ Tables & Columns:
    - NOTE: NO 'study_name' column. You MUST JOIN 'subjects' on subject_id to filter by study.
 
 5. raw_visit_projections
-   - Columns: subject_id (text), site_id (text), visit_name (text), projected_date (text), days_outstanding (int), study_name (text)
+   - Columns: subject_id (text), site_id (text), visit_name (text), projected_date (date), projected_date_raw (text, as exported), days_outstanding (int, snapshot at export; prefer CURRENT_DATE - projected_date), study_name (text)
    - NOTE: Has 'study_name'. No join needed.
 """
 
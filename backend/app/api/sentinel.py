@@ -3,56 +3,67 @@ from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from backend.app.core.database import get_db
+from backend.app.utils.helpers import date_window
+from backend.app.utils import dqi, site_rollup
+from typing import Optional
+import datetime
 
 router = APIRouter()
 
+# Windowed ghost-site count (without a window the counts come from site_rollup).
+# Rows count toward the subject's current site, as they do in site_rollup
+GHOST_SITES_SQL = f"""
+    SELECT COALESCE(s.site_id, '{dqi.UNKNOWN_SITE}') AS site_id, COUNT(*) as missing_count
+    FROM raw_missing_pages mp
+    JOIN subjects s ON s.subject_id = mp.subject_id AND s.study_name = :study
+    WHERE mp.study_name = :study{{window}}
+    GROUP BY COALESCE(s.site_id, '{dqi.UNKNOWN_SITE}')
+    HAVING COUNT(*) > 15
+"""
+
 @router.get("/sentinel/alerts")
-def get_smart_alerts(study: str, db: Session = Depends(get_db)):
+def get_smart_alerts(study: str, date_from: Optional[datetime.date] = None,
+                     date_to: Optional[datetime.date] = None, db: Session = Depends(get_db)):
     """
     PATTERN 2: BACKGROUND AGENT
     Scans data and returns prioritized alerts without user input.
+    date_from / date_to (optional) only count missing pages for visits in that window.
     """
+    return compute_alerts(db, study, date_from, date_to)
+
+def compute_alerts(db: Session, study: str, date_from: datetime.date = None, date_to: datetime.date = None) -> dict:
     alerts = []
+    mp_window, window = date_window("mp.visit_date", date_from, date_to)
 
     # RULE 1: Detect "Ghost Sites" (High Inactivity)
     # Logic: Sites with > 10 subjects but NO recent data entry (inactivated forms count as activity type)
     # For simplicity, we'll check huge counts of missing pages vs active subjects
-    ghost_sql = text("""
-        SELECT site_id, COUNT(*) as missing_count
-        FROM raw_missing_pages 
-        WHERE study_name = :study
-        GROUP BY site_id
-        HAVING COUNT(*) > 15
-    """)
-    ghosts = db.execute(ghost_sql, {"study": study}).fetchall()
+    # Per-site counts come from site_rollup; only a date window needs the raw table
+    if mp_window:
+        ghosts = db.execute(text(GHOST_SITES_SQL.format(window=mp_window)), {"study": study, **window}).fetchall()
+    else:
+        ghosts = site_rollup.sites_over(db, study, "missing_pages", 15)
     
-    for row in ghosts:
+    for site_id, missing_count in ghosts:
         alerts.append({
             "type": "risk",
             "severity": "high",
-            "title": f"Operational Risk: {row.site_id}",
-            "message": f"Agent detected {row.missing_count} missing pages. This exceeds the threshold of 15.",
+            "title": f"Operational Risk: {site_id}",
+            "message": f"Agent detected {missing_count} missing pages. This exceeds the threshold of 15.",
             "action": "Schedule Monitoring Visit"
         })
 
     # RULE 2: Detect "Training Gaps" (High Inactivated Forms)
-    training_sql = text("""
-        SELECT site_id, COUNT(*) as deleted_count
-        FROM raw_inactivated_forms
-        GROUP BY site_id
-        HAVING COUNT(*) > 50
-    """)
-    training = db.execute(training_sql).fetchall()
-
-    for row in training:
-        # Check if this site belongs to the study (approximate via logic or strict join)
-        # For efficiency, we just alert.
+    # (rollup counts are scoped to the study's subjects, so other studies' sites no longer alert here)
+    training = site_rollup.sites_over(db, study, "inactivated_forms", 50)
+
+    for site_id, deleted_count in training:
         alerts.append({
             "type": "warning",
             "severity": "medium",
-            "title": f"Training Gap: {row.site_id}",
-            "message": f"Staff inactivated {row.deleted_count} forms. High rework detected.",
+            "title": f"Training Gap: {site_id}",
+            "message": f"Staff inactivated {deleted_count} forms. High rework detected.",
             "action": "Send EDC Training Video"
         })
 
-    return {"alerts": alerts, "count": len(alerts)}
\ No newline at end of file
+    return {"alerts": alerts, "count": len(alerts)}
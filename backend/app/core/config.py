@@ -7,3 +7,78 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 
 if not DATABASE_URL:
     raise ValueError("DATABASE_URL is not set")
+
+# --- INGESTION TUNING ---
+# Rows streamed per COPY / executemany batch when loading a sheet
+LOAD_CHUNK_SIZE = int(os.getenv("LOAD_CHUNK_SIZE", "50000"))
+
+# --- COLUMN MAPPER CACHE ---
+# Rename maps memoized per raw header layout (bounded LRU, optional JSON file on disk)
+MAPPER_CACHE_SIZE = int(os.getenv("MAPPER_CACHE_SIZE", "512"))
+MAPPER_CACHE_PATH = os.getenv("MAPPER_CACHE_PATH")  # e.g. /var/cache/clarity/header_maps.json
+
+# --- BACKGROUND INGEST JOBS ---
+# Bounded process pool so large workbooks can't starve the dashboard endpoints
+INGEST_MAX_WORKERS = int(os.getenv("INGEST_MAX_WORKERS", "2"))
+INGEST_MAX_PENDING_JOBS = int(os.getenv("INGEST_MAX_PENDING_JOBS", "20"))
+INGEST_JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", "100"))
+INGEST_WORKER_NICE = int(os.getenv("INGEST_WORKER_NICE", "5"))  # lower CPU priority for workers
+
+# --- SHEET CLASSIFICATION ---
+# Rows read per sheet to find the header and classify it before any full parse
+SHEET_PREVIEW_ROWS = int(os.getenv("SHEET_PREVIEW_ROWS", "25"))
+
+# --- UPLOAD MEMORY LIMITS ---
+# Non-seekable upload streams are spooled to a temp file; only this much is kept in RAM
+UPLOAD_SPOOL_MAX_MEMORY_MB = int(os.getenv("UPLOAD_SPOOL_MAX_MEMORY_MB", "16"))
+# CSVs are read and loaded this many rows at a time (0 = whole file in one frame)
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", "100000"))
+# Estimated pandas memory allowed across running ingest workers.
+# Files that don't fit right now wait in the queue; files that can never fit are rejected (413)
+INGEST_MEMORY_BUDGET_MB = int(os.getenv("INGEST_MEMORY_BUDGET_MB", "2048"))
+
+# --- PARALLEL SHEET PARSING ---
+# Processes used to parse/normalize the tabs of one workbook side by side (1 = sequential).
+# Background ingest jobs split this between their INGEST_MAX_WORKERS workers (at least 1 each)
+INGEST_SHEET_WORKERS = int(os.getenv("INGEST_SHEET_WORKERS", "4"))
+
+# --- SPREADSHEET READER ---
+# 'auto' = calamine when python-calamine is installed, else pandas' default (openpyxl read-only).
+# Or force one engine: 'calamine', 'openpyxl', 'default'
+EXCEL_READER_ENGINE = os.getenv("EXCEL_READER_ENGINE", "auto")
+
+# --- DATABASE CONNECTION POOL ---
+# Per process: API workers and each ingest worker hold their own pool
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+# Serverless Postgres drops idle connections; recycle them before it does
+DB_POOL_RECYCLE_SECONDS = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "300"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_POOL_TIMEOUT_SECONDS = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", "30"))  # wait for a free connection
+# Server-side cap per statement (ms, 0 = none). Ingest workers use the ingest value for long COPY loads
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+INGEST_STATEMENT_TIMEOUT_MS = int(os.getenv("INGEST_STATEMENT_TIMEOUT_MS", "0"))
+
+# --- DATA QUALITY INDEX ---
+# Component weights as 'visit=30,query=30,safety=25,coding=15' (normalized to sum to 1)
+def _parse_weights(spec: str) -> dict:
+    weights = {}
+    for part in spec.split(","):
+        name, _, value = part.partition("=")
+        weights[name.strip()] = float(value)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError(f"DQI_WEIGHTS must add up to more than 0: {spec!r}")
+    return {name: value / total for name, value in weights.items()}
+
+DQI_WEIGHTS = _parse_weights(os.getenv("DQI_WEIGHTS", "visit=30,query=30,safety=25,coding=15"))
+
+# --- ANALYTICS RESPONSE CACHE ---
+# Responses cached per (endpoint, params, study data version); bounded LRU per API process
+ANALYTICS_CACHE_SIZE = int(os.getenv("ANALYTICS_CACHE_SIZE", "256"))
+# How long an API process trusts its last read of the data versions (ingests in this
+# process invalidate immediately; this bounds staleness for loads done by other replicas)
+DATA_VERSION_TTL_SECONDS = float(os.getenv("DATA_VERSION_TTL_SECONDS", "5"))
+# Sections of /analytics/bundle in flight at once: the request's own connection plus pooled
+# connections that are idle at that moment (never waits on the pool; 1 = one connection only)
+ANALYTICS_BUNDLE_WORKERS = int(os.getenv("ANALYTICS_BUNDLE_WORKERS", "3"))
@@ -0,0 +1,79 @@
+# backend/app/core/explain_check.py
+import logging
+from sqlalchemy import text
+from backend.app.core.database import engine
+from backend.app.utils import dqi, site_rollup
+from backend.app.api import analytics, sentinel, agent
+
+logger = logging.getLogger(__name__)
+
+# The endpoints' own SQL (module constants / builders), never copies of it.
+# Date windows are left out ({window} = ""): the check is about the always-present filters.
+# Parameters are filled from a real subject, so plans reflect actual data (see sample_params).
+ENDPOINT_QUERIES = {
+    "analytics.dashboard-metrics: subjects": analytics.SUBJECT_COUNT_SQL,
+    "analytics.dashboard-metrics: missing pages": analytics.MISSING_COUNT_SQL.format(window=""),
+    "analytics.dashboard-metrics: deviations": analytics.DEVIATION_COUNT_SQL.format(window=""),
+    "analytics.dashboard-metrics: DQI (live, date window)": dqi.build_sql()[0],
+    "analytics.dashboard-metrics: DQI (site rollup)": site_rollup.SITE_SCORES_SQL,
+    "analytics.dashboard-metrics: fallback risk": analytics.MISSING_BY_SITE_SQL.format(window=""),
+    "analytics.site-details": analytics.SITE_DETAILS_SQL,
+    "analytics.sites-list": analytics.SITES_LIST_SQL,
+    "analytics.subject-details: subject": analytics.SUBJECT_SQL,
+    "analytics.subject-details: analytics": analytics.SUBJECT_ANALYTICS_SQL,
+    "analytics.subject-details: missing pages": analytics.SUBJECT_MISSING_SQL.format(window=""),
+    "analytics.subject-details: deviations": analytics.SUBJECT_DEVIATIONS_SQL.format(window=""),
+    "analytics.subject-details: timeline": analytics.SUBJECT_TIMELINE_SQL.format(window=""),
+    "analytics.subject-details: SAEs": analytics.SUBJECT_SAES_SQL,
+    "sentinel.alerts: ghost sites (date window)": sentinel.GHOST_SITES_SQL.format(window=""),
+    "sentinel.alerts: ghost sites / training gaps":
+        site_rollup.SITES_OVER_SQL.format(column="missing_pages"),
+    "agent.analyze-site: site rollup": site_rollup.SITE_SQL,
+    "agent.cluster-queries": agent.CLUSTER_SQL,
+}
+
+
+def _seq_scans(plan: dict) -> list:
+    """ Relation names of every Seq Scan node in an EXPLAIN (FORMAT JSON) plan tree """
+    found = [plan["Relation Name"]] if plan.get("Node Type") == "Seq Scan" else []
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+def sample_params(conn) -> dict:
+    row = conn.execute(text("""
+        SELECT study_name, site_id, subject_id FROM subjects
+        WHERE study_name IS NOT NULL AND site_id IS NOT NULL LIMIT 1
+    """)).fetchone()
+    study, site, subject = row if row is not None else ("Study 1", "Site 1", "Study 1_1001")
+    # Under every name the endpoints bind them as
+    return {"study": study, "site": site, "site_id": site, "subject": subject, "sid": subject, "threshold": 0}
+
+
+def run(bind=None, queries: dict = None) -> list:
+    """
+    EXPLAINs every endpoint query and flags the tables it still reads with a Seq Scan.
+    Sequential scans are disabled (not forbidden) for the check: on small tables the
+    planner rightly prefers them, so only a Seq Scan that survives means no usable index.
+    Returns [{"endpoint", "seq_scans": [tables], "ok", "error"}].
+    """
+    bind = bind or engine
+    queries = queries or ENDPOINT_QUERIES
+    report = []
+    with bind.connect() as conn:
+        params = sample_params(conn)
+        conn.rollback()
+        for endpoint, sql in queries.items():
+            entry = {"endpoint": endpoint, "seq_scans": [], "ok": True, "error": None}
+            try:
+                conn.execute(text("SET LOCAL enable_seqscan = off"))
+                plan = conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"), params).scalar()
+                entry["seq_scans"] = sorted(set(_seq_scans(plan[0]["Plan"])))
+                entry["ok"] = not entry["seq_scans"]
+            except Exception as e:
+                entry.update(ok=False, error=str(e).splitlines()[0])
+            finally:
+                conn.rollback()  # SET LOCAL ends with the transaction
+            report.append(entry)
+    return report
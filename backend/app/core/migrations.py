@@ -0,0 +1,114 @@
+# backend/app/core/migrations.py
+import os
+import re
+import hashlib
+import logging
+from sqlalchemy import text
+from backend.app.core.database import engine
+from backend.app.core import schema_registry
+
+logger = logging.getLogger(__name__)
+
+# backend/migrations/NNNN_description.sql, applied in version order
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "migrations")
+_FILENAME = re.compile(r"^(\d+)_([\w-]+)\.sql$")
+
+# Serializes runners (several API replicas / a CLI run starting at once)
+_ADVISORY_LOCK_ID = 4_207_311
+
+_BOOKKEEPING_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        checksum TEXT NOT NULL,
+        applied_at TIMESTAMPTZ DEFAULT now()
+    )
+"""
+
+
+def discover(directory: str = MIGRATIONS_DIR) -> list:
+    """ [{"version", "name", "path", "checksum"}] sorted by version """
+    migrations = []
+    for filename in os.listdir(directory):
+        match = _FILENAME.match(filename)
+        if not match:
+            continue
+        path = os.path.join(directory, filename)
+        with open(path, "rb") as fh:
+            checksum = hashlib.sha256(fh.read()).hexdigest()
+        migrations.append({"version": int(match.group(1)), "name": match.group(2), "path": path, "checksum": checksum})
+
+    migrations.sort(key=lambda m: m["version"])
+    versions = [m["version"] for m in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {directory}")
+    return migrations
+
+
+def _applied(conn) -> dict:
+    conn.execute(text(_BOOKKEEPING_SQL))
+    rows = conn.execute(text("SELECT version, name, checksum, applied_at FROM schema_migrations")).fetchall()
+    return {row[0]: {"name": row[1], "checksum": row[2], "applied_at": row[3]} for row in rows}
+
+
+def status(bind=None) -> list:
+    """ Every known migration with its state: 'applied', 'pending' or 'changed' (file edited after applying) """
+    with (bind or engine).begin() as conn:
+        applied = _applied(conn)
+    report = []
+    for m in discover():
+        done = applied.get(m["version"])
+        state = "pending" if not done else ("changed" if done["checksum"] != m["checksum"] else "applied")
+        report.append({"version": m["version"], "name": m["name"], "state": state,
+                       "applied_at": done["applied_at"] if done else None})
+    return report
+
+
+def upgrade(bind=None, target: int = None) -> list:
+    """
+    Applies pending migrations in order, each in its own transaction together with
+    its schema_migrations row, so a failure leaves the database at the last good version.
+    Returns the versions applied. PostgreSQL only (files may contain DO / plpgsql blocks).
+    """
+    bind = bind or engine
+    if bind.dialect.name != "postgresql":
+        raise RuntimeError("Migrations target PostgreSQL; use Base.metadata.create_all for local SQLite experiments")
+
+    applied_now = []
+    with bind.connect() as lock_conn:
+        # No statement_timeout here (the API default would cancel long ALTER / CREATE INDEX
+        # steps, or the wait for another migrator); SET LOCAL ends with each transaction
+        lock_conn.execute(text("SET LOCAL statement_timeout = 0"))
+        lock_conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": _ADVISORY_LOCK_ID})
+        try:
+            with bind.begin() as conn:
+                applied = _applied(conn)
+
+            for m in discover():
+                if target is not None and m["version"] > target:
+                    break
+                if m["version"] in applied:
+                    if applied[m["version"]]["checksum"] != m["checksum"]:
+                        logger.warning(f"Migration {m['version']:04d}_{m['name']} was edited after it was applied")
+                    continue
+
+                with open(m["path"], encoding="utf-8") as fh:
+                    sql = fh.read()
+                logger.info(f"Applying migration {m['version']:04d}_{m['name']}")
+                with bind.begin() as conn:
+                    conn.exec_driver_sql("SET LOCAL statement_timeout = 0")
+                    # Whole file as one driver call; no_parameters keeps psycopg2 from
+                    # treating the '%I' in format() calls as placeholders
+                    conn.execution_options(no_parameters=True).exec_driver_sql(sql)
+                    conn.execute(
+                        text("INSERT INTO schema_migrations (version, name, checksum) VALUES (:v, :n, :c)"),
+                        {"v": m["version"], "n": m["name"], "c": m["checksum"]}
+                    )
+                applied_now.append(m["version"])
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": _ADVISORY_LOCK_ID})
+            lock_conn.commit()
+
+    if applied_now:
+        schema_registry.invalidate()  # Schema changed: cached column metadata is stale
+    return applied_now
@@ -52,6 +52,8 @@ class RawCPID(Base):
     forms_verified = Column(Integer, default=0)
     forms_locked = Column(Integer, default=0)
     
+    load_id = Column(String, index=True) # Provenance: ingest_ledger.load_id
+    
     subject = relationship("Subject", back_populates="metrics")
 
 class RawVisit(Base):
@@ -61,9 +63,12 @@ class RawVisit(Base):
     id = Column(Integer, primary_key=True, index=True)
     subject_id = Column(String, ForeignKey("subjects.subject_id"))
     visit_name = Column(String)
-    projected_date = Column(String) # String to handle messy Excel formats safely
+    projected_date = Column(Date, index=True) # Parsed at ingest (NULL when unparseable)
+    projected_date_raw = Column(String) # Date text exactly as exported
     days_outstanding = Column(Integer)
     
+    load_id = Column(String, index=True) # Provenance: ingest_ledger.load_id
+    
     subject = relationship("Subject", back_populates="visits")
 
 class RawLab(Base):
@@ -77,6 +82,8 @@ class RawLab(Base):
     test_name = Column(String)
     issue_type = Column(String) # "Missing Range" or "Missing Lab Name"
     
+    load_id = Column(String, index=True) # Provenance: ingest_ledger.load_id
+    
     subject = relationship("Subject", back_populates="labs")
 
 class RawSAE(Base):
@@ -91,6 +98,8 @@ class RawSAE(Base):
     action_status = Column(String)
     source_system = Column(String) # "DM" or "Safety"
     
+    load_id = Column(String, index=True) # Provenance: ingest_ledger.load_id
+    
     subject = relationship("Subject", back_populates="saes")
 
 class RawProtocolDeviation(Base):
@@ -101,7 +110,9 @@ class RawProtocolDeviation(Base):
     subject_id = Column(String, ForeignKey("subjects.subject_id"))
     category = Column(String)
     status = Column(String) # Confirmed, Proposed
-    visit_date = Column(String)
+    visit_date = Column(Date, index=True) # Parsed at ingest (NULL when unparseable)
+    visit_date_raw = Column(String) # Date text exactly as exported
+    load_id = Column(String, index=True) # Provenance: ingest_ledger.load_id
 
 # ==========================================
 # 3. INTELLIGENCE LAYER (Derived Metrics)
@@ -110,13 +121,23 @@ class RawProtocolDeviation(Base):
 class SubjectAnalytics(Base):
     """
     The 'Data Quality Index' required by the Hackathon.
-    We calculate this in Phase 2 using Python.
+    Recomputed set-based after each ingest for the subjects it touched
+    (utils/subject_analytics.py); full rebuild via scripts/rebuild_subject_analytics.py.
     """
     __tablename__ = "subject_analytics"
     
     subject_id = Column(String, ForeignKey("subjects.subject_id"), primary_key=True)
+    study_name = Column(String)
+    site_id = Column(String)
     
-    # The "Clean Patient" Flag (Rule: 0 missing visits + 0 queries + 0 missing pages)
+    # Per-subject counts behind the flags below
+    missing_pages = Column(Integer, default=0)
+    protocol_deviations = Column(Integer, default=0)
+    saes = Column(Integer, default=0)
+    open_saes = Column(Integer, default=0)
+    overdue_visits = Column(Integer, default=0) # as of last_calculated
+    
+    # The "Clean Patient" Flag (Rule: 0 missing pages + 0 protocol deviations)
     is_clean_patient = Column(Boolean, default=False)
     
     # The "Data Quality Index" (0 to 100 Score)
@@ -128,4 +149,33 @@ class SubjectAnalytics(Base):
     
     last_calculated = Column(DateTime(timezone=True), server_default=func.now())
     
-    subject = relationship("Subject", back_populates="analytics")
\ No newline at end of file
+    subject = relationship("Subject", back_populates="analytics")
+
+# ==========================================
+# 4. INGESTION BOOKKEEPING
+# ==========================================
+
+class IngestLedger(Base):
+    """
+    Content fingerprints of everything already ingested.
+    scope='file'  -> hash of the uploaded bytes
+    scope='sheet' -> hash of one normalized sheet (after header mapping + ID transform)
+    A matching hash for the same study means the upload can be skipped.
+    Sheet rows double as the load record (file, sheet, study, timestamp) for provenance.
+    """
+    __tablename__ = "ingest_ledger"
+
+    id = Column(Integer, primary_key=True, index=True)
+    scope = Column(String, nullable=False)
+    content_hash = Column(String, nullable=False, index=True)
+    study_name = Column(String, index=True)
+    filename = Column(String)
+    sheet_name = Column(String)
+    dataset_key = Column(String)
+    row_count = Column(Integer, default=0)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Sheet loads only: every inserted raw row carries this load_id
+    load_id = Column(String, index=True)
+    target_table = Column(String)
+    mode = Column(String) # 'append' or 'replace'
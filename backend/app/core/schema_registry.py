@@ -0,0 +1,96 @@
+# backend/app/core/schema_registry.py
+import logging
+import threading
+from sqlalchemy import inspect, text
+from backend.app.core.database import engine
+
+logger = logging.getLogger(__name__)
+
+# table -> {column_name: upper-cased SQL type}
+_tables = {}
+_loaded = False
+_generation = 0  # bumped on every (re)load so worker processes can detect staleness
+_lock = threading.Lock()
+
+INTEGER_TYPES = ("INTEGER", "BIGINT", "SMALLINT")
+FLOAT_TYPES = ("DOUBLE PRECISION", "REAL", "FLOAT", "NUMERIC", "DECIMAL")
+DATE_TYPES = ("DATE", "TIMESTAMP")  # DATE also matches SQLite DATETIME
+
+
+def _read_catalog(bind) -> dict:
+    if bind.dialect.name == "postgresql":
+        # Single catalog round trip for every table in the schema
+        sql = text("""
+            SELECT table_name, column_name, data_type
+            FROM information_schema.columns
+            WHERE table_schema = current_schema()
+            ORDER BY table_name, ordinal_position
+        """)
+        tables = {}
+        with bind.connect() as conn:
+            for table, column, data_type in conn.execute(sql):
+                tables.setdefault(table, {})[column] = str(data_type).upper()
+        return tables
+
+    inspector = inspect(bind)
+    return {
+        table: {c['name']: str(c['type']).upper() for c in inspector.get_columns(table)}
+        for table in inspector.get_table_names()
+    }
+
+
+def load(bind=None) -> dict:
+    """ (Re)loads column metadata for all tables. Called once at startup. """
+    global _tables, _loaded, _generation
+    tables = _read_catalog(bind or engine)
+    with _lock:
+        _tables = tables
+        _loaded = True
+        _generation += 1
+    logger.info(f"Schema registry loaded: {len(tables)} tables")
+    return tables
+
+
+def invalidate():
+    """ Forget cached metadata (call after migrations); next access reloads """
+    global _loaded
+    with _lock:
+        _loaded = False
+
+
+def generation() -> int:
+    return _generation
+
+
+def sync_generation(expected: int):
+    """ Worker processes: reload if the API process has reloaded since we forked """
+    if expected != _generation:
+        invalidate()
+
+
+def _ensure_loaded():
+    if not _loaded:
+        load()
+
+
+def has_table(table: str) -> bool:
+    _ensure_loaded()
+    return table in _tables
+
+
+def get_columns(table: str) -> dict:
+    """ {column: SQL type} for `table` ({} when the table doesn't exist) """
+    _ensure_loaded()
+    return dict(_tables.get(table, {}))
+
+
+def column_names(table: str) -> list:
+    return list(get_columns(table).keys())
+
+
+def columns_of_type(table: str, type_prefixes: tuple) -> set:
+    return {col for col, col_type in get_columns(table).items() if col_type.startswith(type_prefixes)}
+
+
+def integer_columns(table: str) -> set:
+    return columns_of_type(table, INTEGER_TYPES)
@@ -1,10 +1,11 @@
 
 # backend/app/main.py
-from fastapi import FastAPI, UploadFile, File, Form, Depends # <--- Added Form
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException # <--- Added Form
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Optional
-from sqlalchemy.orm import Session
-from backend.app.core.database import get_db
-from backend.app.utils.ingest_excel import ingest_file
+from backend.app.core import schema_registry, database
+from backend.app.utils import ingest_jobs, response_cache
+from backend.app.utils.ingest_ledger import INGEST_MODES
 from fastapi.middleware.cors import CORSMiddleware
 
 # --- Import the new analytics router ---
@@ -36,22 +37,74 @@ app.include_router(sentinel.router, prefix="/api")
 @app.post("/api/upload")
 async def upload_files(
     study_name: Optional[str] = Form(None), # <--- NEW: capture study name from Form Data
-    files: List[UploadFile] = File(...), 
-    db: Session = Depends(get_db)
+    files: List[UploadFile] = File(...),
+    mode: str = Form("append") # 'append' or 'replace' (swap out the previous load of the same file)
 ):
     """
-    Uploads any number of Excel/CSV files.
+    Uploads any number of Excel/CSV files, or zip / tar.gz bundles of them.
     - If study_name is provided (Recommended), all files are tagged with it.
-    - If not provided, the system tries to guess from filename/content (Fallback).
+    - If not provided, the system tries to guess from filename/content (Fallback);
+      bundle members also use their folder path ('Study 7/Visit Tracker.xlsx').
+    Parsing/loading runs on a background process pool; poll /api/upload/jobs/{job_id}.
     """
-    upload_results = []
-    
-    for file in files:
-        # Pass the captured study_name to your logic
-        result = ingest_file(file, db, study_name=study_name) 
-        upload_results.append(result)
-        
-    return {"summary": upload_results}
+    if mode not in INGEST_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {INGEST_MODES}")
+    if ingest_jobs.queue_is_full():
+        raise HTTPException(status_code=429, detail="Ingestion queue is full. Please retry shortly.")
+
+    # Hand the bytes to the workers via temp files (off the event loop)
+    saved_files = [await run_in_threadpool(ingest_jobs.save_upload, file) for file in files]
+
+    # Files that could never fit the ingest memory budget are rejected; the rest queue until they fit
+    oversized = ingest_jobs.oversized_uploads(saved_files)
+    if oversized:
+        ingest_jobs.discard_uploads(saved_files)
+        names = ", ".join(f"{f['filename']} (~{f['memory_mb']:.0f} MB)" for f in oversized)
+        raise HTTPException(status_code=413, detail=f"File too large to ingest within the memory budget: {names}. Split it or upload it as CSV.")
+
+    job = ingest_jobs.submit_upload_job(saved_files, study_name=study_name, mode=mode)
+
+    return {"job_id": job["job_id"], "status": job["status"], "files": [f["file"] for f in job["files"]]}
+
+@app.get("/api/upload/jobs/{job_id}")
+def get_upload_job(job_id: str):
+    """
+    Progress for a background upload: per-file and per-sheet status, row counts, timings.
+    'summary' holds the per-file ingest results once the job is completed.
+    """
+    job = ingest_jobs.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Upload job not found")
+    return job
+
+@app.on_event("startup")
+def load_schema_registry():
+    # Column metadata for every table, read once (ingest filters/plans from it)
+    try:
+        schema_registry.load()
+    except Exception as e:
+        print(f"⚠️ Schema registry not loaded at startup (will retry lazily): {e}")
+
+@app.post("/api/admin/schema-cache/refresh")
+def refresh_schema_registry():
+    """Call after running migrations so the API picks up new/changed columns."""
+    schema_registry.invalidate()
+    tables = schema_registry.load()
+    return {"status": "reloaded", "tables": len(tables)}
+
+@app.get("/api/admin/analytics-cache")
+def get_analytics_cache_stats():
+    """Hit/miss/304 counts of this process's analytics response cache."""
+    return response_cache.stats()
+
+@app.get("/api/admin/db-pool")
+def get_db_pool_metrics():
+    """Connection pool of this API process: checked-out / idle / overflow connections and checkout wait times."""
+    return database.pool_metrics()
+
+@app.on_event("shutdown")
+def stop_ingest_workers():
+    ingest_jobs.shutdown()
 
 @app.get("/")
 def health_check():
@@ -0,0 +1,114 @@
+# backend/app/utils/bulk_loader.py
+import io
+import time
+import logging
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from backend.app.core.config import LOAD_CHUNK_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+def _quote(name) -> str:
+    """ Quotes an identifier so vendor column names can't break the statement """
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _raw_connection(db: Session):
+    """ DBAPI connection bound to the session's current transaction """
+    return db.connection().connection
+
+
+def supports_copy(db: Session) -> bool:
+    """ COPY FROM STDIN needs PostgreSQL + a driver exposing copy_expert (psycopg2) """
+    if db.get_bind().dialect.name != "postgresql":
+        return False
+    cursor = _raw_connection(db).cursor()
+    try:
+        return hasattr(cursor, "copy_expert")
+    finally:
+        cursor.close()
+
+
+def _prepare_chunk(chunk: pd.DataFrame, int_columns: set = None) -> pd.DataFrame:
+    """
+    to_numeric() leaves counts as floats (3.0), which COPY rejects for INTEGER
+    columns. With schema metadata, float columns bound for INTEGER columns are
+    written as nullable ints; without it, whole-number float columns are.
+    """
+    chunk = chunk.copy()
+    for col in chunk.columns:
+        series = chunk[col]
+        if not pd.api.types.is_float_dtype(series):
+            continue
+        if int_columns is not None:
+            if col in int_columns:
+                chunk[col] = series.round().astype("Int64")
+            continue
+        non_null = series.dropna()
+        if len(non_null) and (non_null % 1 == 0).all():
+            chunk[col] = series.astype("Int64")
+    return chunk
+
+
+def _copy_chunks(db: Session, df: pd.DataFrame, table: str, chunk_size: int, int_columns: set):
+    columns = ", ".join(_quote(c) for c in df.columns)
+    sql = f"COPY {_quote(table)} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '')"
+
+    cursor = _raw_connection(db).cursor()
+    try:
+        for start in range(0, len(df), chunk_size):
+            buffer = io.StringIO()
+            _prepare_chunk(df.iloc[start:start + chunk_size], int_columns).to_csv(buffer, index=False, header=False)
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+    finally:
+        cursor.close()
+
+
+def _executemany_chunks(db: Session, df: pd.DataFrame, table: str, chunk_size: int, int_columns: set):
+    # Positional bind names: raw Excel headers are not valid parameter names
+    keys = [f"c{i}" for i in range(len(df.columns))]
+    columns = ", ".join(_quote(c) for c in df.columns)
+    placeholders = ", ".join(f":{k}" for k in keys)
+    sql = text(f"INSERT INTO {_quote(table)} ({columns}) VALUES ({placeholders})")
+
+    for start in range(0, len(df), chunk_size):
+        chunk = _prepare_chunk(df.iloc[start:start + chunk_size], int_columns).astype(object)
+        chunk = chunk.where(chunk.notna(), None)
+        records = [dict(zip(keys, row)) for row in chunk.itertuples(index=False, name=None)]
+        db.execute(sql, records)
+
+
+def bulk_insert_dataframe(db: Session, df: pd.DataFrame, table: str, chunk_size: int = LOAD_CHUNK_SIZE,
+                          int_columns: set = None) -> dict:
+    """
+    Streams a normalized DataFrame into `table` in fixed-size chunks.
+    - PostgreSQL: COPY FROM STDIN (one CSV buffer per chunk)
+    - Anything else: batched executemany INSERTs
+    int_columns: INTEGER columns of `table` (from the schema registry), if known.
+    Runs inside the session's transaction; the caller decides when to commit.
+    """
+    start_time = time.perf_counter()
+
+    if df.empty:
+        method = "skipped"
+    elif supports_copy(db):
+        method = "COPY"
+        _copy_chunks(db, df, table, chunk_size, int_columns)
+    else:
+        method = "executemany"
+        _executemany_chunks(db, df, table, chunk_size, int_columns)
+
+    seconds = time.perf_counter() - start_time
+    rows = len(df)
+    rows_per_sec = int(rows / seconds) if seconds > 0 else rows
+    logger.info(f"{table}: {rows} rows via {method} in {seconds:.2f}s ({rows_per_sec} rows/s)")
+
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": rows_per_sec,
+        "method": method,
+    }
@@ -0,0 +1,156 @@
+# backend/app/utils/bundle_loader.py
+import os
+import time
+import tarfile
+import zipfile
+from types import SimpleNamespace
+from sqlalchemy.orm import Session
+from backend.app.utils.ingest_excel import ingest_file, extract_study_from_filename
+from backend.app.utils.excel_loader import spool_stream
+
+BUNDLE_SUFFIXES = (".zip", ".tar.gz", ".tgz", ".tar")
+MEMBER_SUFFIXES = (".csv", ".xlsx", ".xls")
+
+
+def is_bundle(filename: str) -> bool:
+    return str(filename or "").lower().endswith(BUNDLE_SUFFIXES)
+
+
+def _is_ingestible(member_name: str) -> bool:
+    base = os.path.basename(member_name)
+    # Skip macOS resource forks / hidden files and Excel lock files
+    if not base or base.startswith((".", "~$")) or "__MACOSX" in member_name:
+        return False
+    return base.lower().endswith(MEMBER_SUFFIXES)
+
+
+def infer_study_from_path(member_name: str):
+    """ 'refresh/Study 7/exports/Visit Tracker.xlsx' -> 'Study 7' (file name first, then innermost folder) """
+    parts = [p for p in member_name.replace("\\", "/").split("/") if p]
+    for part in reversed(parts):
+        study = extract_study_from_filename(part)
+        if study:
+            return study
+    return None
+
+
+def iter_members(path: str):
+    """
+    Yields (member_name, size, fileobj) one member at a time, never extracting the archive.
+    zip: ZipExtFile decompresses on read; tar(.gz): opened in stream mode ('r|*').
+    Either way the member is a forward-only stream; ingest_bundle spools it before parsing.
+    """
+    if path.lower().endswith(".zip") or zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not _is_ingestible(info.filename):
+                    continue
+                with archive.open(info) as member:
+                    yield info.filename, info.file_size, member
+        return
+
+    with tarfile.open(path, mode="r|*") as archive:
+        for info in archive:
+            if not info.isfile() or not _is_ingestible(info.name):
+                continue
+            member = archive.extractfile(info)
+            if member is None:
+                continue
+            with member:
+                yield info.name, info.size, member
+
+
+def member_sizes(path: str) -> list:
+    """
+    (name, uncompressed size, line count) of every ingestible member, so a bundle can be
+    sized like the standalone files it contains. Lines are only counted for CSV members
+    (they load in chunks); each member is streamed once, never extracted.
+    An unreadable archive yields what was read so far; ingest_bundle reports the error.
+    """
+    sizes = []
+    try:
+        for member_name, size, member in iter_members(path):
+            lines = 0
+            if member_name.lower().endswith(".csv"):
+                for block in iter(lambda: member.read(1024 * 1024), b""):
+                    lines += block.count(b"\n")
+            sizes.append((member_name, size, lines))
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError):
+        pass
+    return sizes
+
+
+def _member_progress(progress, member_name: str):
+    """ Prefixes sheet names with the member so per-sheet progress stays unique across the bundle """
+    if progress is None:
+        return None
+
+    def report(event):
+        event = dict(event)
+        if "sheet" in event:
+            event["sheet"] = f"{member_name} › {event['sheet']}"
+        if event.get("event") == "file_parsed":
+            event["sheets"] = [f"{member_name} › {sheet}" for sheet in event["sheets"]]
+            event["append"] = True
+        progress(event)
+    return report
+
+
+def ingest_bundle(path: str, filename: str, db: Session, study_name: str = None, progress=None,
+                  mode: str = "append") -> dict:
+    """
+    Ingests every CSV/Excel member of a zip/tar(.gz) through ingest_file, one at a time.
+    The study comes from the form field if given, else from the member's path.
+    Returns one consolidated result with a per-member summary.
+    """
+    started = time.perf_counter()
+    members, details, sheets = [], [], []
+
+    try:
+        for member_name, size, member in iter_members(path):
+            member_study = study_name or infer_study_from_path(member_name)
+            # Seeking inside a compressed member means re-inflating it; give pandas a plain spooled copy
+            spooled = spool_stream(member)
+            upload = SimpleNamespace(filename=os.path.basename(member_name), file=spooled)
+            try:
+                result = ingest_file(upload, db, study_name=member_study, progress=_member_progress(progress, member_name),
+                                     mode=mode)
+            except Exception as e:
+                db.rollback()
+                result = {"status": "error", "reason": str(e)}
+            finally:
+                spooled.close()
+
+            rows = sum(s.get("rows", 0) for s in result.get("sheets", []))
+            members.append({
+                "member": member_name, "bytes": size, "study": result.get("study", member_study),
+                "status": result["status"], "rows": rows,
+                "details": result.get("details") or [result.get("reason")]
+            })
+            prefix = f"[{member_name}] "
+            if result["status"] == "error":
+                details.append(f"{prefix}❌ {result.get('reason')}")
+            else:
+                details.extend(prefix + line for line in result.get("details", []))
+            sheets.extend({**s, "member": member_name} for s in result.get("sheets", []))
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+        return {"status": "error", "file": filename, "reason": f"Unreadable archive: {e}", "members": members}
+
+    if not members:
+        return {"status": "error", "file": filename, "reason": "Archive has no CSV/Excel files", "members": []}
+
+    failed = sum(1 for m in members if m["status"] == "error")
+    seconds = round(time.perf_counter() - started, 3)
+    details.insert(0, f"📦 {filename}: {len(members) - failed}/{len(members)} files ingested, "
+                      f"{sum(m['rows'] for m in members):,} rows in {seconds}s")
+    return {
+        "status": "processed",
+        "file": filename,
+        "bundle": True,
+        "study": study_name,
+        "mode": mode,
+        "details": details,
+        "members": members,
+        "sheets": sheets,
+        "timings": {"total": seconds}
+    }
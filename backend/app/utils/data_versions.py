@@ -0,0 +1,66 @@
+# backend/app/utils/data_versions.py
+import time
+import logging
+import threading
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from backend.app.core.config import DATA_VERSION_TTL_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Last read of study_data_versions: {study_name: version}, refreshed after the TTL
+_versions = {}
+_read_at = 0.0
+_lock = threading.Lock()
+
+
+def bump(db: Session, study_name: str):
+    """
+    +1 on the study's data version, inside the caller's transaction (commits with the load).
+    Runs in a savepoint: without the table (migrations not run) the load still goes through.
+    """
+    try:
+        with db.begin_nested():
+            db.execute(text("""
+                INSERT INTO study_data_versions (study_name, version) VALUES (:study, 1)
+                ON CONFLICT (study_name)
+                DO UPDATE SET version = study_data_versions.version + 1, updated_at = CURRENT_TIMESTAMP
+            """), {"study": study_name})
+    except Exception as e:
+        logger.warning(f"Data version not bumped for {study_name}: {e}")
+
+
+def invalidate():
+    """ Forget the cached versions (an ingest in this process just committed) """
+    global _read_at
+    with _lock:
+        _read_at = 0.0
+
+
+def _refresh(db: Session) -> dict:
+    global _versions, _read_at
+    with _lock:
+        if time.monotonic() - _read_at < DATA_VERSION_TTL_SECONDS:
+            return _versions
+    # One tiny table for all studies; a savepoint keeps a missing table from aborting the request
+    with db.begin_nested():
+        rows = db.execute(text("SELECT study_name, version FROM study_data_versions")).fetchall()
+    with _lock:
+        _versions = {row[0]: row[1] for row in rows}
+        _read_at = time.monotonic()
+        return _versions
+
+
+def current(db: Session, study_name: str = None):
+    """
+    Data version of one study, or of all studies together when study_name is None
+    (for cross-study endpoints like the study list). None when versions are unavailable.
+    """
+    try:
+        versions = _refresh(db)
+    except Exception as e:
+        logger.warning(f"Study data versions unavailable (run migrations?): {e}")
+        return None
+    if study_name is None:
+        return sum(versions.values())
+    return versions.get(study_name, 0)
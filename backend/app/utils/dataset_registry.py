@@ -1,50 +1,94 @@
+# backend/app/utils/dataset_registry.py
 
+# Dtype plan vocabulary (applied right after normalize_dataframe_columns):
+#   "category" -> low-cardinality text (site, statuses, form names)
+#   "Int32"    -> counts (nullable, so blanks stay NULL)
+#   "float32"  -> percentages
+#   "date"     -> parsed dates (only when the target DB column is a DATE/TIMESTAMP)
+#
+# sheet_hints: word groups; a sheet (or CSV file) name containing every word of a
+# group nudges the classifier towards that dataset (see detect_dataset.py)
+COMMON_DTYPES = {
+    "site_id": "category",
+    "status": "category",
+}
 
-# backend/app/utils/dataset_registry.py
 DATASET_SPECS = {
     "raw_cpid_metrics": {
         # Note: 'missing_visits' must match TARGET_SCHEMA key above
         "required_columns": ["subject_id", "missing_visits"], 
-        "table": "raw_cpid_metrics"
+        "table": "raw_cpid_metrics",
+        "sheet_hints": [["subject", "level", "metrics"], ["cpid"]],
+        "dtypes": {
+            "subject_status": "category",
+            "missing_visits": "Int32", "missing_pages": "Int32", "open_queries": "Int32",
+            "coded_terms": "Int32", "uncoded_terms": "Int32", "protocol_deviations": "Int32",
+            "pages_entered": "Int32", "forms_verified": "Int32", "forms_locked": "Int32",
+            "clean_crf_percent": "float32"
+        }
     },
     "raw_protocol_deviations": {
         "required_columns": ["pd_status", "visit_date"],
-        "table": "raw_protocol_deviations"
+        "table": "raw_protocol_deviations",
+        "sheet_hints": [["protocol", "deviation"], ["deviations"]],
+        "dtypes": {"pd_status": "category", "category": "category", "visit_date": "date"}
     },
     "raw_visit_projections": {
         "required_columns": ["projected_date", "days_outstanding"],
-        "table": "raw_visit_projections"
+        "table": "raw_visit_projections",
+        "sheet_hints": [["visit", "projection"], ["projection"], ["visit", "tracker"]],
+        "dtypes": {"visit_name": "category", "projected_date": "date", "days_outstanding": "Int32"}
     },
     "raw_lab_issues": {
         "required_columns": ["lab_category", "test_name"],
-        "table": "raw_lab_issues"
+        "table": "raw_lab_issues",
+        "sheet_hints": [["missing", "lab"], ["lab", "ranges"], ["lab", "issues"]],
+        "dtypes": {"lab_category": "category", "test_name": "category", "issue_type": "category", "visit": "category"}
     },
     "raw_sae_safety": {
         "required_columns": ["case_status", "review_status"],
-        "table": "raw_sae_safety"
+        "table": "raw_sae_safety",
+        "sheet_hints": [["safety"]],
+        "dtypes": {"case_status": "category", "review_status": "category"}
     },
     "raw_sae_dm": {
         "required_columns": ["discrepancy_id", "action_status"],
-        "table": "raw_sae_dm"
+        "table": "raw_sae_dm",
+        "sheet_hints": [["dm"]],
+        "dtypes": {"action_status": "category"}
     },
     "raw_coding_meddra": {
         "required_columns": ["coding_status", "term"],
-        "table": "raw_coding_meddra"
+        "table": "raw_coding_meddra",
+        "sheet_hints": [["meddra"]],
+        "dtypes": {"coding_status": "category"}
     },
     "raw_coding_whodra": {
         "required_columns": ["coding_status", "trade_name"],
-        "table": "raw_coding_whodra"
+        "table": "raw_coding_whodra",
+        "sheet_hints": [["whodrug"], ["whodra"], ["whodd"], ["who", "drug"]],
+        "dtypes": {"coding_status": "category"}
     },
     "raw_missing_pages": {
         "required_columns": ["days_missing", "form_name", "visit_date"], 
-        "table": "raw_missing_pages"
+        "table": "raw_missing_pages",
+        "sheet_hints": [["missing", "pages"], ["missing", "page"]],
+        "dtypes": {"form_name": "category", "visit_date": "date", "days_missing": "Int32"}
     },
     "raw_inactivated_forms": {
         "required_columns": ["audit_action", "folder_name"],
-        "table": "raw_inactivated_forms"
+        "table": "raw_inactivated_forms",
+        "sheet_hints": [["inactivated"]],
+        "dtypes": {"audit_action": "category", "folder_name": "category", "form_name": "category"}
     },
     "raw_edrr_issues": {
         "required_columns": ["issue_count"], 
-        "table": "raw_edrr_issues"
+        "table": "raw_edrr_issues",
+        "sheet_hints": [["edrr"]],
+        "dtypes": {"issue_count": "Int32"}
     }
-}
\ No newline at end of file
+}
+
+def get_dtype_plan(dataset_key: str) -> dict:
+    """ Shared defaults overlaid with the dataset's own plan """
+    return {**COMMON_DTYPES, **DATASET_SPECS[dataset_key].get("dtypes", {})}
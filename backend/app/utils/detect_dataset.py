@@ -1,36 +1,127 @@
 # backend/app/utils/detect_dataset.py
+import re
 import pandas as pd
+from backend.app.utils.dataset_registry import DATASET_SPECS
+from backend.app.utils.column_mappings import COLUMN_MAPPINGS
+from backend.app.utils.smart_mapper import TARGET_SCHEMA, build_rename_map
+
+# Score = weighted mix of (required columns found, how specific their headers were),
+# share of the dataset's known columns present, and a sheet/file-name hint.
+REQUIRED_WEIGHT = 0.6
+COVERAGE_WEIGHT = 0.3
+HINT_WEIGHT = 0.1
+
+# Two candidates closer than this are reported as ambiguous instead of guessed.
+# Kept strictly below HINT_WEIGHT so a sheet-name hint always settles a tie
+# (MedDRA vs WHODrug coding sheets share every column).
+AMBIGUITY_MARGIN = 0.05
+
+
+def normalize_header(value) -> str:
+    """ 'Subject  ID ' -> 'subject id' (case/whitespace-insensitive lookups) """
+    return re.sub(r"\s+", " ", str(value)).strip().lower()
+
+def _words(text: str) -> set:
+    return set(re.findall(r"[a-z0-9]+", str(text).lower()))
+
+
+# --- COMPILED INDEX (built once at import) ---
+def _compile():
+    """
+    header -> [(dataset_key, canonical_column, weight)]
+    Sources per dataset: its COLUMN_MAPPINGS aliases, the canonical names themselves
+    (already-normalized headers) and TARGET_SCHEMA keywords for shared columns.
+    weight = 1 / number of distinct canonical columns a header can mean, so a bare
+    'Status' counts for less than 'Case Status'.
+    """
+    claims = {}  # header -> {(dataset_key, canonical)}
+    columns = {}  # dataset_key -> set of canonical columns it knows about
+
+    for key, spec in DATASET_SPECS.items():
+        mapping = COLUMN_MAPPINGS.get(key, {})
+        known = set(mapping) | set(spec["required_columns"])
+        columns[key] = known
+        for canonical in known:
+            aliases = [canonical] + mapping.get(canonical, []) + TARGET_SCHEMA.get(canonical, [])
+            for alias in aliases:
+                claims.setdefault(normalize_header(alias), set()).add((key, canonical))
+
+    index = {}
+    for header, pairs in claims.items():
+        weight = 1.0 / len({canonical for _, canonical in pairs})
+        # Exact canonical names first, so dataset_rename_map prefers them deterministically
+        ordered = sorted(pairs, key=lambda pair: (pair[1] != header, pair))
+        index[header] = [(key, canonical, weight) for key, canonical in ordered]
+    return index, columns
+
+_INDEX, _DATASET_COLUMNS = _compile()
+# Every known header spelling, for header-row detection (see ingest_excel.detect_header)
+HEADER_KEYWORDS = frozenset(_INDEX) | frozenset(
+    normalize_header(keyword) for keywords in TARGET_SCHEMA.values() for keyword in keywords
+)
+_REQUIRED = {key: spec["required_columns"] for key, spec in DATASET_SPECS.items()}
+_HINTS = {key: [set(group) for group in spec.get("sheet_hints", [])] for key, spec in DATASET_SPECS.items()}
+
+
+def _header_tokens(headers) -> set:
+    """ Normalized raw headers + their fuzzy TARGET_SCHEMA names (served from the mapper cache) """
+    raw = [str(h).strip() for h in headers if not pd.isna(h) and str(h).strip()]
+    tokens = {normalize_header(h) for h in raw}
+    tokens.update(build_rename_map(raw).values())
+    return tokens
+
+
+def classify_sheet(headers, sheet_name: str = "") -> dict:
+    """
+    Scores every dataset in one pass over the sheet's headers.
+    Returns {"dataset", "confidence", "ambiguous", "candidates": [(key, score), ...]}.
+    'dataset' is None when nothing qualifies (all required columns present) or when
+    the top two candidates are within AMBIGUITY_MARGIN (the caller should surface it).
+    """
+    strengths = {}  # (dataset_key, canonical) -> best weight seen
+    for token in _header_tokens(headers):
+        for key, canonical, weight in _INDEX.get(token, ()):
+            if weight > strengths.get((key, canonical), 0.0):
+                strengths[(key, canonical)] = weight
+
+    name_words = _words(sheet_name)
+    candidates = []
+    for key, required in _REQUIRED.items():
+        found = [strengths.get((key, col), 0.0) for col in required]
+        if not all(found):
+            continue
+        coverage = sum(1 for col in _DATASET_COLUMNS[key] if (key, col) in strengths) / len(_DATASET_COLUMNS[key])
+        hint = 1.0 if any(group <= name_words for group in _HINTS[key]) else 0.0
+        score = REQUIRED_WEIGHT * (sum(found) / len(found)) + COVERAGE_WEIGHT * coverage + HINT_WEIGHT * hint
+        candidates.append((key, round(score, 3)))
+
+    candidates.sort(key=lambda c: c[1], reverse=True)
+    if not candidates:
+        return {"dataset": None, "confidence": 0.0, "ambiguous": False, "candidates": []}
+
+    best_key, best_score = candidates[0]
+    ambiguous = len(candidates) > 1 and best_score - candidates[1][1] < AMBIGUITY_MARGIN
+    return {
+        "dataset": None if ambiguous else best_key,
+        "confidence": best_score,
+        "ambiguous": ambiguous,
+        "candidates": candidates[:3]
+    }
+
+
+def dataset_rename_map(dataset_key: str, headers) -> dict:
+    """ Raw header -> canonical column, using only the chosen dataset's exact aliases """
+    rename_map = {}
+    for header in headers:
+        for key, canonical, _ in _INDEX.get(normalize_header(header), ()):
+            if key == dataset_key:
+                rename_map[header] = canonical
+                break
+    return rename_map
+
 
 def detect_dataset_type(df: pd.DataFrame, sheet_name: str = "") -> str:
     """
-    Identifies the dataset type based on sheet name OR content keywords.
+    Identifies the dataset type from a DataFrame's (header) columns and sheet name.
     """
-    # 1. Check Sheet Name (Fastest)
-    s_name = str(sheet_name).lower()
-    if "subject level metrics" in s_name: return "raw_cpid_metrics"
-    if "protocol deviation" in s_name: return "raw_protocol_deviations"
-    if "sae dashboard" in s_name: return "raw_sae_issues"
-    
-    # 2. Check Content (Scans first 20 rows for keywords)
-    # Convert top 20 rows to a single lowercase string for searching
-    sample_text = df.head(20).to_string().lower()
-
-    if "projected date" in sample_text and "outstanding" in sample_text:
-        return "raw_visit_projections"
-    
-    if "missing lab name" in sample_text or "lab category" in sample_text:
-        return "raw_lab_issues"
-    
-    if "no. #days page missing" in sample_text:
-        return "raw_missing_pages"
-        
-    if "audit action" in sample_text and "recordposition" in sample_text:
-        return "raw_inactivated_forms"
-
-    if "total open issue count" in sample_text:
-        return "raw_edrr_issues"
-
-    if "discrepancy id" in sample_text and "action status" in sample_text:
-        return "raw_sae_issues"
-
-    return None
\ No newline at end of file
+    return classify_sheet(df.columns, sheet_name)["dataset"]
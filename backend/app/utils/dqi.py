@@ -0,0 +1,135 @@
+# backend/app/utils/dqi.py
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from backend.app.core.config import DQI_WEIGHTS
+from backend.app.utils.helpers import date_window
+
+COMPONENTS = ("visit", "query", "safety", "coding")
+COUNTS = ("subjects", "visits", "deviations", "open_saes", "coded_terms", "missing_pages", "inactivated_forms")
+
+# Points lost per open item (score floors at 0)
+DEVIATION_PENALTY = 5
+OPEN_SAE_PENALTY = 20
+
+# Placeholder ingest uses for rows without a site, so they still group (and hash-join) together
+UNKNOWN_SITE = "Unknown Site"
+
+_unweighted = [c for c in COMPONENTS if c not in DQI_WEIGHTS]
+if _unweighted:
+    raise ValueError(f"DQI_WEIGHTS is missing components: {_unweighted}")
+
+
+def build_sql(date_from=None, date_to=None, sites: bool = False) -> tuple:
+    """
+    One pass per source table: each is aggregated once for the study (GROUP BY site)
+    and the per-site results are joined, instead of a correlated subquery per site.
+    Every table is attributed to sites through the study's subjects (the subject's current
+    site), so rows whose own site_id column disagrees or has no subjects are still counted.
+    sites=True limits everything to the sites in :sites (incremental rollup refresh).
+    Returns (sql, extra bind params); the query itself takes :study.
+    """
+    mp_window, params = date_window("mp.visit_date", date_from, date_to)
+    pd_window, _ = date_window("pd.visit_date", date_from, date_to)
+    vp_window, _ = date_window("vp.projected_date", date_from, date_to)
+    site_filter = "AND COALESCE({col}, '" + UNKNOWN_SITE + "') = ANY(CAST(:sites AS text[]))" if sites else ""
+    sql = f"""
+    WITH study_subjects AS (
+        SELECT subject_id, COALESCE(site_id, '{UNKNOWN_SITE}') AS site_id
+        FROM subjects WHERE study_name = :study {site_filter.format(col="site_id")}
+    ),
+    sites AS (
+        SELECT site_id, COUNT(*) AS total FROM study_subjects GROUP BY site_id
+    ),
+    visits AS (
+        -- Overdue days recomputed from the projected date; the exported snapshot only when it didn't parse
+        SELECT ss.site_id,
+               COUNT(*) AS total,
+               SUM(CASE WHEN COALESCE(CURRENT_DATE - vp.projected_date, vp.days_outstanding) <= 0
+                        THEN 1 ELSE 0 END) AS on_time
+        FROM raw_visit_projections vp
+        JOIN study_subjects ss ON ss.subject_id = vp.subject_id
+        WHERE vp.study_name = :study{vp_window}
+        GROUP BY ss.site_id
+    ),
+    deviations AS (
+        SELECT ss.site_id, COUNT(*) AS total
+        FROM raw_protocol_deviations pd
+        JOIN study_subjects ss ON ss.subject_id = pd.subject_id
+        WHERE pd.study_name = :study{pd_window}
+        GROUP BY ss.site_id
+    ),
+    missing AS (
+        SELECT ss.site_id, COUNT(*) AS total
+        FROM raw_missing_pages mp
+        JOIN study_subjects ss ON ss.subject_id = mp.subject_id
+        WHERE mp.study_name = :study{mp_window}
+        GROUP BY ss.site_id
+    ),
+    open_saes AS (
+        SELECT ss.site_id, COUNT(*) AS total
+        FROM raw_sae_safety sae
+        JOIN study_subjects ss ON ss.subject_id = sae.subject_id
+        WHERE sae.case_status = 'Open'
+        GROUP BY ss.site_id
+    ),
+    coding AS (
+        SELECT ss.site_id,
+               COUNT(*) AS total,
+               SUM(CASE WHEN cm.coding_status = 'Coded' THEN 1 ELSE 0 END) AS coded
+        FROM raw_coding_meddra cm
+        JOIN study_subjects ss ON ss.subject_id = cm.subject_id
+        GROUP BY ss.site_id
+    ),
+    inactivated AS (
+        SELECT ss.site_id, COUNT(*) AS total
+        FROM raw_inactivated_forms f
+        JOIN study_subjects ss ON ss.subject_id = f.subject_id
+        GROUP BY ss.site_id
+    )
+    SELECT
+        s.site_id,
+        COALESCE(CAST(v.on_time AS FLOAT) / NULLIF(v.total, 0) * 100, 100) AS visit_score,
+        GREATEST(0, 100 - COALESCE(d.total, 0) * {DEVIATION_PENALTY}) AS query_score,
+        GREATEST(0, 100 - COALESCE(sae.total, 0) * {OPEN_SAE_PENALTY}) AS safety_score,
+        COALESCE(CAST(c.coded AS FLOAT) / NULLIF(c.total, 0) * 100, 100) AS coding_score,
+        s.total AS subjects,
+        COALESCE(v.total, 0) AS visits,
+        COALESCE(d.total, 0) AS deviations,
+        COALESCE(sae.total, 0) AS open_saes,
+        COALESCE(c.total, 0) AS coded_terms,
+        COALESCE(m.total, 0) AS missing_pages,
+        COALESCE(i.total, 0) AS inactivated_forms
+    FROM sites s
+    LEFT JOIN visits v ON v.site_id = s.site_id
+    LEFT JOIN deviations d ON d.site_id = s.site_id
+    LEFT JOIN missing m ON m.site_id = s.site_id
+    LEFT JOIN open_saes sae ON sae.site_id = s.site_id
+    LEFT JOIN coding c ON c.site_id = s.site_id
+    LEFT JOIN inactivated i ON i.site_id = s.site_id
+    """
+    return sql, params
+
+
+def score_rows(rows) -> list:
+    """
+    Mapping rows with <component>_score + COUNTS columns (live query or site_rollup)
+    -> [{"site_id", "dqi", "components": {...}, "counts": {...}}], lowest DQI first.
+    The weighted DQI is computed here, so DQI_WEIGHTS changes apply without a rebuild.
+    """
+    sites = []
+    for row in rows:
+        components = {name: round(float(row[f"{name}_score"]), 1) for name in COMPONENTS}
+        sites.append({
+            "site_id": row["site_id"],
+            "dqi": round(sum(components[name] * DQI_WEIGHTS[name] for name in COMPONENTS)),
+            "components": components,
+            "counts": {key: int(row[key]) for key in COUNTS}
+        })
+    sites.sort(key=lambda s: s["dqi"])
+    return sites
+
+
+def site_scores(db: Session, study: str, date_from=None, date_to=None) -> list:
+    """ Live per-site DQI with all four component scores (used for date windows; see site_rollup) """
+    sql, params = build_sql(date_from, date_to)
+    return score_rows(db.execute(text(sql), {"study": study, **params}).mappings().fetchall())
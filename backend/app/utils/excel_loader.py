@@ -0,0 +1,157 @@
+# backend/app/utils/excel_loader.py
+import os
+import shutil
+import logging
+import tempfile
+import importlib.util
+import pandas as pd
+from backend.app.core.config import SHEET_PREVIEW_ROWS, CSV_CHUNK_ROWS, UPLOAD_SPOOL_MAX_MEMORY_MB, EXCEL_READER_ENGINE
+
+# Rust-based calamine reader (pandas >= 2.2 + python-calamine); optional, openpyxl is the fallback
+CALAMINE_AVAILABLE = importlib.util.find_spec("python_calamine") is not None
+
+logger = logging.getLogger(__name__)
+
+CALAMINE_SUFFIXES = (".xlsx", ".xlsm", ".xlsb", ".xls", ".ods")
+
+
+def engine_chain(filename: str, preferred: str = EXCEL_READER_ENGINE) -> list:
+    """
+    Excel engines to try, fastest first. None = pandas' default for the file type
+    (openpyxl in read-only mode for .xlsx, xlrd for .xls), which is always the last resort.
+    """
+    ext = os.path.splitext(filename or "")[1].lower()
+    chain = []
+    if preferred in ("auto", "calamine") and CALAMINE_AVAILABLE and ext in CALAMINE_SUFFIXES:
+        chain.append("calamine")
+    if preferred not in ("auto", "calamine", "default"):
+        chain.append(preferred)  # explicit engine, e.g. 'openpyxl'
+    chain.append(None)
+    return chain
+
+
+def spool_stream(fileobj, max_memory_mb: int = UPLOAD_SPOOL_MAX_MEMORY_MB):
+    """
+    Copies a (possibly non-seekable) stream into a SpooledTemporaryFile:
+    small uploads stay in memory, anything larger rolls over to disk.
+    """
+    spooled = tempfile.SpooledTemporaryFile(max_size=max_memory_mb * 1024 * 1024, prefix="clarity_spool_")
+    shutil.copyfileobj(fileobj, spooled, 1024 * 1024)
+    spooled.seek(0)
+    return spooled
+
+
+def is_seekable(fileobj) -> bool:
+    try:
+        return fileobj.seekable()
+    except (AttributeError, ValueError):
+        return False
+
+
+class SpreadsheetSource:
+    """
+    Two-phase access to an uploaded CSV/Excel file:
+    1. preview(): only the first rows of a sheet (header detection + classification)
+    2. parse():   the full sheet, called only for sheets that matched a dataset
+       (CSVs can instead be streamed with iter_chunks() to bound memory)
+    """
+
+    def __init__(self, file, filename: str, engine: str = None):
+        self.file = file
+        self.filename = filename
+        self.is_csv = filename.lower().endswith('.csv')
+        self._csv_sep = None
+        self._xl = None
+        self._previews = {}  # (sheet, nrows) -> frame; study detection and Phase 1 share them
+        self.fallback_reason = None
+
+        if self.is_csv:
+            self.engine = "csv"
+            self.sheet_names = ["Sheet1"]
+        else:
+            # engine: reuse a choice already made for this file (e.g. by the sheet pool)
+            self._engines = [engine] if engine else engine_chain(filename)
+            self._open_workbook()
+            self.sheet_names = self._xl.sheet_names
+
+    def _open_workbook(self):
+        """ Opens with the first engine in the chain that accepts the file """
+        while True:
+            engine = self._engines[0]
+            try:
+                # Hand pandas the file object itself; no extra in-memory copy of the bytes
+                self.file.seek(0)
+                self._xl = pd.ExcelFile(self.file, engine=engine)
+                self.engine = self._xl.engine
+                return
+            except Exception as e:
+                if len(self._engines) == 1:
+                    raise
+                self._fall_back(e)
+
+    def _fall_back(self, error: Exception):
+        failed = self._engines.pop(0)
+        self.fallback_reason = f"{failed}: {error}"
+        logger.warning(f"{self.filename}: {failed} reader failed ({error}); falling back to {self._engines[0] or 'default'}")
+
+    def _parse_excel(self, sheet_name: str, **kwargs) -> pd.DataFrame:
+        try:
+            return self._xl.parse(sheet_name, header=None, **kwargs)
+        except Exception as e:
+            # e.g. a sheet feature the fast reader doesn't support: retry this file on the next engine
+            if len(self._engines) == 1:
+                raise
+            self._fall_back(e)
+            self._open_workbook()
+            return self._parse_excel(sheet_name, **kwargs)
+
+    def _read_csv(self, **kwargs) -> pd.DataFrame:
+        # Comma first, then semicolon (European exports); remember what worked
+        for sep in ([self._csv_sep] if self._csv_sep else [",", ";"]):
+            self.file.seek(0)
+            try:
+                df = pd.read_csv(self.file, sep=sep, header=None, low_memory=False, **kwargs)
+                self._csv_sep = sep
+                return df
+            except Exception:
+                if sep == ";" or self._csv_sep:
+                    raise
+        return pd.DataFrame()
+
+    def preview(self, sheet_name: str, nrows: int = SHEET_PREVIEW_ROWS) -> pd.DataFrame:
+        key = (sheet_name, nrows)
+        if key not in self._previews:
+            if self.is_csv:
+                self._previews[key] = self._read_csv(nrows=nrows)
+            else:
+                self._previews[key] = self._parse_excel(sheet_name, nrows=nrows)
+        return self._previews[key]
+
+    def parse(self, sheet_name: str) -> pd.DataFrame:
+        if self.is_csv:
+            return self._read_csv()
+        return self._parse_excel(sheet_name)
+
+    def iter_chunks(self, skiprows: int = 0, chunksize: int = CSV_CHUNK_ROWS):
+        """
+        CSV only: yields the rows below `skiprows` in frames of at most `chunksize` rows.
+        `skiprows` counts rows as preview() does (blank lines ignored), not physical lines.
+        """
+        if not self.is_csv:
+            raise ValueError("iter_chunks() is only supported for CSV files")
+        if self._csv_sep is None:
+            self.preview(self.sheet_names[0])  # settles the separator
+        self.file.seek(0)
+        # dtype=object keeps every chunk typed like parse() would; the dtype plan casts afterwards.
+        # read_csv's own skiprows counts physical lines, so the rows are dropped here instead
+        reader = pd.read_csv(self.file, sep=self._csv_sep, header=None, dtype=object, chunksize=chunksize)
+        remaining = skiprows
+        with reader:
+            for chunk in reader:
+                if remaining:
+                    dropped = min(remaining, len(chunk))
+                    chunk = chunk.iloc[dropped:]
+                    remaining -= dropped
+                    if chunk.empty:
+                        continue
+                yield chunk
@@ -0,0 +1,18 @@
+# backend/app/utils/helpers.py
+import datetime
+
+
+def date_window(column: str, date_from: datetime.date = None, date_to: datetime.date = None) -> tuple:
+    """
+    ' AND <column> >= :date_from AND <column> <= :date_to' for whichever bounds are given,
+    plus their bind params. Only present bounds become SQL, so the planner sees a plain
+    range it can serve from the (study_name, <date column>) indexes (migrations/0003_native_dates.sql).
+    """
+    clauses, params = [], {}
+    if date_from is not None:
+        clauses.append(f"{column} >= :date_from")
+        params["date_from"] = date_from
+    if date_to is not None:
+        clauses.append(f"{column} <= :date_to")
+        params["date_to"] = date_to
+    return "".join(f" AND {clause}" for clause in clauses), params
@@ -200,120 +200,652 @@
 
 import pandas as pd
 import numpy as np
+import os
 import re
+import time
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from sqlalchemy.orm import Session
-from sqlalchemy import text, inspect
-from backend.app.utils.dataset_registry import DATASET_SPECS
-from backend.app.utils.smart_mapper import normalize_dataframe_columns, TARGET_SCHEMA
+from sqlalchemy import text, bindparam
+from backend.app.core import schema_registry
+from backend.app.utils.dataset_registry import DATASET_SPECS, get_dtype_plan
+from backend.app.utils.smart_mapper import normalize_dataframe_columns, build_rename_map, flush_mapping_cache
+from backend.app.utils.detect_dataset import classify_sheet, dataset_rename_map, HEADER_KEYWORDS
+from backend.app.utils.bulk_loader import bulk_insert_dataframe
+from backend.app.utils.excel_loader import SpreadsheetSource, spool_stream, is_seekable
+from backend.app.utils import ingest_ledger, data_versions, subject_analytics, site_rollup
+from backend.app.core.config import CSV_CHUNK_ROWS, INGEST_SHEET_WORKERS
+from backend.app.core.database import engine
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+STUDY_PATTERN = re.compile(r"(Study)\s?(\d+)", re.IGNORECASE)
+
+# Sheet-pool size for this process; ingest job workers lower it to their share
+_sheet_workers = INGEST_SHEET_WORKERS
+
+def set_sheet_workers(workers: int):
+    """ Caps the sheet pool started by ingest_file in this process (1 = parse sequentially) """
+    global _sheet_workers
+    _sheet_workers = max(1, workers)
+
+def _match_study(value):
+    """ 'study2', 'STUDY 2', 'Study 2 - Oncology' -> 'Study 2' """
+    match = STUDY_PATTERN.search(str(value))
+    return f"Study {match.group(2)}" if match else None
+
 # --- 1. FILENAME DETECTION (The Fast Way) ---
 def extract_study_from_filename(filename: str):
     """ Extracts 'Study 1' from 'Study 1_Visit_Tracker.csv' """
-    match = re.search(r"(Study\s?\d+)", filename, re.IGNORECASE)
-    if match:
-        raw = match.group(1)
-        if " " not in raw: raw = raw.replace("Study", "Study ")
-        return raw.title()
-    return None
+    return _match_study(filename)
 
 # --- 2. CONTENT DETECTION (The Smart Fallback) ---
-def extract_study_from_content(dfs: dict):
+def extract_study_from_content(source: SpreadsheetSource):
     """ 
     Looks inside the Excel/CSV data for a 'Project Name' or 'Study' column.
     Useful when the filename is generic like 'Inactivated_Rows.xlsx'.
+    Only the preview rows of each sheet are read (CSV nrows / read-only workbook),
+    the header mapping comes from the mapper cache, and the previews are reused by Phase 1.
     """
-    for sheet_name, df in dfs.items():
-        # Make a copy and normalize to find hidden 'study_name' columns
+    for sheet_name in source.sheet_names:
         try:
-            temp_df = df.copy()
-            # Try finding header in first few rows
-            header_idx = find_header_row(temp_df)
-            new_header = temp_df.iloc[header_idx]
-            temp_df = temp_df[header_idx + 1:]
-            temp_df.columns = new_header
-            
-            # Normalize to see if we have 'study_name'
-            temp_df = normalize_dataframe_columns(temp_df)
-            
-            if 'study_name' in temp_df.columns:
-                # Get the first value (e.g., "Study 2")
-                unique_vals = temp_df['study_name'].dropna().unique()
-                for val in unique_vals:
-                    val_str = str(val).strip()
-                    # Validate it looks like "Study X"
-                    if re.match(r"Study\s?\d+", val_str, re.IGNORECASE):
-                        # Standardize format to "Study X"
-                        match = re.search(r"(Study\s?\d+)", val_str, re.IGNORECASE)
-                        raw = match.group(1)
-                        if " " not in raw: raw = raw.replace("Study", "Study ")
-                        return raw.title()
+            preview = source.preview(sheet_name)
+            if preview.empty:
+                continue
+            header_idx, header = detect_header(preview)
+            labels = [str(h).strip() for h in header]
+            rename_map = build_rename_map(labels)
+            study_cols = [i for i, label in enumerate(labels) if rename_map.get(label) == 'study_name']
+
+            # Values under a 'Project Name'/'Study' column, then title rows ("Protocol: Study 2")
+            candidates = list(preview.iloc[header_idx + 1:, study_cols].stack()) if study_cols else []
+            candidates += list(preview.iloc[:header_idx].stack()) if header_idx else []
+            for val in candidates:
+                study = _match_study(val)
+                if study:
+                    return study
         except Exception:
             continue # If this sheet fails, try the next one
 
     return None
 
+def _normalize_cells(block: pd.DataFrame) -> pd.DataFrame:
+    """ Vectorized normalize_header() over a block of cells (NaN becomes 'nan', never a keyword) """
+    cells = block.astype(str).stack()
+    cells = cells.str.replace(r"\s+", " ", regex=True).str.strip().str.lower()
+    return cells.unstack().reindex(index=block.index, columns=block.columns)
+
+def detect_header(df: pd.DataFrame, max_scan: int = 20) -> tuple:
+    """
+    Finds the header in the top `max_scan` rows with one vectorized lookup against
+    the prebuilt HEADER_KEYWORDS index. Also tries every pair of adjacent rows as a
+    merged 2-row header ('Subject' over 'ID' -> 'Subject ID'; group labels over names).
+    Returns (last_header_row, labels): data starts at last_header_row + 1.
+    """
+    block = df.iloc[:max_scan].reset_index(drop=True)
+    if block.empty:
+        return 0, pd.Series(dtype=object)
+
+    cells = _normalize_cells(block)
+    is_keyword = cells.isin(HEADER_KEYWORDS)
+    single_hits = is_keyword.sum(axis=1)
+
+    best_idx = int(single_hits.idxmax())
+    best_hits = int(single_hits.max())
+    labels = block.iloc[best_idx]
+
+    if len(block) > 1:
+        # Merged cells only carry their value in the first column -> forward-fill the upper row
+        upper = block.ffill(axis=1).iloc[:-1].reset_index(drop=True)
+        lower = block.iloc[1:].reset_index(drop=True)
+        upper_cells = cells.where(block.notna()).ffill(axis=1).iloc[:-1].reset_index(drop=True)
+        lower_cells = cells.iloc[1:].reset_index(drop=True)
+        lower_blank = lower.isna().to_numpy()
+
+        combined_cells = upper_cells.astype(str) + " " + lower_cells.astype(str)
+        combined_hit = combined_cells.isin(HEADER_KEYWORDS).to_numpy()
+        lower_hit = is_keyword.iloc[1:].to_numpy()
+        upper_hit = upper_cells.isin(HEADER_KEYWORDS).to_numpy() & lower_blank
+        pair_hits = (combined_hit | lower_hit | upper_hit).sum(axis=1)
+
+        # A pair only wins if it beats every single row (ties keep the 1-row header)
+        pair_idx = int(pair_hits.argmax())
+        if pair_hits[pair_idx] > best_hits and combined_hit[pair_idx].any():
+            best_hits = int(pair_hits[pair_idx])
+            best_idx = pair_idx + 1
+            combined = upper.iloc[pair_idx].astype(str) + " " + lower.iloc[pair_idx].astype(str)
+            labels = pd.Series(
+                np.where(combined_hit[pair_idx], combined,
+                         np.where(lower_blank[pair_idx], upper.iloc[pair_idx], lower.iloc[pair_idx])),
+                index=block.columns
+            )
+
+    if best_hits < 2:
+        return 0, block.iloc[0]
+    return best_idx, labels
+
 def find_header_row(df, max_scan=20):
-    """ Scans top 20 rows to find the real header row """
-    best_idx = 0
-    max_matches = 0
-    all_keywords = [item for sublist in TARGET_SCHEMA.values() for item in sublist]
+    """ Scans top 20 rows to find the real header row (the last one for merged headers) """
+    return detect_header(df, max_scan)[0]
+
+# Set-based upsert: one statement per sheet instead of one round trip per subject.
+# Only subjects still parked on 'Unknown Site' get their site overwritten.
+SUBJECT_UPSERT_PG = text("""
+    INSERT INTO subjects (subject_id, site_id, study_name, status)
+    SELECT t.uid, t.site, :study, 'Active'
+    FROM unnest(CAST(:uids AS text[]), CAST(:sites AS text[])) AS t(uid, site)
+    ON CONFLICT (subject_id) 
+    DO UPDATE SET site_id = EXCLUDED.site_id 
+    WHERE subjects.site_id IS NULL OR subjects.site_id = 'Unknown Site';
+""")
+
+# Portable fallback (SQLite stand-ins etc.): same statement, sent as one executemany batch
+SUBJECT_UPSERT_VALUES = text("""
+    INSERT INTO subjects (subject_id, site_id, study_name, status)
+    VALUES (:uid, :site, :study, 'Active')
+    ON CONFLICT (subject_id) 
+    DO UPDATE SET site_id = EXCLUDED.site_id 
+    WHERE subjects.site_id IS NULL OR subjects.site_id = 'Unknown Site';
+""")
+
+def _diagnose_subject_batch(db: Session, subjects: pd.DataFrame, study_name: str, error: Exception):
+    """
+    Runs once when a bulk upsert fails: flags suspicious rows in a single pass
+    instead of logging one error per subject.
+    """
+    local_ids = subjects['uid'].str.replace(f"^{re.escape(study_name)}_", "", regex=True)
+    blank_ids = subjects.loc[local_ids.isin(["", "nan", "None"]), 'uid'].tolist()
+
+    foreign_ids = []
+    try:
+        sql = text("SELECT subject_id, study_name FROM subjects WHERE subject_id IN :uids AND study_name <> :study")
+        sql = sql.bindparams(bindparam("uids", expanding=True))
+        # Savepoint: diagnostics must not abort a chunked load's open transaction
+        with db.begin_nested():
+            rows = db.execute(sql, {"uids": subjects['uid'].tolist(), "study": study_name}).fetchall()
+        foreign_ids = [f"{r[0]} ({r[1]})" for r in rows]
+    except Exception:
+        pass
+
+    logger.error(
+        f"Subject Upsert Failed for {study_name} ({len(subjects)} subjects): {error} | "
+        f"blank ids: {len(blank_ids)} {blank_ids[:5]} | "
+        f"owned by another study: {len(foreign_ids)} {foreign_ids[:5]}"
+    )
+
+def label_columns(df_content: pd.DataFrame, header, dataset_key: str = None) -> pd.DataFrame:
+    """
+    Names the columns from a raw header row, normalizes them and drops duplicates.
+    With a classified dataset, its own COLUMN_MAPPINGS aliases win (pd_status, case_status, ...)
+    and fuzzy TARGET_SCHEMA matching only fills in the remaining headers.
+    """
+    header = list(header)[:len(df_content.columns)]
+    header += [f"unnamed_{i}" for i in range(len(header), len(df_content.columns))]
+    df_content.columns = header
+
+    if dataset_key:
+        df_content.columns = [str(c).strip() for c in df_content.columns]
+        explicit = dataset_rename_map(dataset_key, df_content.columns)
+        fuzzy = build_rename_map([c for c in df_content.columns if c not in explicit])
+        fuzzy = {raw: target for raw, target in fuzzy.items() if target not in explicit.values()}
+        df_clean = df_content.rename(columns={**fuzzy, **explicit})
+    else:
+        df_clean = normalize_dataframe_columns(df_content)
+    return df_clean.loc[:, ~df_clean.columns.duplicated()]
+
+def apply_header(df_raw: pd.DataFrame, header_idx: int, dataset_key: str = None) -> pd.DataFrame:
+    """ Promotes the detected header row, normalizes names and drops duplicate columns """
+    return label_columns(df_raw[header_idx + 1:].copy(), df_raw.iloc[header_idx], dataset_key)
+
+# Unambiguous layouts, tried in order, each as one vectorized pass over the values still unparsed
+DATE_FORMATS = ("%Y-%m-%d", "%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%d-%b-%Y", "%d %b %Y", "%d-%B-%Y",
+                "%Y/%m/%d")
+# dd/mm/yyyy vs mm/dd/yyyy (also with dots) is decided once per column, never per value
+NUMERIC_DATE = r"^(\d{1,2})([/.])(\d{1,2})\2(\d{4})$"
+NUMERIC_DATE_FORMATS = {
+    "day_first": ("%d/%m/%Y", "%d.%m.%Y"),
+    "month_first": ("%m/%d/%Y", "%m.%d.%Y"),
+}
+EXCEL_EPOCH = "1899-12-30"
+
+def _numeric_date_order(values: pd.Series):
+    """
+    'day_first' if some first field is > 12, 'month_first' if some second field is,
+    None when the column never says (all fields <= 12) or says both (mixed layouts).
+    """
+    parts = values.str.extract(NUMERIC_DATE)
+    day_first = bool((pd.to_numeric(parts[0], errors='coerce') > 12).any())
+    month_first = bool((pd.to_numeric(parts[2], errors='coerce') > 12).any())
+    if day_first == month_first:
+        return None
+    return "day_first" if day_first else "month_first"
+
+def _parse_dates(series: pd.Series) -> pd.Series:
+    """
+    Vectorized date parsing for messy exports: Excel serial numbers, then each known
+    unambiguous format, then dd/mm vs mm/dd numeric dates in the one order the column implies.
+    Anything else (ambiguous columns, bare years, free text) becomes NaT; the original
+    text is kept in <col>_raw.
+    """
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return series.dt.normalize()
+
+    values = series.astype("string").str.strip()
+    values = values.mask(values.isin(["", "nan", "NaT", "None"]))
+    parsed = pd.Series(pd.NaT, index=series.index, dtype="datetime64[ns]")
+
+    serials = pd.to_numeric(values, errors='coerce')
+    # 10000 .. 2958465 = 1927-05-18 .. 9999-12-31 (bare years like '2024' are not serials)
+    is_serial = serials.between(10000, 2958465).fillna(False).astype(bool)
+    if is_serial.any():
+        parsed[is_serial] = pd.to_datetime(serials[is_serial].round(), unit='D', origin=EXCEL_EPOCH)
+
+    remaining = values.notna().astype(bool) & ~is_serial
+    order = _numeric_date_order(values[remaining])
+    for fmt in DATE_FORMATS + NUMERIC_DATE_FORMATS.get(order, ()):
+        if not remaining.any():
+            break
+        attempt = pd.to_datetime(values[remaining], format=fmt, errors='coerce')
+        hits = attempt.index[attempt.notna()]
+        parsed[hits] = attempt[hits]
+        remaining[hits] = False
+
+    return parsed.dt.normalize()
+
+def apply_dtype_plan(df: pd.DataFrame, plan: dict, db_types: dict = None) -> pd.DataFrame:
+    """
+    Vectorized casts from the dataset's dtype plan (see dataset_registry).
+    Dates are only parsed when the target column is a real DATE/TIMESTAMP column;
+    for TEXT columns they stay text (as category) so unparseable values aren't lost.
+    When the table has a <col>_raw TEXT column, the source text is kept there as well.
+    """
+    db_types = db_types or {}
+    for col, dtype in plan.items():
+        if col not in df.columns:
+            continue
+        try:
+            if dtype == "date":
+                if str(db_types.get(col, "")).startswith(schema_registry.DATE_TYPES):
+                    if f"{col}_raw" in db_types:
+                        df[f"{col}_raw"] = df[col].astype("string").str.strip().astype("category")
+                    df[col] = _parse_dates(df[col])
+                else:
+                    df[col] = df[col].astype("category")
+            elif dtype in ("Int32", "Int64"):
+                df[col] = pd.to_numeric(df[col], errors='coerce').round().astype(dtype)
+            elif dtype.startswith("float"):
+                df[col] = pd.to_numeric(df[col], errors='coerce').astype(dtype)
+            else:
+                df[col] = df[col].astype(dtype)
+        except Exception as e:
+            logger.warning(f"dtype plan: could not cast {col} to {dtype}: {e}")
+    return df
+
+def _lap(timings: dict, stage: str, started: float) -> float:
+    """ Adds the time since `started` to timings[stage]; returns 'now' for the next stage """
+    now = time.perf_counter()
+    timings[stage] = round(timings.get(stage, 0.0) + (now - started), 4)
+    return now
+
+def _memory_mb(df: pd.DataFrame) -> float:
+    return round(df.memory_usage(deep=True).sum() / (1024 * 1024), 2)
+
+def transform_ids(df_clean: pd.DataFrame, study_name: str) -> pd.DataFrame:
+    """ Tags rows with the study, prefixes subject IDs and sanitizes integer columns """
+    df_clean['study_name'] = study_name
+    
+    if 'subject_id' in df_clean.columns:
+        df_clean['subject_id'] = df_clean['subject_id'].astype(str).str.replace(r'\.0$', '', regex=True).str.strip()
+        # Enforce unique ID format: Study2_1001
+        df_clean['subject_id'] = study_name + "_" + df_clean['subject_id']
     
-    for i in range(min(len(df), max_scan)):
-        row_vals = [str(x).lower().strip() for x in df.iloc[i].values]
-        matches = sum(1 for val in row_vals if val in all_keywords)
-        if matches > max_matches:
-            max_matches = matches
-            best_idx = i
-    return best_idx if max_matches >= 2 else 0
-
-def ensure_subjects_exist(db: Session, df: pd.DataFrame, study_name: str):
+    # SANITIZE INTEGER COLUMNS
+    if 'days_missing' in df_clean.columns:
+        df_clean['days_missing'] = pd.to_numeric(df_clean['days_missing'], errors='coerce').fillna(0)
+    if 'days_outstanding' in df_clean.columns:
+        df_clean['days_outstanding'] = pd.to_numeric(df_clean['days_outstanding'], errors='coerce').fillna(0)
+    return df_clean
+
+def insert_columns(target_table: str, mode: str) -> list:
+    """ Columns of target_table we may write (from the startup registry, no catalog round trip) """
+    if not schema_registry.has_table(target_table):
+        raise ValueError(f"Table {target_table} does not exist")
+    valid_db_cols = schema_registry.column_names(target_table)
+    if mode == "replace" and 'load_id' not in valid_db_cols:
+        raise ValueError(f"{target_table} has no load_id column (run: python -m backend.scripts.migrate upgrade)")
+    return valid_db_cols
+
+def ensure_subjects_exist(db: Session, df: pd.DataFrame, study_name: str, commit: bool = True):
     """
-    Creates subjects in the database.
+    Creates subjects in the database (bulk upsert, one statement per sheet).
+    commit=False runs the upsert in a savepoint of the caller's transaction (chunked loads).
+    Returns the number of distinct subjects staged.
     """
     if 'subject_id' not in df.columns:
-        return
+        return 0
 
-    # Keep Site ID if exists
-    cols_to_keep = ['subject_id']
+    # Build the deduplicated subject frame with vectorized ops (no iterrows)
+    subjects = pd.DataFrame({"uid": df['subject_id'].astype(str).str.strip()})
     if 'site_id' in df.columns:
-        cols_to_keep.append('site_id')
-        
-    subjects = df[cols_to_keep].drop_duplicates(subset=['subject_id'])
-    
-    sql = text("""
-        INSERT INTO subjects (subject_id, site_id, study_name, status)
-        VALUES (:uid, :site, :study, 'Active')
-        ON CONFLICT (subject_id) 
-        DO UPDATE SET site_id = EXCLUDED.site_id 
-        WHERE subjects.site_id IS NULL OR subjects.site_id = 'Unknown Site';
-    """)
-
-    for _, row in subjects.iterrows():
-        unique_id = str(row['subject_id']).strip() 
-        
-        site_val = "Unknown Site"
-        if 'site_id' in subjects.columns and pd.notna(row['site_id']):
-            site_val = str(row['site_id'])
+        sites = df['site_id'].astype(object)
+        subjects['site'] = sites.where(sites.notna(), "Unknown Site").astype(str)
+    else:
+        subjects['site'] = "Unknown Site"
+    subjects = subjects.drop_duplicates(subset=['uid'])
+
+    def upsert():
+        if db.get_bind().dialect.name == "postgresql":
+            db.execute(SUBJECT_UPSERT_PG, {
+                "uids": subjects['uid'].tolist(),
+                "sites": subjects['site'].tolist(),
+                "study": study_name
+            })
+        else:
+            db.execute(SUBJECT_UPSERT_VALUES, [
+                {"uid": uid, "site": site, "study": study_name}
+                for uid, site in zip(subjects['uid'], subjects['site'])
+            ])
+
+    try:
+        if commit:
+            upsert()
+            db.commit()
+        else:
+            with db.begin_nested():
+                upsert()
+    except Exception as e:
+        if commit:
+            db.rollback()
+        _diagnose_subject_batch(db, subjects, study_name, e)
+        return 0
+
+    return len(subjects)
+
+def prepare_sheet(source: SpreadsheetSource, sheet_name: str, header_idx: int, header, dataset_key: str,
+                  study_name: str, db_types: dict, timings: dict) -> tuple:
+    """
+    Parse -> header/mapping -> dtype plan -> ID transform for one classified sheet.
+    No DB access, so sheets can be prepared side by side on the sheet pool.
+    Returns (df_clean, memory_mb_before, memory_mb_after, seconds).
+    """
+    started = time.perf_counter()
+    # 1. Header & Normalize (mapping is served from the header cache)
+    df_raw = source.parse(sheet_name)
+    t = _lap(timings, "parse", started)
+    df_clean = label_columns(df_raw[header_idx + 1:].copy(), header, dataset_key)
+    del df_raw
+    t = _lap(timings, "mapping", t)
+
+    # Typed columns instead of object dtype everywhere (less memory, smaller payload)
+    memory_before = _memory_mb(df_clean)
+    df_clean = apply_dtype_plan(df_clean, get_dtype_plan(dataset_key), db_types)
+    memory_after = _memory_mb(df_clean)
+    t = _lap(timings, "dtypes", t)
+
+    # 3. Transform IDs (Uses the study_name we passed in!)
+    df_clean = transform_ids(df_clean, study_name)
+    t = _lap(timings, "transform", t)
+    return df_clean, memory_before, memory_after, round(t - started, 4)
+
+# --- PARALLEL SHEET PREPARATION ---
+def _init_sheet_worker():
+    # Forked from an ingest worker: never touch the parent's pooled DB connections
+    engine.dispose(close=False)
+
+def _prepare_sheet_from_path(path: str, filename: str, sheet_name: str, header_idx: int, header, dataset_key: str,
+                             study_name: str, db_types: dict, timings: dict, reader_engine: str = None) -> tuple:
+    """ Sheet-pool entry point: each worker opens the workbook itself (only the path is pickled) """
+    with open(path, "rb") as fh:
+        source = SpreadsheetSource(fh, filename, engine=reader_engine)
+        df_clean, memory_before, memory_after, seconds = prepare_sheet(
+            source, sheet_name, header_idx, header, dataset_key, study_name, db_types, timings)
+    return df_clean, memory_before, memory_after, seconds, timings, source.engine
+
+def _local_path(fileobj):
+    """ Path of an on-disk upload (background jobs), or None for in-memory / spooled files """
+    path = getattr(fileobj, "name", None)
+    return path if isinstance(path, str) and os.path.isfile(path) else None
+
+def _start_sheet_pool(fileobj, source: SpreadsheetSource, sheet_plans: list, filename: str, study_name: str):
+    """
+    Submits every classified Excel sheet to a process pool when the workbook is on disk
+    and has more than one sheet to load. Returns (pool, {sheet_name: future}) or (None, {}).
+    """
+    path = _local_path(fileobj)
+    workers = min(_sheet_workers, len(sheet_plans))
+    if source.is_csv or path is None or workers < 2:
+        return None, {}
+
+    try:
+        pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(),
+                                   initializer=_init_sheet_worker)
+    except Exception as e:
+        logger.warning(f"Sheet pool unavailable, parsing sequentially: {e}")
+        return None, {}
+
+    futures = {}
+    for plan in sheet_plans:
+        db_types = schema_registry.get_columns(DATASET_SPECS[plan["dataset"]]["table"])
+        futures[plan["sheet"]] = pool.submit(_prepare_sheet_from_path, path, filename, plan["sheet"], plan["header_idx"],
+                                             plan["header"], plan["dataset"], study_name, db_types, plan["timings"],
+                                             source.engine)
+    return pool, futures
+
+def _load_csv_in_chunks(db: Session, source: SpreadsheetSource, sheet_name: str, skiprows: int, header,
+                        dataset_key: str, study_name: str, filename: str, mode: str, timings: dict,
+                        touched: set) -> dict:
+    """
+    Bounded-memory load for CSVs: CSV_CHUNK_ROWS rows at a time go through
+    mapping -> dtypes -> transform -> subjects -> insert, so only one chunk is ever in memory.
+    All chunks share ONE transaction (and load_id); the sheet fingerprint is built
+    incrementally and checked before commit, so an unchanged file leaves no rows behind.
+    Subjects of inserted (and replaced) rows are added to `touched`.
+    """
+    target_table = DATASET_SPECS[dataset_key]["table"]
+    plan = get_dtype_plan(dataset_key)
+    db_types = schema_registry.get_columns(target_table)
+    int_columns = schema_registry.integer_columns(target_table)
+    valid_db_cols = insert_columns(target_table, mode)
+
+    load_id = ingest_ledger.new_load_id()
+    hasher = ingest_ledger.FrameHasher()
+    outcome = {
+        "sheet": sheet_name, "dataset": dataset_key, "load_id": load_id, "replaced_rows": 0,
+        "rows": 0, "chunks": 0, "seconds": 0.0, "method": "skipped", "memory_mb_peak": 0.0, "timings": timings
+    }
+
+    try:
+        if mode == "replace":
+            outcome["replaced_rows"] = ingest_ledger.replace_previous_loads(db, study_name, filename, sheet_name,
+                                                                            target_table, touched)
+
+        t = time.perf_counter()
+        for chunk in source.iter_chunks(skiprows=skiprows):
+            t = _lap(timings, "parse", t)
+            df_clean = label_columns(chunk, header, dataset_key)
+            t = _lap(timings, "mapping", t)
+            df_clean = apply_dtype_plan(df_clean, plan, db_types)
+            outcome["memory_mb_peak"] = max(outcome["memory_mb_peak"], _memory_mb(df_clean))
+            t = _lap(timings, "dtypes", t)
+            df_clean = transform_ids(df_clean, study_name)
+            t = _lap(timings, "transform", t)
+            hasher.update(df_clean)
+            t = _lap(timings, "fingerprint", t)
+            ensure_subjects_exist(db, df_clean, study_name, commit=False)
+            _collect_subjects(df_clean, touched)
+            t = _lap(timings, "subjects", t)
+
+            df_clean['load_id'] = load_id
+            stats = bulk_insert_dataframe(db, df_clean[[c for c in df_clean.columns if c in valid_db_cols]],
+                                          target_table, int_columns=int_columns)
+            outcome["rows"] += stats["rows"]
+            outcome["seconds"] += stats["seconds"]
+            outcome["method"] = stats["method"] if stats["method"] != "skipped" else outcome["method"]
+            outcome["chunks"] += 1
+            del df_clean, chunk
+            t = _lap(timings, "insert", t)
+
+        sheet_hash = hasher.hexdigest()
+        if ingest_ledger.find_entry(db, ingest_ledger.SHEET_SCOPE, sheet_hash, study_name, dataset_key):
+            db.rollback()
+            return {**outcome, "rows": 0, "replaced_rows": 0, "method": "unchanged"}
+
+        ingest_ledger.record_entry(db, ingest_ledger.SHEET_SCOPE, sheet_hash, study_name, filename,
+                                   sheet_name=sheet_name, dataset_key=dataset_key, row_count=outcome["rows"],
+                                   load_id=load_id, target_table=target_table, mode=mode)
+        data_versions.bump(db, study_name)  # cached analytics for this study are now stale
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+
+    outcome["seconds"] = round(outcome["seconds"], 3)
+    outcome["rows_per_sec"] = int(outcome["rows"] / outcome["seconds"]) if outcome["seconds"] > 0 else outcome["rows"]
+    return outcome
+
+def _collect_subjects(df: pd.DataFrame, touched: set):
+    if 'subject_id' in df.columns:
+        touched.update(df['subject_id'].dropna().unique().tolist())
+
+def _load_sheet(db: Session, source: SpreadsheetSource, plan: tuple, prepared, study_name: str, filename: str,
+                mode: str, results: list, sheet_stats: list, progress, touched: set) -> int:
+    """
+    Loads one classified sheet (in priority order). `prepared` is the sheet-pool
+    future when the sheet was parsed in parallel, else None (parse here).
+    Appends to results/sheet_stats and the loaded subjects to `touched`;
+    returns 1 when the sheet failed, else 0.
+    """
+    sheet_name, header_idx, header = plan["sheet"], plan["header_idx"], plan["header"]
+    dataset_key, timings = plan["dataset"], plan["timings"]
+    sheet_start = time.perf_counter()
 
+    # CSVs stream through the pipeline in chunks instead of one full DataFrame
+    if source.is_csv and CSV_CHUNK_ROWS > 0:
         try:
-            db.execute(sql, {"uid": unique_id, "site": site_val, "study": study_name})
+            outcome = _load_csv_in_chunks(db, source, sheet_name, header_idx + 1, header, dataset_key,
+                                          study_name, filename, mode, timings, touched)
         except Exception as e:
-            logger.error(f"Subject Insert Error: {e}")
-    
+            results.append(f"❌ {sheet_name}: {str(e)}")
+            _emit(progress, event="sheet_failed", sheet=sheet_name, dataset=dataset_key, error=str(e))
+            return 1
+
+        outcome["wall_seconds"] = round(time.perf_counter() - sheet_start, 3)
+        outcome["confidence"] = plan["confidence"]
+        outcome["engine"] = source.engine
+        if outcome["method"] == "unchanged":
+            results.append(f"⏭️ {dataset_key}: {sheet_name} unchanged")
+            sheet_stats.append(outcome)
+            _emit(progress, event="sheet_skipped", sheet=sheet_name, dataset=dataset_key, reason="unchanged")
+            return 0
+
+        replaced_note = f", replaced {outcome['replaced_rows']} old rows" if mode == "replace" else ""
+        results.append(f"✅ {dataset_key}: Loaded {outcome['rows']} rows in {outcome['chunks']} chunks ({outcome['rows_per_sec']:,} rows/s via {outcome['method']}{replaced_note}, peak chunk memory {outcome['memory_mb_peak']} MB)")
+        sheet_stats.append(outcome)
+        _emit(progress, event="sheet_loaded", sheet=sheet_name, dataset=dataset_key,
+              rows=outcome['rows'], seconds=outcome["wall_seconds"])
+        return 0
+
+    # 1-3. Parse, normalize, type and transform (already running on the sheet pool if there is one)
+    # 2. Detect Dataset -> already done in Phase 1 (dataset_key)
+    target_table = DATASET_SPECS[dataset_key]["table"]
+    reader_engine = source.engine
     try:
+        if prepared is not None:
+            df_clean, memory_before, memory_after, prepare_seconds, worker_timings, reader_engine = prepared.result()
+            timings.update(worker_timings)
+        else:
+            df_clean, memory_before, memory_after, prepare_seconds = prepare_sheet(
+                source, sheet_name, header_idx, header, dataset_key, study_name, schema_registry.get_columns(target_table),
+                timings)
+        load_start = t = time.perf_counter()
+
+        # Same normalized content already loaded for this study? Skip it.
+        sheet_hash = ingest_ledger.frame_fingerprint(df_clean)
+        t = _lap(timings, "fingerprint", t)
+        if ingest_ledger.find_entry(db, ingest_ledger.SHEET_SCOPE, sheet_hash, study_name, dataset_key):
+            results.append(f"⏭️ {dataset_key}: {sheet_name} unchanged")
+            sheet_stats.append({"sheet": sheet_name, "dataset": dataset_key, "confidence": plan["confidence"],
+                                "engine": reader_engine, "rows": 0, "method": "unchanged", "timings": timings,
+                                "wall_seconds": round(prepare_seconds + time.perf_counter() - load_start, 3)})
+            _emit(progress, event="sheet_skipped", sheet=sheet_name, dataset=dataset_key, reason="unchanged")
+            return 0
+
+        # 4. Create Subjects
+        ensure_subjects_exist(db, df_clean, study_name)
+        t = _lap(timings, "subjects", t)
+
+        # 5. Insert Data
+        load_id = ingest_ledger.new_load_id()
+        df_clean['load_id'] = load_id
+        valid_db_cols = insert_columns(target_table, mode)
+        columns_to_keep = [c for c in df_clean.columns if c in valid_db_cols]
+        df_final = df_clean[columns_to_keep]
+
+        # Replace: delete previous load + insert new rows + ledger in ONE transaction
+        replaced = 0
+        if mode == "replace":
+            replaced = ingest_ledger.replace_previous_loads(db, study_name, filename, sheet_name, target_table, touched)
+
+        # Streamed COPY (or batched executemany) instead of one giant INSERT
+        stats = bulk_insert_dataframe(db, df_final, target_table,
+                                      int_columns=schema_registry.integer_columns(target_table))
+        ingest_ledger.record_entry(db, ingest_ledger.SHEET_SCOPE, sheet_hash, study_name, filename,
+                                   sheet_name=sheet_name, dataset_key=dataset_key, row_count=stats['rows'],
+                                   load_id=load_id, target_table=target_table, mode=mode)
+        data_versions.bump(db, study_name)  # cached analytics for this study are now stale
         db.commit()
+        _collect_subjects(df_final, touched)
+        t = _lap(timings, "insert", t)
+        wall_seconds = round(prepare_seconds + time.perf_counter() - load_start, 3)
+        replaced_note = f", replaced {replaced} old rows" if mode == "replace" else ""
+        results.append(f"✅ {dataset_key}: Loaded {stats['rows']} rows in {wall_seconds}s ({stats['rows_per_sec']:,} rows/s via {stats['method']}{replaced_note}, memory {memory_before} → {memory_after} MB)")
+        sheet_stats.append({
+            "sheet": sheet_name, "dataset": dataset_key, "confidence": plan["confidence"],
+            "load_id": load_id, "replaced_rows": replaced,
+            "memory_mb_before": memory_before, "memory_mb_after": memory_after, "timings": timings,
+            "engine": reader_engine, "wall_seconds": wall_seconds, **stats
+        })
+        _emit(progress, event="sheet_loaded", sheet=sheet_name, dataset=dataset_key,
+              rows=stats['rows'], seconds=wall_seconds)
+        return 0
     except Exception as e:
         db.rollback()
-        logger.error(f"Subject Commit Failed: {e}")
+        if "Duplicate" not in str(e):
+            results.append(f"❌ {sheet_name}: {str(e)}")
+        _emit(progress, event="sheet_failed", sheet=sheet_name, dataset=dataset_key, error=str(e))
+        return 1
+
+def _emit(progress, **event):
+    """ Reports ingest progress to an optional callback (background jobs poll this) """
+    if progress is None:
+        return
+    try:
+        progress(event)
+    except Exception as e:
+        logger.warning(f"Progress callback failed: {e}")
 
 # --- UPDATE THIS FUNCTION ---
-def ingest_file(file, db: Session, study_name: str = None):
+def ingest_file(file, db: Session, study_name: str = None, progress=None, mode: str = "append"):
+    """
+    mode='append'  -> add rows next to whatever is already loaded
+    mode='replace' -> atomically swap out the rows of the previous load of the same file/sheet
+    """
     filename = file.filename
     results = []
+    sheet_stats = []  # Per-sheet load metrics (rows, seconds, rows/sec)
+    source = None
+
+    # Stage timings for the whole file (per-sheet stages live in sheet_stats[...]['timings'])
+    file_timings = {}
+    file_start = time.perf_counter()
+    t = file_start
+
+    # Raw request/archive streams can't be re-read; spool them (RAM up to a limit, then disk)
+    if not is_seekable(file.file):
+        file.file = spool_stream(file.file)
+        t = _lap(file_timings, "spool", t)
     
     # CASE A: User selected a study in the UI (The "Batch Context" approach)
     if study_name:
@@ -325,101 +857,145 @@ def ingest_file(file, db: Session, study_name: str = None):
         # 1. Try Filename
         study_name = extract_study_from_filename(filename)
         
-        # 2. Try Content
+        # 2. Try Content (first rows of each sheet only; the open source is reused below)
         if not study_name:
-             # We need to load the file early to check content for the name
             try:
-                if filename.endswith('.csv'):
-                    # ... (csv loading logic) ...
-                    pass 
-                else:
-                    # ... (excel loading logic) ...
-                    pass 
-                # (This part gets tricky because we usually load the file later. 
-                #  If using Batch Context, you rarely reach this fallback.)
-                pass
-            except:
-                pass
+                source = SpreadsheetSource(file.file, filename)
+                study_name = extract_study_from_content(source)
+            except Exception as e:
+                logger.warning(f"Study detection from content failed for {filename}: {e}")
+            t = _lap(file_timings, "study_detection", t)
 
     # FINAL CHECK: Do we have a study name now?
     if not study_name:
          return {
             "status": "error", 
-            "reason": f"Study Name is missing. Please select a Study from the dropdown."
+            "reason": "Study Name is missing. Please select a Study from the dropdown."
+        }
+
+    # Re-upload of an identical export? Skip before pandas ever sees it.
+    file_hash = ingest_ledger.file_fingerprint(file.file)
+    t = _lap(file_timings, "fingerprint", t)
+    previous = ingest_ledger.find_entry(db, ingest_ledger.FILE_SCOPE, file_hash, study_name)
+    if previous:
+        return {
+            "status": "unchanged",
+            "details": [f"⏭️ {filename}: unchanged since {previous.created_at} upload ({previous.filename})"],
+            "sheets": [],
+            "study": study_name,
+            "file": filename
         }
 
     try:
-        # Load File (If not already loaded in fallback)
-        dfs = {}
-        file.file.seek(0) # RESET POINTER in case we read it during detection
-        
-        if filename.endswith('.csv'):
-            try:
-                dfs["Sheet1"] = pd.read_csv(file.file, header=None, low_memory=False)
-            except:
-                file.file.seek(0)
-                dfs["Sheet1"] = pd.read_csv(file.file, sep=';', header=None, low_memory=False)
-        else:
-            xl = pd.ExcelFile(file.file.read())
-            for sheet in xl.sheet_names:
-                dfs[sheet] = xl.parse(sheet, header=None)
+        # Open lazily: nothing is fully parsed until a sheet matches a dataset
+        if source is None:
+            source = SpreadsheetSource(file.file, filename)
+        t = _lap(file_timings, "open", t)
 
         # Priority Sort: Metrics first
-        sorted_sheets = sorted(dfs.items(), key=lambda x: 0 if "metrics" in x[0].lower() or "subject" in x[0].lower() else 1)
-
-        for sheet_name, df_raw in sorted_sheets:
-            if df_raw.empty: continue
-
-            # 1. Header & Normalize
-            header_idx = find_header_row(df_raw)
-            new_header = df_raw.iloc[header_idx]
-            df_content = df_raw[header_idx + 1:].copy()
-            df_content.columns = new_header
-            
-            df_clean = normalize_dataframe_columns(df_content)
-            df_clean = df_clean.loc[:, ~df_clean.columns.duplicated()]
-
-            # 2. Detect Dataset
-            dataset_key = None
-            for key, rules in DATASET_SPECS.items():
-                if all(col in df_clean.columns for col in rules['required_columns']):
-                    dataset_key = key
-                    break
-            
-            if not dataset_key: continue 
-
-            # 3. Transform IDs (Uses the study_name we passed in!)
-            df_clean['study_name'] = study_name
-            
-            if 'subject_id' in df_clean.columns:
-                df_clean['subject_id'] = df_clean['subject_id'].astype(str).str.replace(r'\.0$', '', regex=True).str.strip()
-                # Enforce unique ID format: Study2_1001
-                df_clean['subject_id'] = study_name + "_" + df_clean['subject_id']
-            
-            # SANITIZE INTEGER COLUMNS
-            if 'days_missing' in df_clean.columns:
-                df_clean['days_missing'] = pd.to_numeric(df_clean['days_missing'], errors='coerce').fillna(0)
-            if 'days_outstanding' in df_clean.columns:
-                df_clean['days_outstanding'] = pd.to_numeric(df_clean['days_outstanding'], errors='coerce').fillna(0)
-
-            # 4. Create Subjects
-            ensure_subjects_exist(db, df_clean, study_name)
+        sheet_names = sorted(source.sheet_names, key=lambda name: 0 if "metrics" in name.lower() or "subject" in name.lower() else 1)
+        _emit(progress, event="file_parsed", sheets=sheet_names)
+
+        # PHASE 1: Header detection + classification from the first rows only
+        sheet_plans = []
+        for sheet_name in sheet_names:
+            timings = {}
+            t = time.perf_counter()
+            preview = source.preview(sheet_name)
+            t = _lap(timings, "preview", t)
+            if preview.empty:
+                _emit(progress, event="sheet_skipped", sheet=sheet_name, reason="empty")
+                continue
+
+            # header_idx = last header row (data starts below it); merged 2-row headers are combined
+            header_idx, header = detect_header(preview)
+            t = _lap(timings, "header", t)
+            # One scoring pass over all datasets (a CSV's only "sheet name" is its file name)
+            match = classify_sheet(header, filename if source.is_csv else sheet_name)
+            t = _lap(timings, "classify", t)
+
+            if match["ambiguous"]:
+                # Surface it instead of guessing: a misrouted sheet means a costly re-ingest
+                options = ", ".join(f"{key} ({score})" for key, score in match["candidates"])
+                results.append(f"⚠️ {sheet_name}: ambiguous dataset ({options}); not loaded")
+                _emit(progress, event="sheet_skipped", sheet=sheet_name, reason="ambiguous dataset",
+                      candidates=match["candidates"])
+                continue
+            if not match["dataset"]:
+                _emit(progress, event="sheet_skipped", sheet=sheet_name, reason="no matching dataset")
+                continue 
+            sheet_plans.append({
+                "sheet": sheet_name, "header_idx": header_idx, "header": header,
+                "dataset": match["dataset"], "confidence": match["confidence"], "timings": timings
+            })
+
+        # PHASE 2: Full parse + load, only for classified sheets.
+        # Multi-tab workbooks are parsed/normalized in parallel on the sheet pool;
+        # DB writes stay serialized in priority order (metrics/subject sheets first).
+        failed_sheets = 0
+        touched = set()  # subjects whose raw rows this upload inserted or replaced
+        phase_start = time.perf_counter()
+        pool, futures = _start_sheet_pool(file.file, source, sheet_plans, filename, study_name)
+        workers = min(_sheet_workers, len(futures)) if futures else 1
+        try:
+            for plan in sheet_plans:
+                failed_sheets += _load_sheet(db, source, plan, futures.pop(plan["sheet"], None), study_name, filename, mode,
+                                             results, sheet_stats, progress, touched)
+        finally:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        phase_seconds = time.perf_counter() - phase_start
+        sheet_seconds = sum(s.get("wall_seconds", 0.0) for s in sheet_stats)
+        parallel = {
+            "workers": workers,
+            "sheet_seconds_total": round(sheet_seconds, 3),
+            "wall_seconds": round(phase_seconds, 3),
+            "speedup": round(sheet_seconds / phase_seconds, 2) if phase_seconds > 0 else 1.0
+        }
+        if pool is not None:
+            results.append(f"⚡ {len(sheet_plans)} sheets in {parallel['wall_seconds']}s on {parallel['workers']} workers ({parallel['speedup']}x vs sequential)")
 
-            # 5. Insert Data
-            target_table = DATASET_SPECS[dataset_key]["table"]
+        # Only fingerprint the whole file when every sheet made it in (failed files stay retryable)
+        if not failed_sheets:
             try:
-                inspector = inspect(db.bind)
-                valid_db_cols = [c['name'] for c in inspector.get_columns(target_table)]
-                columns_to_keep = [c for c in df_clean.columns if c in valid_db_cols]
-                df_final = df_clean[columns_to_keep]
-                
-                df_final.to_sql(target_table, db.bind, if_exists='append', index=False, method='multi')
-                results.append(f"✅ {dataset_key}: Loaded {len(df_final)} rows")
+                if mode == "replace":
+                    ingest_ledger.forget_file_versions(db, study_name, filename, keep_hash=file_hash)
+                ingest_ledger.record_entry(db, ingest_ledger.FILE_SCOPE, file_hash, study_name, filename,
+                                           row_count=sum(s['rows'] for s in sheet_stats), mode=mode)
+                db.commit()
             except Exception as e:
-                if "Duplicate" not in str(e):
-                    results.append(f"❌ {sheet_name}: {str(e)}")
+                db.rollback()
+                logger.warning(f"Ingest ledger write failed for {filename}: {e}")
+
+        # Post-ingest: materialized subject analytics + site rollup for just what this upload touched
+        t = time.perf_counter()
+        # Sites the touched subjects were on before this upload (a re-upload can move them)
+        previous_sites = site_rollup.recorded_sites(db, touched) if touched else set()
+        refreshed = subject_analytics.refresh_after_ingest(db, study_name, touched) if touched else 0
+        t = _lap(file_timings, "subject_analytics", t)
+        sites_refreshed = site_rollup.refresh_after_ingest(db, study_name, touched, previous_sites) if touched else 0
+        t = _lap(file_timings, "site_rollup", t)
+        if refreshed:
+            results.append(f"📊 Analytics refreshed for {refreshed} subjects across {sites_refreshed} sites")
+
+        # Which reader did the work, and what parsing cost (previews + full sheet parses)
+        reader = {
+            "engine": source.engine,
+            "fallback": source.fallback_reason,
+            "parse_seconds": round(sum(s["timings"].get("preview", 0.0) + s["timings"].get("parse", 0.0)
+                                       for s in sheet_stats), 3)
+        }
+        fallback_note = f" after fallback ({reader['fallback']})" if reader["fallback"] else ""
+        results.append(f"📖 Read with {reader['engine']}{fallback_note}: {reader['parse_seconds']}s parsing")
 
-        return {"status": "processed", "details": results, "study": study_name}
+        file_timings["total"] = round(time.perf_counter() - file_start, 4)
+        return {
+            "status": "processed", "details": results, "sheets": sheet_stats, "study": study_name, "mode": mode,
+            "timings": file_timings, "parallel": parallel, "reader": reader
+        }
 
     except Exception as e:
-        return {"status": "error", "reason": str(e)}
\ No newline at end of file
+        return {"status": "error", "reason": str(e)}
+    finally:
+        # New header layouts seen in this file, written once for the whole file
+        flush_mapping_cache()
\ No newline at end of file
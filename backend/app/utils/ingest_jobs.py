@@ -0,0 +1,353 @@
+# backend/app/utils/ingest_jobs.py
+import os
+import copy
+import time
+import uuid
+import logging
+import tempfile
+import threading
+import multiprocessing
+from collections import OrderedDict, deque
+from types import SimpleNamespace
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from backend.app.core.config import (
+    INGEST_MAX_WORKERS, INGEST_MAX_PENDING_JOBS, INGEST_JOB_HISTORY, INGEST_WORKER_NICE,
+    INGEST_MEMORY_BUDGET_MB, CSV_CHUNK_ROWS, INGEST_STATEMENT_TIMEOUT_MS, INGEST_SHEET_WORKERS
+)
+from backend.app.core.database import SessionLocal, engine, set_statement_timeout
+from backend.app.core import schema_registry
+from backend.app.utils.ingest_excel import ingest_file, set_sheet_workers
+from backend.app.utils.bundle_loader import is_bundle, ingest_bundle, member_sizes
+from backend.app.utils import data_versions
+
+logger = logging.getLogger(__name__)
+
+# job_id -> job record (newest last). Polled by GET /api/upload/jobs/{job_id}
+JOBS = OrderedDict()
+_lock = threading.RLock()
+
+_executor = None
+_events = None       # worker -> API process progress channel
+_drainer = None
+
+# Files held back until the memory budget allows them to run: (job_id, index, saved, mode)
+_waiting = deque()
+_reserved_mb = 0.0
+
+# Rough pandas footprint per MB on disk (xlsx is zipped XML; object columns inflate further)
+MEMORY_EXPANSION = {".csv": 4.0, ".xlsx": 12.0, ".xlsm": 12.0, ".xls": 6.0}
+DEFAULT_EXPANSION = 12.0
+
+# Every job worker starts its own sheet pool: split INGEST_SHEET_WORKERS between them so
+# running jobs never parse with more than INGEST_SHEET_WORKERS processes in total
+SHEET_WORKERS_PER_JOB = max(1, INGEST_SHEET_WORKERS // max(1, INGEST_MAX_WORKERS))
+# Workbooks parsed on a sheet pool briefly hold each frame twice (in the sheet worker and
+# unpickled in the job worker), and each sheet worker opens the workbook itself
+SHEET_POOL_EXPANSION = 2.0
+
+_SHEET_STATUS = {"sheet_loaded": "loaded", "sheet_skipped": "skipped", "sheet_failed": "failed"}
+
+
+# ==========================================
+# 1. WORKER SIDE (runs inside pool processes)
+# ==========================================
+_worker_events = None
+
+def _init_worker(events):
+    global _worker_events
+    _worker_events = events
+    set_sheet_workers(SHEET_WORKERS_PER_JOB)
+    # Yield CPU to the API process so dashboards stay responsive during big loads
+    try:
+        os.nice(INGEST_WORKER_NICE)
+    except (AttributeError, OSError):
+        pass
+    # Forked workers must not reuse the parent's pooled connections
+    engine.dispose(close=False)
+    # Bulk COPY of a large sheet can legitimately outlast the API's statement timeout
+    set_statement_timeout(INGEST_STATEMENT_TIMEOUT_MS)
+
+def _run_ingest(job_id: str, index: int, path: str, filename: str, study_name: str, mode: str,
+                schema_generation: int):
+    schema_registry.sync_generation(schema_generation)
+
+    def progress(event):
+        _worker_events.put({"job_id": job_id, "index": index, **event})
+
+    progress({"event": "file_started"})
+    db = SessionLocal()
+    try:
+        if is_bundle(filename):
+            # zip / tar.gz: members are streamed and ingested one at a time
+            return ingest_bundle(path, filename, db, study_name=study_name, progress=progress, mode=mode)
+        with open(path, "rb") as fh:
+            upload = SimpleNamespace(filename=filename, file=fh)
+            return ingest_file(upload, db, study_name=study_name, progress=progress, mode=mode)
+    finally:
+        db.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# ==========================================
+# 2. API SIDE (job store + pool management)
+# ==========================================
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor, _events, _drainer
+    with _lock:
+        if _executor is None:
+            ctx = multiprocessing.get_context()
+            _events = ctx.Queue()
+            _executor = ProcessPoolExecutor(
+                max_workers=INGEST_MAX_WORKERS,
+                mp_context=ctx,
+                initializer=_init_worker,
+                initargs=(_events,)
+            )
+            _drainer = threading.Thread(target=_drain_events, args=(_events,), name="ingest-progress", daemon=True)
+            _drainer.start()
+        return _executor
+
+def _reset_executor(broken: ProcessPoolExecutor):
+    """
+    A worker that dies (OOM kill, segfault) leaves the pool unusable: every later submit
+    raises BrokenProcessPool. Drop it so the next submit starts a fresh pool.
+    """
+    global _executor
+    with _lock:
+        if _executor is not broken:
+            return  # already replaced by another callback of the same pool
+        logger.warning("Ingest worker pool is broken; starting a new one")
+        broken.shutdown(wait=False, cancel_futures=True)
+        _events.put(None)
+        _executor = None
+
+def _submit(*args):
+    executor = _get_executor()
+    try:
+        return executor, executor.submit(*args)
+    except BrokenProcessPool:
+        _reset_executor(executor)
+        executor = _get_executor()
+        return executor, executor.submit(*args)
+
+def _drain_events(events):
+    while True:
+        event = events.get()
+        if event is None:
+            break
+        try:
+            _apply_event(event)
+        except Exception as e:
+            logger.warning(f"Dropped ingest progress event {event}: {e}")
+
+def _apply_event(event: dict):
+    with _lock:
+        job = JOBS.get(event.pop("job_id"))
+        if not job:
+            return
+        entry = job["files"][event.pop("index")]
+        kind = event.pop("event")
+        now = time.time()
+
+        if kind == "file_started":
+            # Completion callbacks can overtake queued progress events
+            if entry["status"] == "queued":
+                entry["status"] = "running"
+                entry["started_at"] = now
+            if job["status"] == "queued":
+                job["status"] = "running"
+                job["started_at"] = now
+
+        elif kind == "file_parsed":
+            sheets = [{"sheet": name, "status": "pending"} for name in event["sheets"]]
+            # Bundles report each member's sheets as it is opened
+            entry["sheets"] = entry["sheets"] + sheets if event.get("append") else sheets
+
+        elif kind in _SHEET_STATUS:
+            sheet = next((s for s in entry["sheets"] if s["sheet"] == event.get("sheet")), None)
+            if sheet is None:
+                sheet = {"sheet": event.get("sheet")}
+                entry["sheets"].append(sheet)
+            sheet.update(event, status=_SHEET_STATUS[kind])
+            entry["rows"] += event.get("rows", 0)
+            done = sum(1 for s in entry["sheets"] if s["status"] != "pending")
+            entry["progress"] = round(done / len(entry["sheets"]), 2)
+
+def _on_file_done(job_id: str, index: int, saved: dict, executor: ProcessPoolExecutor, future):
+    global _reserved_mb
+    try:
+        result = future.result()
+    except BrokenProcessPool as e:
+        _reset_executor(executor)
+        result = {"status": "error", "reason": f"Ingest worker exited unexpectedly: {e}"}
+    except Exception as e:
+        result = {"status": "error", "reason": str(e)}
+
+    # The worker committed new data: re-read study versions on the next analytics request
+    data_versions.invalidate()
+
+    with _lock:
+        _reserved_mb = max(0.0, _reserved_mb - saved["memory_mb"])
+        _dispatch()
+
+        job = JOBS.get(job_id)
+        if not job:
+            return
+        entry = job["files"][index]
+        now = time.time()
+
+        result.setdefault("file", entry["file"])
+        entry["result"] = result
+        entry["status"] = "failed" if result.get("status") == "error" else "completed"
+        entry["progress"] = 1.0
+        entry["finished_at"] = now
+        entry["seconds"] = round(now - (entry["started_at"] or job["created_at"]), 3)
+
+        if all(f["status"] in ("completed", "failed") for f in job["files"]):
+            job["status"] = "completed"
+            job["finished_at"] = now
+            job["seconds"] = round(now - job["created_at"], 3)
+            job["summary"] = [f["result"] for f in job["files"]]
+            _trim_history()
+
+def _trim_history():
+    finished = [jid for jid, j in JOBS.items() if j["status"] == "completed"]
+    while len(JOBS) > INGEST_JOB_HISTORY and finished:
+        JOBS.pop(finished.pop(0), None)
+
+def pending_job_count() -> int:
+    with _lock:
+        return sum(1 for j in JOBS.values() if j["status"] in ("queued", "running"))
+
+def queue_is_full() -> bool:
+    return pending_job_count() >= INGEST_MAX_PENDING_JOBS
+
+def estimate_memory_mb(filename: str, size: int, lines: int = 0) -> float:
+    """
+    Peak pandas memory expected while ingesting one file.
+    Chunked CSVs only ever hold CSV_CHUNK_ROWS rows, so they are sized by chunk, not file.
+    Workbooks also count the copies made by the job's sheet pool.
+    """
+    ext = os.path.splitext(filename or "")[1].lower()
+    size_mb = size / (1024 * 1024)
+    if ext == ".csv" and CSV_CHUNK_ROWS > 0 and lines > CSV_CHUNK_ROWS:
+        size_mb *= CSV_CHUNK_ROWS / lines
+    expansion = MEMORY_EXPANSION.get(ext, DEFAULT_EXPANSION)
+    if ext != ".csv" and SHEET_WORKERS_PER_JOB > 1:
+        expansion *= SHEET_POOL_EXPANSION
+    return round(max(size_mb, 1.0) * expansion, 1)
+
+def save_upload(upload) -> dict:
+    """
+    Streams an UploadFile to a temp file the worker processes can open
+    (1 MB at a time; the upload is never held in memory as a whole).
+    """
+    suffix = os.path.splitext(upload.filename or "")[1]
+    fd, path = tempfile.mkstemp(prefix="clarity_upload_", suffix=suffix)
+    lines = 0
+    with os.fdopen(fd, "wb") as out:
+        upload.file.seek(0)
+        for block in iter(lambda: upload.file.read(1024 * 1024), b""):
+            out.write(block)
+            lines += block.count(b"\n")
+    size = os.path.getsize(path)
+
+    # Bundles are ingested member by member: size them by their most demanding member
+    members = member_sizes(path) if is_bundle(upload.filename) else []
+    if members:
+        memory_mb = max(estimate_memory_mb(*member) for member in members)
+    else:
+        memory_mb = estimate_memory_mb(upload.filename, size, lines)
+    return {"filename": upload.filename, "path": path, "size": size, "memory_mb": memory_mb}
+
+def oversized_uploads(saved_files: list) -> list:
+    """ Files whose estimated memory exceeds the whole budget; these can never be scheduled """
+    return [saved for saved in saved_files if saved["memory_mb"] > INGEST_MEMORY_BUDGET_MB]
+
+def discard_uploads(saved_files: list):
+    for saved in saved_files:
+        try:
+            os.remove(saved["path"])
+        except OSError:
+            pass
+
+def _dispatch():
+    """
+    Submits waiting files in FIFO order while their estimated memory fits the budget.
+    Called with _lock held, on submit and whenever a file finishes.
+    """
+    global _reserved_mb
+    while _waiting:
+        job_id, index, saved, mode = _waiting[0]
+        if _reserved_mb + saved["memory_mb"] > INGEST_MEMORY_BUDGET_MB:
+            break
+        _waiting.popleft()
+        job = JOBS.get(job_id)
+        if not job:
+            discard_uploads([saved])
+            continue
+
+        _reserved_mb += saved["memory_mb"]
+        job["files"][index]["waiting_for_memory"] = False
+        executor, future = _submit(_run_ingest, job_id, index, saved["path"], saved["filename"], job["study"], mode,
+                                   schema_registry.generation())
+        future.add_done_callback(lambda f, j=job_id, i=index, s=saved, e=executor: _on_file_done(j, i, s, e, f))
+
+    for job_id, index, _, _ in _waiting:
+        if job_id in JOBS:
+            JOBS[job_id]["files"][index]["waiting_for_memory"] = True
+
+def submit_upload_job(saved_files: list, study_name: str = None, mode: str = "append") -> dict:
+    """ Queues every saved file (subject to the memory budget) and returns the job record """
+    job_id = uuid.uuid4().hex
+    job = {
+        "job_id": job_id,
+        "status": "queued",
+        "study": study_name,
+        "mode": mode,
+        "created_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+        "seconds": None,
+        "files": [{
+            "file": saved["filename"],
+            "bytes": saved["size"],
+            "memory_mb": saved["memory_mb"],
+            "waiting_for_memory": False,
+            "status": "queued",
+            "progress": 0.0,
+            "rows": 0,
+            "sheets": [],
+            "started_at": None,
+            "finished_at": None,
+            "seconds": None,
+            "result": None
+        } for saved in saved_files],
+        "summary": None
+    }
+
+    with _lock:
+        JOBS[job_id] = job
+        _waiting.extend((job_id, index, saved, mode) for index, saved in enumerate(saved_files))
+        _dispatch()
+
+    return get_job(job_id)
+
+def get_job(job_id: str):
+    with _lock:
+        job = JOBS.get(job_id)
+        return copy.deepcopy(job) if job else None
+
+def shutdown():
+    global _executor
+    with _lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _events.put(None)
+            _executor = None
+        discard_uploads([saved for _, _, saved, _ in _waiting])
+        _waiting.clear()
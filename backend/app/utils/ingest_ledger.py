@@ -0,0 +1,134 @@
+# backend/app/utils/ingest_ledger.py
+import uuid
+import hashlib
+import logging
+import pandas as pd
+from sqlalchemy import text, bindparam
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+FILE_SCOPE = "file"
+SHEET_SCOPE = "sheet"
+
+INGEST_MODES = ("append", "replace")
+
+
+def file_fingerprint(fileobj, chunk_size: int = 1024 * 1024) -> str:
+    """ SHA-256 of the raw upload, streamed in chunks; rewinds the file afterwards """
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(chunk_size), b""):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+class FrameHasher:
+    """
+    Incremental frame_fingerprint for sheets loaded in chunks: row hashes are
+    per row, so feeding the chunks in order gives the same digest as the whole frame.
+    """
+
+    def __init__(self):
+        self._digest = hashlib.sha256()
+        self._columns_seen = False
+
+    def update(self, df: pd.DataFrame):
+        if not self._columns_seen:
+            self._digest.update("|".join(map(str, df.columns)).encode("utf-8"))
+            self._columns_seen = True
+        self._digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+
+    def hexdigest(self) -> str:
+        return self._digest.hexdigest()
+
+
+def frame_fingerprint(df: pd.DataFrame) -> str:
+    """ SHA-256 of a normalized sheet: column names + vectorized row hashes """
+    hasher = FrameHasher()
+    hasher.update(df)
+    return hasher.hexdigest()
+
+
+def find_entry(db: Session, scope: str, content_hash: str, study_name: str, dataset_key: str = None):
+    """ Returns the matching ledger row, or None (also when the ledger is unavailable) """
+    sql = text("""
+        SELECT id, filename, sheet_name, dataset_key, row_count, created_at
+        FROM ingest_ledger
+        WHERE scope = :scope AND content_hash = :hash AND study_name = :study
+          AND (:dataset IS NULL OR dataset_key = :dataset)
+        ORDER BY id DESC
+        LIMIT 1
+    """)
+    try:
+        # Savepoint: a failed lookup must not undo rows already staged in the caller's transaction
+        with db.begin_nested():
+            return db.execute(sql, {
+                "scope": scope, "hash": content_hash, "study": study_name, "dataset": dataset_key
+            }).fetchone()
+    except Exception as e:
+        logger.warning(f"Ingest ledger lookup failed: {e}")
+        return None
+
+
+def new_load_id() -> str:
+    return uuid.uuid4().hex
+
+
+def record_entry(db: Session, scope: str, content_hash: str, study_name: str, filename: str,
+                 sheet_name: str = None, dataset_key: str = None, row_count: int = 0,
+                 load_id: str = None, target_table: str = None, mode: str = None):
+    """ Adds a ledger row inside the caller's transaction (caller commits) """
+    db.execute(text("""
+        INSERT INTO ingest_ledger (scope, content_hash, study_name, filename, sheet_name, dataset_key, row_count,
+                                   load_id, target_table, mode)
+        VALUES (:scope, :hash, :study, :filename, :sheet, :dataset, :rows, :load_id, :table, :mode)
+    """), {
+        "scope": scope, "hash": content_hash, "study": study_name, "filename": filename,
+        "sheet": sheet_name, "dataset": dataset_key, "rows": row_count,
+        "load_id": load_id, "table": target_table, "mode": mode
+    })
+
+
+# --- REPLACE MODE ---
+def replace_previous_loads(db: Session, study_name: str, filename: str, sheet_name: str, target_table: str,
+                           touched: set = None) -> int:
+    """
+    Deletes the rows of every earlier load of the same source (study + file + sheet)
+    from `target_table`, and their ledger entries. Runs in the caller's transaction
+    so the delete and the new insert commit together. Returns rows removed;
+    the subjects those rows belonged to are added to `touched`, if given.
+    """
+    load_ids = [r[0] for r in db.execute(text("""
+        SELECT load_id FROM ingest_ledger
+        WHERE scope = :scope AND study_name = :study AND filename = :filename
+          AND sheet_name = :sheet AND target_table = :table AND load_id IS NOT NULL
+    """), {
+        "scope": SHEET_SCOPE, "study": study_name, "filename": filename,
+        "sheet": sheet_name, "table": target_table
+    }).fetchall()]
+
+    if not load_ids:
+        return 0
+
+    # Plain SELECT + DELETE (no DELETE .. RETURNING) so replace mode also works on SQLite
+    if touched is not None:
+        subjects = text(f'SELECT DISTINCT subject_id FROM "{target_table}" WHERE load_id IN :ids'
+                        ).bindparams(bindparam("ids", expanding=True))
+        touched.update(row[0] for row in db.execute(subjects, {"ids": load_ids}).fetchall() if row[0] is not None)
+
+    delete_rows = text(f'DELETE FROM "{target_table}" WHERE load_id IN :ids').bindparams(bindparam("ids", expanding=True))
+    removed = db.execute(delete_rows, {"ids": load_ids}).rowcount
+
+    delete_ledger = text("DELETE FROM ingest_ledger WHERE load_id IN :ids").bindparams(bindparam("ids", expanding=True))
+    db.execute(delete_ledger, {"ids": load_ids})
+    return removed
+
+
+def forget_file_versions(db: Session, study_name: str, filename: str, keep_hash: str):
+    """ Drops file fingerprints of replaced versions so they are no longer reported 'unchanged' """
+    db.execute(text("""
+        DELETE FROM ingest_ledger
+        WHERE scope = :scope AND study_name = :study AND filename = :filename AND content_hash <> :hash
+    """), {"scope": FILE_SCOPE, "study": study_name, "filename": filename, "hash": keep_hash})
@@ -0,0 +1,96 @@
+# backend/app/utils/response_cache.py
+import json
+import hashlib
+import datetime
+import threading
+import contextvars
+from collections import OrderedDict
+from fastapi import Request, Response
+from sqlalchemy.orm import Session
+from backend.app.core.config import ANALYTICS_CACHE_SIZE
+from backend.app.utils import data_versions
+
+# (endpoint, params, data version, day) -> response payload
+_cache = OrderedDict()
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "not_modified": 0, "degraded": 0}
+# Reasons compute() answered with a fallback payload; set per serve() call
+_degraded = contextvars.ContextVar("response_cache_degraded", default=None)
+
+
+def _get(key):
+    with _lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            _stats["hits"] += 1
+            return _cache[key]
+        _stats["misses"] += 1
+        return None
+
+
+def _put(key, payload):
+    with _lock:
+        _cache[key] = payload
+        _cache.move_to_end(key)
+        while len(_cache) > ANALYTICS_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def clear():
+    with _lock:
+        _cache.clear()
+
+
+def stats() -> dict:
+    with _lock:
+        return {"entries": len(_cache), "max_entries": ANALYTICS_CACHE_SIZE, **_stats}
+
+
+def mark_degraded(reason: str):
+    """
+    Called while compute() runs when it answers with a fallback (a query failed):
+    the payload is still returned, but is neither cached nor given an ETag.
+    Threads started by compute() must run in contextvars.copy_context() to report here.
+    """
+    reasons = _degraded.get()
+    if reasons is not None:
+        reasons.append(reason)
+
+
+def serve(request: Request, response: Response, db: Session, endpoint: str, params: dict, compute,
+          study: str = None):
+    """
+    Returns compute()'s payload, cached per (endpoint, params, study data version).
+    The day is part of the key too: overdue days are computed against CURRENT_DATE.
+    Sends a matching ETag and answers If-None-Match with 304 without touching the raw tables.
+    Falls through to compute() uncached when the data version is unknown, and returns
+    degraded payloads (see mark_degraded) uncached and without an ETag.
+    """
+    version = data_versions.current(db, study)
+    if version is None:
+        return compute()
+
+    key = (endpoint, json.dumps(params, sort_keys=True, default=str), version, datetime.date.today().isoformat())
+    etag = 'W/"' + hashlib.sha1(repr(key).encode("utf-8")).hexdigest()[:20] + '"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}  # always revalidate, 304 is cheap
+
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        with _lock:
+            _stats["not_modified"] += 1
+        return Response(status_code=304, headers=headers)
+
+    payload = _get(key)
+    if payload is None:
+        reasons = []
+        token = _degraded.set(reasons)
+        try:
+            payload = compute()
+        finally:
+            _degraded.reset(token)
+        if reasons:
+            with _lock:
+                _stats["degraded"] += 1
+            return payload
+        _put(key, payload)
+    response.headers.update(headers)
+    return payload
@@ -0,0 +1,161 @@
+# backend/app/utils/site_rollup.py
+import logging
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from backend.app.core.database import is_postgres
+from backend.app.utils import dqi, data_versions
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = ("site_id", "visit_score", "query_score", "safety_score", "coding_score") + dqi.COUNTS
+
+# Read queries (also EXPLAINed by core/explain_check.py); {column} is one of dqi.COUNTS.
+# visit_score counts overdue visits as of refreshed_at, so rows refreshed before today are not current
+SITE_SCORES_SQL = (f"SELECT {', '.join(_COLUMNS)}, refreshed_at >= CURRENT_DATE AS current "
+                   "FROM site_rollup WHERE study_name = :study")
+SITE_SQL = SITE_SCORES_SQL + " AND site_id = :site"
+SITES_OVER_SQL = """
+    SELECT site_id, {column} FROM site_rollup
+    WHERE study_name = :study AND {column} > :threshold
+    ORDER BY {column} DESC
+"""
+
+
+def _insert_sql(sites: bool) -> str:
+    """ INSERT .. SELECT over the DQI engine's single-pass query (all sites, or just :sites) """
+    select_sql, _ = dqi.build_sql(sites=sites)
+    columns = ", ".join(_COLUMNS)
+    return f"""
+    INSERT INTO site_rollup (study_name, {columns}, refreshed_at)
+    SELECT :study, {columns}, now() FROM ({select_sql}) AS scores
+    """
+
+
+def refresh_sites(db: Session, study_name: str, site_ids) -> int:
+    """
+    Recomputes the rollup rows of the given sites (caller's transaction).
+    Delete + insert, so a site that no longer has subjects disappears. Returns rows written.
+    """
+    sites = sorted({str(s) if s is not None else dqi.UNKNOWN_SITE for s in site_ids})
+    if not sites:
+        return 0
+    params = {"study": study_name, "sites": sites}
+    db.execute(text("DELETE FROM site_rollup WHERE study_name = :study AND site_id = ANY(CAST(:sites AS text[]))"),
+               params)
+    return db.execute(text(_insert_sql(sites=True)), params).rowcount
+
+
+def rebuild(db: Session, study_name: str = None) -> int:
+    """ Full recompute for one study, or for every study when study_name is None. Commits. """
+    if study_name:
+        studies = [study_name]
+    else:
+        studies = [r[0] for r in db.execute(text(
+            "SELECT DISTINCT study_name FROM subjects WHERE study_name IS NOT NULL")).fetchall()]
+    written = 0
+    for study in studies:
+        db.execute(text("DELETE FROM site_rollup WHERE study_name = :study"), {"study": study})
+        written += db.execute(text(_insert_sql(sites=False)), {"study": study}).rowcount
+        data_versions.bump(db, study)
+    db.commit()
+    return written
+
+
+def recorded_sites(db: Session, subject_ids) -> set:
+    """
+    Sites the subjects had as of their last subject_analytics refresh. Read before that
+    refresh runs, so sites a re-upload moved subjects away from get recomputed too.
+    """
+    ids = sorted({str(s) for s in subject_ids if s is not None})
+    if not ids or not is_postgres(db.get_bind()):
+        return set()
+    try:
+        with db.begin_nested():
+            return {r[0] for r in db.execute(text("""
+                SELECT DISTINCT COALESCE(site_id, :unknown) FROM subject_analytics
+                WHERE subject_id = ANY(CAST(:ids AS text[]))
+            """), {"ids": ids, "unknown": dqi.UNKNOWN_SITE}).fetchall()}
+    except Exception as e:
+        logger.warning(f"Previous sites of re-uploaded subjects unavailable: {e}")
+        return set()
+
+
+def refresh_after_ingest(db: Session, study_name: str, subject_ids, previous_sites=()) -> int:
+    """
+    Post-ingest step: refreshes the current and previous sites of the subjects the upload
+    touched, drops rows of sites left without subjects, then bumps the data version so
+    dashboards cached mid-ingest are rebuilt. Never fails the ingest.
+    Skipped on non-Postgres databases (e.g. the SQLite benchmark stand-in).
+    """
+    ids = sorted({str(s) for s in subject_ids if s is not None})
+    if not ids or not is_postgres(db.get_bind()):
+        return 0
+    try:
+        sites = {r[0] for r in db.execute(text("""
+            SELECT DISTINCT COALESCE(site_id, :unknown) FROM subjects WHERE subject_id = ANY(CAST(:ids AS text[]))
+        """), {"ids": ids, "unknown": dqi.UNKNOWN_SITE}).fetchall()}
+        written = refresh_sites(db, study_name, sites | set(previous_sites))
+        db.execute(text("""
+            DELETE FROM site_rollup r
+            WHERE r.study_name = :study AND NOT EXISTS (
+                SELECT 1 FROM subjects s
+                WHERE s.study_name = r.study_name AND COALESCE(s.site_id, :unknown) = r.site_id
+            )
+        """), {"study": study_name, "unknown": dqi.UNKNOWN_SITE})
+        data_versions.bump(db, study_name)
+        db.commit()
+        return written
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"site_rollup refresh failed for {study_name}: {e}")
+        return 0
+
+
+def _live_rows(db: Session, study_name: str, sites=None) -> list:
+    """ The rollup columns computed live by the DQI engine (all sites, or just `sites`) """
+    sql, _ = dqi.build_sql(sites=sites is not None)
+    params = {"study": study_name}
+    if sites is not None:
+        params["sites"] = list(sites)
+    return db.execute(text(sql), params).mappings().fetchall()
+
+
+def _materialized(db: Session, study_name: str) -> bool:
+    return db.execute(text("SELECT 1 FROM site_rollup WHERE study_name = :study LIMIT 1"),
+                      {"study": study_name}).fetchone() is not None
+
+
+# Readers: studies loaded before the rollup existed, and sites whose scores were computed
+# on an earlier day, are read live until ingest or scripts/rebuild_subject_analytics.py
+# refreshes them (a read never writes)
+def site_scores(db: Session, study_name: str) -> list:
+    """ Same shape as dqi.site_scores, read from the rollup (lowest DQI first) """
+    rows = db.execute(text(SITE_SCORES_SQL), {"study": study_name}).mappings().fetchall()
+    if not rows:
+        return dqi.score_rows(_live_rows(db, study_name))
+    stale = [row["site_id"] for row in rows if not row["current"]]
+    current = [row for row in rows if row["current"]]
+    return dqi.score_rows(current + (list(_live_rows(db, study_name, stale)) if stale else []))
+
+
+def sites_over(db: Session, study_name: str, column: str, threshold: int) -> list:
+    """
+    [(site_id, count)] of sites whose `column` count exceeds threshold, highest first.
+    The counts don't depend on the day, so rows from earlier days are still used.
+    """
+    if column not in dqi.COUNTS:
+        raise ValueError(f"Unknown rollup count: {column}")
+    if not _materialized(db, study_name):
+        live = [(row["site_id"], row[column]) for row in _live_rows(db, study_name) if row[column] > threshold]
+        return sorted(live, key=lambda site: site[1], reverse=True)
+    return db.execute(text(SITES_OVER_SQL.format(column=column)),
+                      {"study": study_name, "threshold": threshold}).fetchall()
+
+
+def get_site(db: Session, study_name: str, site_id: str):
+    """ One site's rollup row as a mapping (None when the site has no subjects in the study) """
+    row = db.execute(text(SITE_SQL), {"study": study_name, "site": site_id}).mappings().fetchone()
+    if row is None or not row["current"]:
+        live = _live_rows(db, study_name, [site_id])
+        row = live[0] if live else None
+    return row
@@ -1,5 +1,22 @@
+import os
+import json
+import tempfile
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
 from thefuzz import process
+from backend.app.core.config import MAPPER_CACHE_SIZE, MAPPER_CACHE_PATH
+
+# rapidfuzz ships with thefuzz; it gives us the all-pairs score matrix in C
+try:
+    from rapidfuzz import process as rf_process, fuzz as rf_fuzz, utils as rf_utils
+except ImportError:
+    rf_process = None
+
+logger = logging.getLogger(__name__)
 
 TARGET_SCHEMA = {
     "site_id": ["site id", "site number", "site no", "investigator site", "site", "study site number", "site_id"],
@@ -20,26 +37,162 @@ TARGET_SCHEMA = {
     "missing_visits": ["missing visits", "# missing visits", "number of missing visits"] 
 }
 
-def normalize_dataframe_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df.columns = [str(c).strip() for c in df.columns]
-    rename_map = {}
-    original_cols = df.columns.tolist()
+MATCH_THRESHOLD = 88
+
+# --- KEYWORD MATRIX LAYOUT (built once) ---
+# All keywords flattened into one axis; _GROUP_STARTS marks where each target's block begins
+_TARGETS = list(TARGET_SCHEMA.keys())
+_KEYWORDS = [kw for keywords in TARGET_SCHEMA.values() for kw in keywords]
+_GROUP_STARTS = np.cumsum([0] + [len(kws) for kws in TARGET_SCHEMA.values()][:-1])
+
+
+# --- HEADER SIGNATURE CACHE ---
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_cache_loaded = False
+_cache_dirty = False  # new layouts not yet written to MAPPER_CACHE_PATH (see flush_mapping_cache)
+
+def _signature(headers) -> str:
+    """ Stable hash of the raw header tuple (order matters) """
+    return hashlib.sha1(json.dumps(list(headers)).encode("utf-8")).hexdigest()
+
+def _load_disk_cache():
+    global _cache_loaded
+    _cache_loaded = True
+    if not MAPPER_CACHE_PATH or not os.path.exists(MAPPER_CACHE_PATH):
+        return
+    try:
+        with open(MAPPER_CACHE_PATH, "r", encoding="utf-8") as f:
+            for key, rename_map in json.load(f).items():
+                _cache[key] = rename_map
+        while len(_cache) > MAPPER_CACHE_SIZE:
+            _cache.popitem(last=False)
+    except Exception as e:
+        logger.warning(f"Header map cache unreadable ({MAPPER_CACHE_PATH}): {e}")
+
+def _save_disk_cache(merge: bool = True):
+    """
+    Writes the cache through a private temp file + os.replace, so concurrent ingest
+    workers never interleave writes; each one merges what the others saved meanwhile.
+    Called with _cache_lock held.
+    """
+    global _cache_dirty
+    if not MAPPER_CACHE_PATH:
+        return
+    tmp_path = None
+    try:
+        entries = {}
+        if merge and os.path.exists(MAPPER_CACHE_PATH):
+            try:
+                with open(MAPPER_CACHE_PATH, "r", encoding="utf-8") as f:
+                    entries = json.load(f)
+            except Exception:
+                entries = {}
+        entries.update(_cache)
+        if len(entries) > MAPPER_CACHE_SIZE:
+            entries = dict(list(entries.items())[-MAPPER_CACHE_SIZE:])
+
+        fd, tmp_path = tempfile.mkstemp(prefix=".mapper_cache_", suffix=".tmp",
+                                        dir=os.path.dirname(os.path.abspath(MAPPER_CACHE_PATH)))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, MAPPER_CACHE_PATH)
+        tmp_path = None
+        _cache_dirty = False
+    except Exception as e:
+        logger.warning(f"Header map cache not saved ({MAPPER_CACHE_PATH}): {e}")
+    finally:
+        if tmp_path:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+def flush_mapping_cache():
+    """ Persists layouts learned since the last flush (once per ingested file, not per miss) """
+    with _cache_lock:
+        if _cache_dirty:
+            _save_disk_cache()
 
-    for col in original_cols:
+def clear_mapping_cache():
+    """ Drops memoized layouts (e.g. after TARGET_SCHEMA changes) """
+    with _cache_lock:
+        _cache.clear()
+        _save_disk_cache(merge=False)
+
+
+# --- MATCHING ENGINES ---
+def _score_matrix_rename(headers: list) -> dict:
+    """ One cdist pass: every header vs every keyword, then best target per header """
+    scores = rf_process.cdist(
+        [h.lower() for h in headers], _KEYWORDS,
+        scorer=rf_fuzz.WRatio, processor=rf_utils.default_process
+    )
+    # Best keyword per target block -> (n_headers, n_targets), rounded like thefuzz
+    target_scores = np.round(np.maximum.reduceat(scores, _GROUP_STARTS, axis=1))
+    best_idx = target_scores.argmax(axis=1)
+    best_score = target_scores[np.arange(len(headers)), best_idx]
+
+    return {
+        header: _TARGETS[idx]
+        for header, idx, score in zip(headers, best_idx, best_score)
+        if score > MATCH_THRESHOLD
+    }
+
+def _pairwise_rename(headers: list) -> dict:
+    """ Original per-column extractOne loop (used when rapidfuzz is unavailable) """
+    rename_map = {}
+    for col in headers:
         col_lower = col.lower()
         best_match_score = 0
         best_target = None
 
         for target_key, keywords in TARGET_SCHEMA.items():
             match, score = process.extractOne(col_lower, keywords)
-            if score > 88: 
+            if score > MATCH_THRESHOLD: 
                 if score > best_match_score:
                     best_match_score = score
                     best_target = target_key
 
         if best_target:
             rename_map[col] = best_target
+    return rename_map
+
+def build_rename_map(headers) -> dict:
+    """
+    Maps raw (stripped) headers to TARGET_SCHEMA keys.
+    Recurring vendor layouts are served from the header-signature cache.
+    """
+    global _cache_dirty
+    headers = [str(h) for h in headers]
+    key = _signature(headers)
+
+    with _cache_lock:
+        if not _cache_loaded:
+            _load_disk_cache()
+        if key in _cache:
+            _cache.move_to_end(key)
+            return dict(_cache[key])
+
+    if not headers:
+        rename_map = {}
+    elif rf_process is not None:
+        rename_map = _score_matrix_rename(headers)
+    else:
+        rename_map = _pairwise_rename(headers)
+
+    with _cache_lock:
+        _cache[key] = rename_map
+        if len(_cache) > MAPPER_CACHE_SIZE:
+            _cache.popitem(last=False)
+        _cache_dirty = True
+
+    return dict(rename_map)
+
+def normalize_dataframe_columns(df: pd.DataFrame) -> pd.DataFrame:
+    df.columns = [str(c).strip() for c in df.columns]
+    rename_map = build_rename_map(df.columns.tolist())
 
     if rename_map:
         df = df.rename(columns=rename_map)
-    return df
\ No newline at end of file
+    return df
@@ -0,0 +1,143 @@
+# backend/app/utils/subject_analytics.py
+import logging
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from backend.app.core.database import is_postgres
+from backend.app.utils.dqi import DEVIATION_PENALTY, OPEN_SAE_PENALTY
+
+logger = logging.getLogger(__name__)
+
+# risk_score points per open item (capped at 100); deviations / SAEs cost what they cost in the DQI
+MISSING_PAGE_POINTS = 1
+OVERDUE_VISIT_POINTS = 2
+
+_TARGETS = {
+    "subjects": "SELECT subject_id, study_name, site_id FROM subjects WHERE subject_id = ANY(CAST(:ids AS text[]))",
+    "study": "SELECT subject_id, study_name, site_id FROM subjects WHERE study_name = :study",
+    "all": "SELECT subject_id, study_name, site_id FROM subjects",
+}
+
+
+_COLUMNS = ("subject_id", "study_name", "site_id", "missing_pages", "protocol_deviations", "saes", "open_saes",
+            "overdue_visits", "is_clean_patient", "total_open_issues", "risk_score")
+
+
+def _select_sql(targets: str) -> str:
+    """
+    The subject_analytics columns computed live for the target set: every raw table is
+    aggregated once (GROUP BY subject_id, joined to the targets on the subject_id indexes).
+    Overdue visits are counted against CURRENT_DATE.
+    """
+    return f"""
+    WITH targets AS ({targets}),
+    missing AS (
+        SELECT mp.subject_id, COUNT(*) AS n
+        FROM raw_missing_pages mp JOIN targets t ON t.subject_id = mp.subject_id
+        GROUP BY mp.subject_id
+    ),
+    deviations AS (
+        SELECT pd.subject_id, COUNT(*) AS n
+        FROM raw_protocol_deviations pd JOIN targets t ON t.subject_id = pd.subject_id
+        GROUP BY pd.subject_id
+    ),
+    saes AS (
+        SELECT sae.subject_id, COUNT(*) AS n,
+               SUM(CASE WHEN sae.case_status = 'Open' THEN 1 ELSE 0 END) AS open_n
+        FROM raw_sae_safety sae JOIN targets t ON t.subject_id = sae.subject_id
+        GROUP BY sae.subject_id
+    ),
+    visits AS (
+        SELECT vp.subject_id,
+               SUM(CASE WHEN COALESCE(CURRENT_DATE - vp.projected_date, vp.days_outstanding) > 0
+                        THEN 1 ELSE 0 END) AS overdue
+        FROM raw_visit_projections vp JOIN targets t ON t.subject_id = vp.subject_id
+        GROUP BY vp.subject_id
+    ),
+    counts AS (
+        SELECT t.subject_id, t.study_name, t.site_id,
+               COALESCE(m.n, 0) AS missing_pages,
+               COALESCE(d.n, 0) AS protocol_deviations,
+               COALESCE(s.n, 0) AS saes,
+               COALESCE(s.open_n, 0) AS open_saes,
+               COALESCE(v.overdue, 0) AS overdue_visits
+        FROM targets t
+        LEFT JOIN missing m ON m.subject_id = t.subject_id
+        LEFT JOIN deviations d ON d.subject_id = t.subject_id
+        LEFT JOIN saes s ON s.subject_id = t.subject_id
+        LEFT JOIN visits v ON v.subject_id = t.subject_id
+    )
+    SELECT subject_id, study_name, site_id, missing_pages, protocol_deviations, saes, open_saes, overdue_visits,
+           missing_pages = 0 AND protocol_deviations = 0 AS is_clean_patient,
+           missing_pages + protocol_deviations + open_saes + overdue_visits AS total_open_issues,
+           LEAST(100, missing_pages * {MISSING_PAGE_POINTS} + overdue_visits * {OVERDUE_VISIT_POINTS}
+                      + protocol_deviations * {DEVIATION_PENALTY} + open_saes * {OPEN_SAE_PENALTY}) AS risk_score
+    FROM counts
+    """
+
+
+def _refresh_sql(targets: str) -> str:
+    """ One INSERT .. ON CONFLICT for the whole target set; overdue visits are as of last_calculated """
+    columns = ", ".join(_COLUMNS)
+    return f"""
+    INSERT INTO subject_analytics ({columns}, last_calculated)
+    SELECT {columns}, now() FROM ({_select_sql(targets)}) AS computed
+    ON CONFLICT (subject_id) DO UPDATE SET
+        study_name = EXCLUDED.study_name,
+        site_id = EXCLUDED.site_id,
+        missing_pages = EXCLUDED.missing_pages,
+        protocol_deviations = EXCLUDED.protocol_deviations,
+        saes = EXCLUDED.saes,
+        open_saes = EXCLUDED.open_saes,
+        overdue_visits = EXCLUDED.overdue_visits,
+        is_clean_patient = EXCLUDED.is_clean_patient,
+        total_open_issues = EXCLUDED.total_open_issues,
+        risk_score = EXCLUDED.risk_score,
+        last_calculated = EXCLUDED.last_calculated
+    """
+
+
+def compute_subjects(db: Session, subject_ids) -> dict:
+    """
+    {subject_id: row mapping} computed live, without writing anything. Read endpoints use it
+    for subjects that have no subject_analytics row yet (rebuilds are left to ingest / the script).
+    """
+    ids = sorted({str(s) for s in subject_ids if s is not None})
+    if not ids:
+        return {}
+    rows = db.execute(text(_select_sql(_TARGETS["subjects"])), {"ids": ids}).mappings().fetchall()
+    return {row["subject_id"]: row for row in rows}
+
+
+def refresh_subjects(db: Session, subject_ids) -> int:
+    """ Recomputes the given subjects (runs in the caller's transaction). Returns rows written. """
+    ids = sorted({str(s) for s in subject_ids if s is not None})
+    if not ids:
+        return 0
+    return db.execute(text(_refresh_sql(_TARGETS["subjects"])), {"ids": ids}).rowcount
+
+
+def rebuild(db: Session, study_name: str = None) -> int:
+    """ Full recompute for one study, or every subject when study_name is None. Commits. """
+    if study_name:
+        written = db.execute(text(_refresh_sql(_TARGETS["study"])), {"study": study_name}).rowcount
+    else:
+        written = db.execute(text(_refresh_sql(_TARGETS["all"]))).rowcount
+    db.commit()
+    return written
+
+
+def refresh_after_ingest(db: Session, study_name: str, subject_ids) -> int:
+    """
+    Post-ingest step: recompute the subjects the upload touched and commit. Never fails the ingest.
+    Skipped on non-Postgres databases (e.g. the SQLite benchmark stand-in).
+    """
+    if not is_postgres(db.get_bind()):
+        return 0
+    try:
+        written = refresh_subjects(db, subject_ids)
+        db.commit()
+        return written
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"subject_analytics refresh failed for {study_name}: {e}")
+        return 0
@@ -1,6 +1,7 @@
-from backend.app.core.database import engine, Base
-from backend.app.core.models import * # Import all models
+from backend.app.core import migrations
 
-print("Creating tables in Neon...")
-Base.metadata.create_all(bind=engine)
-print("Tables created successfully!")
\ No newline at end of file
+# Schema lives in backend/migrations (versioned SQL); this is kept as the old entry point.
+# Same as: python -m backend.scripts.migrate upgrade
+print("Applying schema migrations...")
+applied = migrations.upgrade()
+print(f"Applied: {applied}" if applied else "Database already up to date.")
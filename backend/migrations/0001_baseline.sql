@@ -0,0 +1,160 @@
+-- ================================
+-- BASELINE SCHEMA
+-- The tables as they exist in the Neon database (see schema.sql dump),
+-- plus the ingest ledger. IF NOT EXISTS throughout, so an existing
+-- database is adopted as-is and only gets the runner's bookkeeping row.
+-- ================================
+
+CREATE TABLE IF NOT EXISTS subjects (
+    subject_id TEXT PRIMARY KEY,
+    site_id TEXT,
+    study_id TEXT,
+    country TEXT,
+    region TEXT,
+    status TEXT,
+    study_name TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_subjects_site ON subjects (site_id);
+
+CREATE TABLE IF NOT EXISTS raw_cpid_metrics (
+    id SERIAL PRIMARY KEY,
+    subject_id TEXT,
+    site_id TEXT,
+    study_name TEXT,
+    country TEXT,
+    region TEXT,
+    subject_status TEXT,
+    missing_visits INTEGER DEFAULT 0,
+    missing_pages INTEGER DEFAULT 0,
+    open_queries INTEGER DEFAULT 0,
+    coded_terms INTEGER DEFAULT 0,
+    uncoded_terms INTEGER DEFAULT 0,
+    protocol_deviations INTEGER DEFAULT 0,
+    pages_entered INTEGER DEFAULT 0,
+    clean_crf_percent DOUBLE PRECISION DEFAULT 0.0,
+    forms_verified INTEGER DEFAULT 0,
+    forms_locked INTEGER DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS raw_visit_projections (
+    id SERIAL PRIMARY KEY,
+    subject_id TEXT,
+    site_id TEXT,
+    study_name TEXT,
+    country TEXT,
+    visit_name TEXT,
+    projected_date TEXT,
+    days_outstanding INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS raw_missing_pages (
+    id SERIAL PRIMARY KEY,
+    subject_id TEXT,
+    site_id TEXT,
+    form_name TEXT,
+    visit_date TEXT,
+    days_missing INTEGER,
+    study_name TEXT
+);
+
+CREATE TABLE IF NOT EXISTS raw_protocol_deviations (
+    id SERIAL PRIMARY KEY,
+    subject_id TEXT,
+    site_id TEXT,
+    category TEXT,
+    pd_status TEXT,
+    visit_date TEXT,
+    study_name TEXT
+);
+
+CREATE TABLE IF NOT EXISTS raw_lab_issues (
+    id SERIAL PRIMARY KEY,
+    subject_id TEXT,
+    site_id TEXT,
+    country TEXT,
+    visit TEXT,
+    lab_category TEXT,
+    test_name TEXT,
+    issue_type TEXT
+);
+
+CREATE TABLE IF NOT EXISTS raw_sae_safety (
+    id SERIAL PRIMARY KEY,
+    subject_id TEXT,
+    case_status TEXT,
+    review_status TEXT,
+    site_id TEXT,
+    discrepancy_id TEXT
+);
+
+CREATE TABLE IF NOT EXISTS raw_sae_dm (
+    id SERIAL PRIMARY KEY,
+    subject_id TEXT,
+    discrepancy_id TEXT,
+    action_status TEXT,
+    site_id TEXT
+);
+
+CREATE TABLE IF NOT EXISTS raw_coding_meddra (
+    id SERIAL PRIMARY KEY,
+    subject_id TEXT,
+    term TEXT,
+    coding_status TEXT
+);
+
+CREATE TABLE IF NOT EXISTS raw_coding_whodra (
+    id SERIAL PRIMARY KEY,
+    subject_id TEXT,
+    trade_name TEXT,
+    coding_status TEXT
+);
+
+CREATE TABLE IF NOT EXISTS raw_inactivated_forms (
+    id SERIAL PRIMARY KEY,
+    subject_id TEXT,
+    site_id TEXT,
+    folder_name TEXT,
+    form_name TEXT,
+    audit_action TEXT
+);
+
+CREATE TABLE IF NOT EXISTS raw_edrr_issues (
+    id SERIAL PRIMARY KEY,
+    subject_id TEXT,
+    site_id TEXT,
+    issue_count INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS raw_sdv_metrics (
+    site_id TEXT,
+    subject_id TEXT,
+    visit_date TIMESTAMP,
+    form_name TEXT,
+    verification_status TEXT
+);
+
+CREATE TABLE IF NOT EXISTS subject_analytics (
+    subject_id TEXT PRIMARY KEY,
+    is_clean_patient BOOLEAN DEFAULT FALSE,
+    risk_score DOUBLE PRECISION DEFAULT 0.0,
+    total_open_issues INTEGER DEFAULT 0,
+    days_since_last_activity INTEGER DEFAULT 0,
+    last_calculated TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+-- ================================
+-- INGESTION BOOKKEEPING (models.IngestLedger)
+-- ================================
+CREATE TABLE IF NOT EXISTS ingest_ledger (
+    id SERIAL PRIMARY KEY,
+    scope TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    study_name TEXT,
+    filename TEXT,
+    sheet_name TEXT,
+    dataset_key TEXT,
+    row_count INTEGER DEFAULT 0,
+    created_at TIMESTAMPTZ DEFAULT now()
+);
+CREATE INDEX IF NOT EXISTS ix_ingest_ledger_content_hash ON ingest_ledger (content_hash);
+CREATE INDEX IF NOT EXISTS ix_ingest_ledger_study_name ON ingest_ledger (study_name);
@@ -0,0 +1,44 @@
+-- ================================
+-- ROW PROVENANCE (load_id on raw tables)
+-- Every ingested row is tagged with the ingest_ledger.load_id of the sheet
+-- load that produced it, so a corrected export can atomically replace it.
+-- ================================
+
+ALTER TABLE ingest_ledger ADD COLUMN IF NOT EXISTS load_id TEXT;
+ALTER TABLE ingest_ledger ADD COLUMN IF NOT EXISTS target_table TEXT;
+ALTER TABLE ingest_ledger ADD COLUMN IF NOT EXISTS mode TEXT;
+CREATE INDEX IF NOT EXISTS ix_ingest_ledger_load_id ON ingest_ledger (load_id);
+CREATE INDEX IF NOT EXISTS idx_ingest_ledger_source ON ingest_ledger (study_name, filename, sheet_name, target_table);
+
+ALTER TABLE raw_cpid_metrics ADD COLUMN IF NOT EXISTS load_id TEXT;
+CREATE INDEX IF NOT EXISTS ix_raw_cpid_metrics_load_id ON raw_cpid_metrics (load_id);
+
+ALTER TABLE raw_protocol_deviations ADD COLUMN IF NOT EXISTS load_id TEXT;
+CREATE INDEX IF NOT EXISTS ix_raw_protocol_deviations_load_id ON raw_protocol_deviations (load_id);
+
+ALTER TABLE raw_visit_projections ADD COLUMN IF NOT EXISTS load_id TEXT;
+CREATE INDEX IF NOT EXISTS ix_raw_visit_projections_load_id ON raw_visit_projections (load_id);
+
+ALTER TABLE raw_lab_issues ADD COLUMN IF NOT EXISTS load_id TEXT;
+CREATE INDEX IF NOT EXISTS ix_raw_lab_issues_load_id ON raw_lab_issues (load_id);
+
+ALTER TABLE raw_sae_safety ADD COLUMN IF NOT EXISTS load_id TEXT;
+CREATE INDEX IF NOT EXISTS ix_raw_sae_safety_load_id ON raw_sae_safety (load_id);
+
+ALTER TABLE raw_sae_dm ADD COLUMN IF NOT EXISTS load_id TEXT;
+CREATE INDEX IF NOT EXISTS ix_raw_sae_dm_load_id ON raw_sae_dm (load_id);
+
+ALTER TABLE raw_coding_meddra ADD COLUMN IF NOT EXISTS load_id TEXT;
+CREATE INDEX IF NOT EXISTS ix_raw_coding_meddra_load_id ON raw_coding_meddra (load_id);
+
+ALTER TABLE raw_coding_whodra ADD COLUMN IF NOT EXISTS load_id TEXT;
+CREATE INDEX IF NOT EXISTS ix_raw_coding_whodra_load_id ON raw_coding_whodra (load_id);
+
+ALTER TABLE raw_missing_pages ADD COLUMN IF NOT EXISTS load_id TEXT;
+CREATE INDEX IF NOT EXISTS ix_raw_missing_pages_load_id ON raw_missing_pages (load_id);
+
+ALTER TABLE raw_inactivated_forms ADD COLUMN IF NOT EXISTS load_id TEXT;
+CREATE INDEX IF NOT EXISTS ix_raw_inactivated_forms_load_id ON raw_inactivated_forms (load_id);
+
+ALTER TABLE raw_edrr_issues ADD COLUMN IF NOT EXISTS load_id TEXT;
+CREATE INDEX IF NOT EXISTS ix_raw_edrr_issues_load_id ON raw_edrr_issues (load_id);
@@ -0,0 +1,50 @@
+-- ================================
+-- NATIVE DATE COLUMNS
+-- projected_date / visit_date were TEXT ("messy Excel formats"), so timelines
+-- sorted lexically and no date range could use an index. Ingest now parses them
+-- into DATE and keeps the source text in <col>_raw.
+-- Columns that are already DATE are left alone.
+-- ================================
+
+-- TEXT -> DATE without failing the whole ALTER on one bad cell:
+-- Excel serials (45321), then anything PostgreSQL can read (DateStyle MDY), else NULL
+CREATE OR REPLACE FUNCTION clarity_try_date(value TEXT) RETURNS DATE AS $$
+DECLARE
+    cleaned TEXT := btrim(value);
+BEGIN
+    IF cleaned IS NULL OR cleaned IN ('', 'nan', 'NaT', 'None') THEN
+        RETURN NULL;
+    END IF;
+    IF cleaned ~ '^[0-9]{5,7}(\.[0-9]+)?$' THEN
+        RETURN DATE '1899-12-30' + round(cleaned::numeric)::int;
+    END IF;
+    RETURN cleaned::date;
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+CREATE OR REPLACE FUNCTION clarity_convert_to_date(tbl TEXT, col TEXT) RETURNS VOID AS $$
+BEGIN
+    EXECUTE format('ALTER TABLE %I ADD COLUMN IF NOT EXISTS %I TEXT', tbl, col || '_raw');
+    IF EXISTS (
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = tbl AND column_name = col
+          AND data_type IN ('text', 'character varying')
+    ) THEN
+        EXECUTE format('UPDATE %I SET %I = %I WHERE %I IS NULL', tbl, col || '_raw', col, col || '_raw');
+        EXECUTE format('ALTER TABLE %I ALTER COLUMN %I TYPE DATE USING clarity_try_date(%I)', tbl, col, col);
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT clarity_convert_to_date('raw_visit_projections', 'projected_date');
+SELECT clarity_convert_to_date('raw_missing_pages', 'visit_date');
+SELECT clarity_convert_to_date('raw_protocol_deviations', 'visit_date');
+
+-- Date-window filters in the DQI / sentinel / subject-details queries
+CREATE INDEX IF NOT EXISTS ix_raw_visit_projections_study_projected_date ON raw_visit_projections (study_name, projected_date);
+CREATE INDEX IF NOT EXISTS ix_raw_missing_pages_study_visit_date ON raw_missing_pages (study_name, visit_date);
+CREATE INDEX IF NOT EXISTS ix_raw_protocol_deviations_study_visit_date ON raw_protocol_deviations (study_name, visit_date);
+
+DROP FUNCTION clarity_convert_to_date(TEXT, TEXT);
@@ -0,0 +1,53 @@
+-- ================================
+-- ANALYTICS ACCESS PATHS
+-- Every dashboard / sentinel / agent / chat query filters on study_name,
+-- site_id or subject_id (or joins subjects on subject_id); until now the raw
+-- tables only had their primary keys. Verify with:
+--     python -m backend.scripts.migrate check
+-- Tables created by other tools may lack some columns, so each index is only
+-- built when its table and columns exist.
+-- ================================
+
+CREATE OR REPLACE FUNCTION clarity_create_index(idx TEXT, tbl TEXT, cols TEXT[]) RETURNS VOID AS $$
+BEGIN
+    IF (SELECT count(*) FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = tbl AND column_name = ANY(cols)) = cardinality(cols) THEN
+        EXECUTE format('CREATE INDEX IF NOT EXISTS %I ON %I (%s)', idx, tbl,
+                       (SELECT string_agg(quote_ident(c), ', ') FROM unnest(cols) AS c));
+    END IF;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Study / site lookups (sites-list, site-details, DQI, agent site risk)
+SELECT clarity_create_index('ix_subjects_study_site', 'subjects', ARRAY['study_name', 'site_id']);
+
+-- Study-scoped raw tables: per-site rollups and per-subject drill-downs
+SELECT clarity_create_index('ix_raw_missing_pages_study_site', 'raw_missing_pages', ARRAY['study_name', 'site_id']);
+SELECT clarity_create_index('ix_raw_missing_pages_subject', 'raw_missing_pages', ARRAY['subject_id', 'study_name']);
+SELECT clarity_create_index('ix_raw_protocol_deviations_study_site', 'raw_protocol_deviations', ARRAY['study_name', 'site_id']);
+SELECT clarity_create_index('ix_raw_protocol_deviations_subject', 'raw_protocol_deviations', ARRAY['subject_id', 'study_name']);
+SELECT clarity_create_index('ix_raw_visit_projections_study_site', 'raw_visit_projections', ARRAY['study_name', 'site_id']);
+SELECT clarity_create_index('ix_raw_visit_projections_subject', 'raw_visit_projections', ARRAY['subject_id', 'study_name']);
+SELECT clarity_create_index('ix_raw_cpid_metrics_study_site', 'raw_cpid_metrics', ARRAY['study_name', 'site_id']);
+SELECT clarity_create_index('ix_raw_cpid_metrics_subject', 'raw_cpid_metrics', ARRAY['subject_id']);
+
+-- Tables without study_name are filtered by joining subjects on subject_id
+SELECT clarity_create_index('ix_raw_inactivated_forms_site', 'raw_inactivated_forms', ARRAY['site_id']);
+SELECT clarity_create_index('ix_raw_inactivated_forms_subject', 'raw_inactivated_forms', ARRAY['subject_id']);
+SELECT clarity_create_index('ix_raw_lab_issues_site', 'raw_lab_issues', ARRAY['site_id']);
+SELECT clarity_create_index('ix_raw_lab_issues_subject', 'raw_lab_issues', ARRAY['subject_id']);
+SELECT clarity_create_index('ix_raw_sae_safety_site_status', 'raw_sae_safety', ARRAY['site_id', 'case_status']);
+SELECT clarity_create_index('ix_raw_sae_safety_subject', 'raw_sae_safety', ARRAY['subject_id']);
+SELECT clarity_create_index('ix_raw_sae_dm_site', 'raw_sae_dm', ARRAY['site_id']);
+SELECT clarity_create_index('ix_raw_sae_dm_subject', 'raw_sae_dm', ARRAY['subject_id']);
+SELECT clarity_create_index('ix_raw_coding_meddra_subject', 'raw_coding_meddra', ARRAY['subject_id', 'coding_status']);
+SELECT clarity_create_index('ix_raw_coding_whodra_subject', 'raw_coding_whodra', ARRAY['subject_id', 'coding_status']);
+SELECT clarity_create_index('ix_raw_edrr_issues_site', 'raw_edrr_issues', ARRAY['site_id']);
+SELECT clarity_create_index('ix_raw_edrr_issues_subject', 'raw_edrr_issues', ARRAY['subject_id']);
+SELECT clarity_create_index('ix_raw_sdv_metrics_site', 'raw_sdv_metrics', ARRAY['site_id']);
+SELECT clarity_create_index('ix_raw_sdv_metrics_subject', 'raw_sdv_metrics', ARRAY['subject_id']);
+
+DROP FUNCTION clarity_create_index(TEXT, TEXT, TEXT[]);
+
+-- Fresh statistics so the planner picks the new indexes right away
+ANALYZE;
@@ -0,0 +1,11 @@
+-- ================================
+-- STUDY DATA VERSIONS
+-- Bumped in the same transaction as every sheet load, so cached analytics
+-- responses (and their ETags) change exactly when a study's data does.
+-- ================================
+
+CREATE TABLE IF NOT EXISTS study_data_versions (
+    study_name TEXT PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ DEFAULT now()
+);
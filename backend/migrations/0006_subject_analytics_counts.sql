@@ -0,0 +1,17 @@
+-- ================================
+-- SUBJECT ANALYTICS (materialized per subject)
+-- Filled by utils/subject_analytics.py after every ingest for the subjects the
+-- load touched; site-details / subject-details read these rows instead of
+-- counting the raw tables per request. Full rebuild:
+--     python -m backend.scripts.rebuild_subject_analytics
+-- ================================
+
+ALTER TABLE subject_analytics ADD COLUMN IF NOT EXISTS study_name TEXT;
+ALTER TABLE subject_analytics ADD COLUMN IF NOT EXISTS site_id TEXT;
+ALTER TABLE subject_analytics ADD COLUMN IF NOT EXISTS missing_pages INTEGER DEFAULT 0;
+ALTER TABLE subject_analytics ADD COLUMN IF NOT EXISTS protocol_deviations INTEGER DEFAULT 0;
+ALTER TABLE subject_analytics ADD COLUMN IF NOT EXISTS saes INTEGER DEFAULT 0;
+ALTER TABLE subject_analytics ADD COLUMN IF NOT EXISTS open_saes INTEGER DEFAULT 0;
+ALTER TABLE subject_analytics ADD COLUMN IF NOT EXISTS overdue_visits INTEGER DEFAULT 0;
+
+CREATE INDEX IF NOT EXISTS ix_subject_analytics_study_site ON subject_analytics (study_name, site_id);
@@ -0,0 +1,26 @@
+-- ================================
+-- SITE ROLLUP
+-- Per (study, site) counts and DQI component scores, refreshed after each
+-- ingest for the sites it touched (utils/site_rollup.py). The dashboard,
+-- DQI breakdown, sentinel alerts and agent site risk read from here instead
+-- of re-aggregating the raw tables on every call. The weighted DQI itself is
+-- computed on read, so DQI_WEIGHTS changes need no rebuild.
+-- ================================
+
+CREATE TABLE IF NOT EXISTS site_rollup (
+    study_name TEXT NOT NULL,
+    site_id TEXT NOT NULL,
+    subjects INTEGER DEFAULT 0,
+    visits INTEGER DEFAULT 0,
+    deviations INTEGER DEFAULT 0,
+    open_saes INTEGER DEFAULT 0,
+    coded_terms INTEGER DEFAULT 0,
+    missing_pages INTEGER DEFAULT 0,
+    inactivated_forms INTEGER DEFAULT 0,
+    visit_score DOUBLE PRECISION DEFAULT 100,
+    query_score DOUBLE PRECISION DEFAULT 100,
+    safety_score DOUBLE PRECISION DEFAULT 100,
+    coding_score DOUBLE PRECISION DEFAULT 100,
+    refreshed_at TIMESTAMPTZ DEFAULT now(),
+    PRIMARY KEY (study_name, site_id)
+);
@@ -0,0 +1,158 @@
+"""
+INGESTION BENCHMARK
+
+Runs ingest_file over a directory of files (see generate_synthetic_data.py)
+and writes per-stage timings as JSON, so runs on different branches/machines
+can be compared side by side.
+
+Stages reported per sheet: preview, header, classify, parse, mapping,
+dtypes, transform, fingerprint, subjects, insert (+ file-level fingerprint/open).
+
+Usage (from the repo root):
+    python -m backend.scripts.benchmark_ingest --data-dir bench_data \\
+        --database-url sqlite:///bench.db --create-schema --out bench_results.json
+
+--database-url defaults to $DATABASE_URL (e.g. a local Postgres with the real schema).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import datetime
+import platform
+from types import SimpleNamespace
+
+SUPPORTED = (".xlsx", ".xls", ".csv")
+
+
+def create_schema(engine):
+    """ Minimal stand-in schema (SQLite or an empty Postgres) built from the registries """
+    from sqlalchemy import text
+    from backend.app.core.models import IngestLedger
+    from backend.app.utils.dataset_registry import DATASET_SPECS, get_dtype_plan
+    from backend.app.utils.column_mappings import COLUMN_MAPPINGS
+
+    pk = "id INTEGER PRIMARY KEY" if engine.dialect.name == "sqlite" else "id SERIAL PRIMARY KEY"
+    sql_types = {"Int32": "INTEGER", "float32": "DOUBLE PRECISION"}
+
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS subjects (
+                subject_id TEXT PRIMARY KEY, site_id TEXT, study_id TEXT, country TEXT,
+                region TEXT, status TEXT, study_name TEXT
+            )
+        """))
+        for key, spec in DATASET_SPECS.items():
+            plan = get_dtype_plan(key)
+            columns = ["study_name", "site_id", "subject_id", "load_id"]
+            columns += list(COLUMN_MAPPINGS.get(key, {}).keys()) + spec["required_columns"]
+            columns = list(dict.fromkeys(columns))
+            ddl = ", ".join([pk] + [f'"{c}" {sql_types.get(plan.get(c), "TEXT")}' for c in columns])
+            conn.execute(text(f'CREATE TABLE IF NOT EXISTS "{spec["table"]}" ({ddl})'))
+        # Every sheet load bumps the study's data version in the same transaction
+        conn.execute(text("""
+            CREATE TABLE IF NOT EXISTS study_data_versions (
+                study_name TEXT PRIMARY KEY, version BIGINT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+    IngestLedger.__table__.create(bind=engine, checkfirst=True)
+
+
+def run(args) -> dict:
+    # Config reads DATABASE_URL at import time, so set it before importing the app
+    os.environ["DATABASE_URL"] = args.database_url
+    import pandas as pd
+    from sqlalchemy import text
+    from backend.app.core.database import SessionLocal, engine
+    from backend.app.core import schema_registry
+    from backend.app.utils.ingest_excel import ingest_file
+
+    if args.create_schema:
+        create_schema(engine)
+    schema_registry.invalidate()
+    schema_registry.load()
+
+    files = sorted(f for f in os.listdir(args.data_dir) if f.lower().endswith(SUPPORTED))
+    runs = []
+
+    for filename in files:
+        path = os.path.join(args.data_dir, filename)
+        db = SessionLocal()
+        try:
+            if not args.keep_ledger:
+                # Measure a full ingest every time instead of the 'unchanged' short-circuit
+                db.execute(text("DELETE FROM ingest_ledger"))
+                db.commit()
+
+            start = time.perf_counter()
+            with open(path, "rb") as fh:
+                result = ingest_file(SimpleNamespace(filename=filename, file=fh), db, study_name=args.study)
+            seconds = time.perf_counter() - start
+        finally:
+            db.close()
+
+        sheets = result.get("sheets", [])
+        rows = sum(s.get("rows", 0) for s in sheets)
+        stage_totals = {}
+        for sheet in sheets:
+            for stage, value in sheet.get("timings", {}).items():
+                stage_totals[stage] = round(stage_totals.get(stage, 0.0) + value, 4)
+
+        runs.append({
+            "file": filename,
+            "format": os.path.splitext(filename)[1].lstrip("."),
+            "bytes": os.path.getsize(path),
+            "status": result.get("status"),
+            "rows": rows,
+            "seconds": round(seconds, 4),
+            "rows_per_sec": int(rows / seconds) if seconds > 0 else rows,
+            "file_stages": result.get("timings", {}),
+            "stage_totals": stage_totals,
+            "sheets": [{
+                "sheet": s.get("sheet"),
+                "dataset": s.get("dataset"),
+                "rows": s.get("rows"),
+                "method": s.get("method"),
+                "stages": s.get("timings", {}),
+                "memory_mb_before": s.get("memory_mb_before"),
+                "memory_mb_after": s.get("memory_mb_after"),
+            } for s in sheets],
+            "details": result.get("details") or result.get("reason"),
+        })
+        print(f"{'✅' if result.get('status') != 'error' else '❌'} {filename}: {rows} rows in {seconds:.2f}s")
+
+    return {
+        "meta": {
+            "label": args.label,
+            "started_at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "database": engine.dialect.name,
+            "python": sys.version.split()[0],
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "data_dir": os.path.abspath(args.data_dir),
+        },
+        "runs": runs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark CLARITY ingest_file stages")
+    parser.add_argument("--data-dir", default="bench_data")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL", "sqlite:///bench.db"))
+    parser.add_argument("--create-schema", action="store_true", help="create stand-in tables if missing")
+    parser.add_argument("--keep-ledger", action="store_true", help="measure the re-upload (unchanged) path")
+    parser.add_argument("--study", default=None, help="force a study name (default: from filename)")
+    parser.add_argument("--label", default="local")
+    parser.add_argument("--out", default="bench_results.json")
+    args = parser.parse_args()
+
+    results = run(args)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, default=str)
+    print(f"📊 Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+SYNTHETIC TRIAL EXPORTS (for benchmarks; no real patient data)
+
+Writes realistic Excel/CSV files for every dataset in DATASET_SPECS:
+- vendor header aliases taken from COLUMN_MAPPINGS (rotated per file)
+- title/export-date rows above the header, like real EDC exports
+- a cover sheet in workbooks (exercises sheet-selective parsing)
+
+Usage (from the repo root):
+    python -m backend.scripts.generate_synthetic_data --rows 1000 100000 --formats xlsx csv --out bench_data
+"""
+import os
+import csv
+import argparse
+import datetime
+import numpy as np
+from openpyxl import Workbook
+from backend.app.utils.dataset_registry import DATASET_SPECS, get_dtype_plan
+from backend.app.utils.column_mappings import COLUMN_MAPPINGS
+
+SCALES = [1_000, 10_000, 100_000, 1_000_000]
+
+SHEET_NAMES = {
+    "raw_cpid_metrics": "Subject Level Metrics",
+    "raw_protocol_deviations": "Protocol Deviation",
+    "raw_visit_projections": "Visit Projection Tracker",
+    "raw_lab_issues": "Missing Lab Name and Ranges",
+    "raw_sae_safety": "SAE Dashboard_Safety",
+    "raw_sae_dm": "SAE Dashboard_DM",
+    "raw_coding_meddra": "MedDRA Coding",
+    "raw_coding_whodra": "WHODrug Coding",
+    "raw_missing_pages": "Missing Pages Report",
+    "raw_inactivated_forms": "Inactivated Forms",
+    "raw_edrr_issues": "EDRR Reconciliation",
+}
+
+CHOICES = {
+    "subject_status": ["Screening", "Enrolled", "Completed", "Discontinued"],
+    "pd_status": ["Confirmed", "Proposed"],
+    "case_status": ["Open", "Closed"],
+    "review_status": ["Pending", "Reviewed"],
+    "action_status": ["Open", "Resolved", "Pending Action"],
+    "coding_status": ["Coded", "Uncoded", "Pending"],
+    "verification_status": ["Verified", "Not Verified"],
+    "audit_action": ["Inactivated", "Deleted", "Reactivated"],
+    "lab_category": ["Chemistry", "Hematology", "Urinalysis"],
+    "test_name": ["Hemoglobin", "ALT", "AST", "Creatinine", "Glucose", "Platelets", "WBC"],
+    "issue_type": ["Missing Range", "Missing Lab Name"],
+    "form_name": ["Demographics", "Vital Signs", "Adverse Events", "Concomitant Meds", "ECG", "Labs"],
+    "folder_name": ["Screening", "Baseline", "Week 4", "Week 12", "End of Study"],
+    "visit_name": ["Screening", "Baseline", "Week 4", "Week 12", "End of Study"],
+    "visit": ["Screening", "Baseline", "Week 4", "Week 12"],
+    "term": ["Headache", "Nausea", "Fatigue", "Rash", "Dizziness"],
+    "trade_name": ["Paracetamol", "Ibuprofen", "Metformin", "Atorvastatin"],
+}
+
+DATE_FORMATS = ["%d-%b-%Y", "%Y-%m-%d", "%m/%d/%Y"]
+
+
+def _columns_for(dataset_key: str, variant: int) -> list:
+    """ (canonical_name, vendor_header) pairs; required columns are always present """
+    mapping = dict(COLUMN_MAPPINGS.get(dataset_key, {}))
+    for col in DATASET_SPECS[dataset_key]["required_columns"]:
+        mapping.setdefault(col, [col.replace("_", " ").title()])
+    return [(canonical, aliases[variant % len(aliases)]) for canonical, aliases in mapping.items()]
+
+
+def _values(canonical: str, plan: dict, n: int, rng, ctx: dict) -> list:
+    if canonical == "subject_id":
+        return ctx["subjects"]
+    if canonical == "site_id":
+        return ctx["sites"]
+    if canonical == "study_name":
+        return [ctx["study"]] * n
+    if canonical in CHOICES:
+        return rng.choice(CHOICES[canonical], size=n).tolist()
+    if canonical.endswith("_date"):
+        base = datetime.date(2024, 1, 1)
+        fmt = DATE_FORMATS[ctx["variant"] % len(DATE_FORMATS)]
+        offsets = rng.integers(0, 540, size=n)
+        return [(base + datetime.timedelta(days=int(d))).strftime(fmt) for d in offsets]
+    if canonical == "discrepancy_id":
+        return [f"DISC-{i:07d}" for i in rng.integers(0, 9_999_999, size=n)]
+    if plan.get(canonical) == "float32":
+        return np.round(rng.uniform(40, 100, size=n), 2).tolist()
+    if plan.get(canonical) == "Int32":
+        return rng.poisson(3, size=n).tolist()
+    return [f"{canonical.replace('_', ' ').title()} {i}" for i in rng.integers(1, 50, size=n)]
+
+
+def generate_dataset(dataset_key: str, rows: int, variant: int, seed: int = 7) -> tuple:
+    """ Returns (preamble_rows, header, data_rows, study_name) for one dataset """
+    rng = np.random.default_rng(seed + variant)
+    n_subjects = max(50, rows // 20)
+    subject_pool = np.arange(1001, 1001 + n_subjects)
+    picked = rng.choice(subject_pool, size=rows)
+
+    ctx = {
+        "study": f"Study {variant % 25 + 1}",
+        "variant": variant,
+        "subjects": [str(s) for s in picked],
+        "sites": [f"Site {(s - 1001) // 10 + 1}" for s in picked],
+    }
+
+    plan = get_dtype_plan(dataset_key)
+    columns = _columns_for(dataset_key, variant)
+    header = [vendor for _, vendor in columns]
+    data = [_values(canonical, plan, rows, rng, ctx) for canonical, _ in columns]
+
+    # 0-3 title rows above the header (what find_header_row has to skip)
+    preamble = [
+        [f"{SHEET_NAMES[dataset_key]} Report"],
+        [f"Exported: {datetime.date(2025, 1, 6).isoformat()}"],
+        [f"Protocol: {ctx['study']}"],
+    ][:variant % 4]
+
+    return preamble, header, list(zip(*data)), ctx["study"]
+
+
+def write_xlsx(path: str, sheets: list):
+    wb = Workbook(write_only=True)
+    cover = wb.create_sheet("Cover")
+    cover.append(["Synthetic export generated for ingestion benchmarks"])
+    for sheet_name, preamble, header, rows in sheets:
+        ws = wb.create_sheet(sheet_name[:31])
+        for line in preamble:
+            ws.append(line)
+        ws.append(header)
+        for row in rows:
+            ws.append(row)
+    wb.save(path)
+
+
+def write_csv(path: str, preamble: list, header: list, rows: list):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        # Spreadsheet CSV exports pad title rows to the table width
+        writer.writerows(line + [""] * (len(header) - len(line)) for line in preamble)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic CLARITY ingest files")
+    parser.add_argument("--rows", type=int, nargs="+", default=SCALES[:2], help=f"row counts, e.g. {SCALES}")
+    parser.add_argument("--formats", nargs="+", default=["xlsx", "csv"], choices=["xlsx", "csv"])
+    parser.add_argument("--datasets", nargs="+", default=list(DATASET_SPECS.keys()))
+    parser.add_argument("--out", default="bench_data")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    for rows in args.rows:
+        for variant, dataset_key in enumerate(args.datasets):
+            preamble, header, data, study = generate_dataset(dataset_key, rows, variant, args.seed)
+            base = os.path.join(args.out, f"{study}_{dataset_key}_{rows}")
+
+            if "xlsx" in args.formats:
+                write_xlsx(base + ".xlsx", [(SHEET_NAMES[dataset_key], preamble, header, data)])
+                print(f"✅ {base}.xlsx")
+            if "csv" in args.formats:
+                write_csv(base + ".csv", preamble, header, data)
+                print(f"✅ {base}.csv")
+
+
+if __name__ == "__main__":
+    main()
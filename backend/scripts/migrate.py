@@ -0,0 +1,66 @@
+"""
+SCHEMA MIGRATIONS
+
+Applies the versioned SQL files in backend/migrations (tracked in the
+schema_migrations table) and checks that the endpoint queries hit indexes.
+
+Usage (from the repo root):
+    python -m backend.scripts.migrate upgrade            # apply everything pending
+    python -m backend.scripts.migrate upgrade --to 3     # stop after version 3
+    python -m backend.scripts.migrate status
+    python -m backend.scripts.migrate check              # EXPLAIN endpoint queries, flag Seq Scans
+
+After an upgrade, running API processes should reload their column metadata:
+    POST /api/admin/schema-cache/refresh
+"""
+import sys
+import argparse
+from backend.app.core import migrations
+
+
+def cmd_upgrade(args) -> int:
+    applied = migrations.upgrade(target=args.to)
+    if applied:
+        print(f"✅ Applied migrations: {', '.join(f'{v:04d}' for v in applied)}")
+    else:
+        print("✅ Database is up to date")
+    return 0
+
+
+def cmd_status(args) -> int:
+    for m in migrations.status():
+        when = f"  ({m['applied_at']:%Y-%m-%d %H:%M})" if m["applied_at"] else ""
+        print(f"{m['version']:04d}_{m['name']:<28} {m['state']}{when}")
+    return 0
+
+
+def cmd_check(args) -> int:
+    # Imports the API modules (for their SQL); upgrade/status don't need them
+    from backend.app.core import explain_check
+    report = explain_check.run()
+    for entry in report:
+        if entry["error"]:
+            print(f"❌ {entry['endpoint']}: {entry['error']}")
+        elif entry["seq_scans"]:
+            print(f"⚠️ {entry['endpoint']}: Seq Scan on {', '.join(entry['seq_scans'])}")
+        else:
+            print(f"✅ {entry['endpoint']}")
+    failing = sum(1 for entry in report if not entry["ok"])
+    print(f"\n{len(report) - failing}/{len(report)} endpoint queries use indexes only")
+    return 1 if failing else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="CLARITY schema migrations")
+    commands = parser.add_subparsers(dest="command", required=True)
+    upgrade = commands.add_parser("upgrade", help="apply pending migrations")
+    upgrade.add_argument("--to", type=int, default=None, help="highest version to apply")
+    upgrade.set_defaults(run=cmd_upgrade)
+    commands.add_parser("status", help="list migrations and their state").set_defaults(run=cmd_status)
+    commands.add_parser("check", help="EXPLAIN endpoint queries and flag sequential scans").set_defaults(run=cmd_check)
+    args = parser.parse_args()
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,41 @@
+"""
+SUBJECT + SITE ANALYTICS REBUILD
+
+Recomputes subject_analytics for every subject (or one study) in one set-based
+statement, then the per-site site_rollup from the same raw tables. Ingest keeps both
+current for the subjects/sites each upload touches; run this after migrations, manual
+data fixes, and daily (e.g. from cron just after midnight). Rows refreshed before today
+carry yesterday's overdue visits, so readers compute those subjects/sites live until then.
+
+Usage (from the repo root):
+    python -m backend.scripts.rebuild_subject_analytics
+    python -m backend.scripts.rebuild_subject_analytics --study "Study 7"
+"""
+import time
+import argparse
+from backend.app.core.database import SessionLocal, set_statement_timeout
+from backend.app.utils import subject_analytics, site_rollup
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild subject_analytics and site_rollup")
+    parser.add_argument("--study", default=None, help="only this study (default: all studies)")
+    args = parser.parse_args()
+
+    # A full rebuild of a large study can outlast the API's statement timeout
+    set_statement_timeout(0)
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        written = subject_analytics.rebuild(db, args.study)
+        print(f"✅ {written} subjects recomputed in {time.perf_counter() - started:.2f}s")
+
+        started = time.perf_counter()
+        sites = site_rollup.rebuild(db, args.study)
+        print(f"✅ {sites} sites rolled up in {time.perf_counter() - started:.2f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
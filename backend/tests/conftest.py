@@ -0,0 +1,5 @@
+# backend/tests/conftest.py
+import os
+
+# config.py refuses to import without a database; unit tests only need an in-memory one
+os.environ.setdefault("DATABASE_URL", "sqlite://")
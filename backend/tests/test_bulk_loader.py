@@ -0,0 +1,98 @@
+# backend/tests/test_bulk_loader.py
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("dotenv")
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from backend.app.utils import bulk_loader
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text('CREATE TABLE raw_missing_pages (subject_id TEXT, "Days Missing" INTEGER, score REAL)'))
+    session = Session(engine)
+    yield session
+    session.close()
+
+
+def _frame():
+    return pd.DataFrame({
+        "subject_id": ["1001", "1002", None],
+        "Days Missing": [3.0, None, 12.0],
+        "score": [1.5, 2.0, None],
+    })
+
+
+def test_prepare_chunk_uses_schema_int_columns():
+    chunk = bulk_loader._prepare_chunk(_frame(), int_columns={"Days Missing"})
+    assert str(chunk["Days Missing"].dtype) == "Int64"
+    assert chunk["Days Missing"].tolist()[0] == 3 and pd.isna(chunk["Days Missing"].iloc[1])
+    assert pd.api.types.is_float_dtype(chunk["score"])
+    assert chunk["subject_id"].tolist()[:2] == ["1001", "1002"]
+
+
+def test_prepare_chunk_rounds_int_columns():
+    chunk = bulk_loader._prepare_chunk(pd.DataFrame({"n": [2.6, 1.2]}), int_columns={"n"})
+    assert chunk["n"].tolist() == [3, 1]
+
+
+def test_prepare_chunk_without_schema_converts_whole_number_floats_only():
+    chunk = bulk_loader._prepare_chunk(_frame())
+    assert str(chunk["Days Missing"].dtype) == "Int64"
+    assert pd.api.types.is_float_dtype(chunk["score"])
+
+
+def test_prepare_chunk_does_not_modify_the_input():
+    df = _frame()
+    bulk_loader._prepare_chunk(df, int_columns={"Days Missing"})
+    assert pd.api.types.is_float_dtype(df["Days Missing"])
+
+
+def test_sqlite_falls_back_to_executemany_in_chunks(db):
+    assert not bulk_loader.supports_copy(db)
+    result = bulk_loader.bulk_insert_dataframe(db, _frame(), "raw_missing_pages", chunk_size=2,
+                                               int_columns={"Days Missing"})
+    db.commit()
+
+    assert result["method"] == "executemany"
+    assert result["rows"] == 3
+    rows = db.execute(text('SELECT subject_id, "Days Missing", score FROM raw_missing_pages')).fetchall()
+    assert [tuple(r) for r in rows] == [("1001", 3, 1.5), ("1002", None, 2.0), (None, 12, None)]
+
+
+def test_empty_frame_is_skipped(db):
+    result = bulk_loader.bulk_insert_dataframe(db, _frame().iloc[0:0], "raw_missing_pages")
+    assert result["method"] == "skipped" and result["rows"] == 0
+
+
+class _CopyCursor:
+    """ Records what COPY FROM STDIN would receive (psycopg2 cursor.copy_expert) """
+
+    def __init__(self, calls):
+        self.calls = calls
+
+    def copy_expert(self, sql, buffer):
+        self.calls.append((sql, buffer.read()))
+
+    def close(self):
+        pass
+
+
+def test_copy_writes_one_csv_buffer_per_chunk_with_integer_counts(monkeypatch):
+    calls = []
+    connection = type("Connection", (), {"cursor": lambda self: _CopyCursor(calls)})()
+    monkeypatch.setattr(bulk_loader, "_raw_connection", lambda db: connection)
+
+    bulk_loader._copy_chunks(None, _frame(), "raw_missing_pages", 2, {"Days Missing"})
+
+    assert len(calls) == 2
+    sql = calls[0][0]
+    assert sql == ('COPY "raw_missing_pages" ("subject_id", "Days Missing", "score") '
+                   "FROM STDIN WITH (FORMAT csv, NULL '')")
+    assert calls[0][1].splitlines() == ["1001,3,1.5", "1002,,2.0"]
+    assert calls[1][1].splitlines() == [",12,"]
@@ -0,0 +1,31 @@
+# backend/tests/test_detect_dataset.py
+import pytest
+
+pytest.importorskip("pandas")
+pytest.importorskip("numpy")
+pytest.importorskip("openpyxl")
+pytest.importorskip("thefuzz")
+pytest.importorskip("dotenv")
+
+from backend.app.utils.dataset_registry import DATASET_SPECS
+from backend.app.utils.detect_dataset import classify_sheet, HINT_WEIGHT, AMBIGUITY_MARGIN
+from backend.scripts.generate_synthetic_data import generate_dataset, SHEET_NAMES
+
+
+def test_hint_can_settle_a_tie():
+    assert HINT_WEIGHT > AMBIGUITY_MARGIN
+
+
+@pytest.mark.parametrize("variant", range(4))
+@pytest.mark.parametrize("dataset_key", sorted(DATASET_SPECS))
+def test_generated_sheets_classify_to_their_own_dataset(dataset_key, variant):
+    # Variants rotate the vendor header aliases, like the benchmark files do
+    _, header, _, _ = generate_dataset(dataset_key, rows=50, variant=variant)
+    result = classify_sheet(header, SHEET_NAMES[dataset_key])
+    assert result["dataset"] == dataset_key, result
+    assert not result["ambiguous"]
+
+
+def test_unrecognized_headers_are_not_guessed():
+    result = classify_sheet(["Foo", "Bar", "Baz"], "Cover")
+    assert result == {"dataset": None, "confidence": 0.0, "ambiguous": False, "candidates": []}
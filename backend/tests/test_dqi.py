@@ -0,0 +1,49 @@
+# backend/tests/test_dqi.py
+import datetime
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("dotenv")
+
+from backend.app.utils import dqi
+
+
+def _row(site_id, visit, query, safety, coding, **counts):
+    row = {"site_id": site_id, "visit_score": visit, "query_score": query,
+           "safety_score": safety, "coding_score": coding}
+    row.update({key: counts.get(key, 0) for key in dqi.COUNTS})
+    return row
+
+
+def test_score_rows_weights_components_and_sorts_lowest_first():
+    rows = [
+        _row("Site A", 100, 100, 100, 100, subjects=3),
+        _row("Site B", 50.04, 75, 80, 66.666, subjects=2, deviations=5, open_saes=1, missing_pages=7),
+    ]
+    scored = dqi.score_rows(rows)
+
+    assert [s["site_id"] for s in scored] == ["Site B", "Site A"]
+    site_b, site_a = scored
+    assert site_a["dqi"] == 100
+    assert site_b["components"] == {"visit": 50.0, "query": 75.0, "safety": 80.0, "coding": 66.7}
+    expected = sum(site_b["components"][name] * dqi.DQI_WEIGHTS[name] for name in dqi.COMPONENTS)
+    assert site_b["dqi"] == round(expected)
+    assert site_b["counts"]["deviations"] == 5
+    assert site_b["counts"]["missing_pages"] == 7
+    assert set(site_b["counts"]) == set(dqi.COUNTS)
+
+
+def test_weights_are_normalized():
+    assert sum(dqi.DQI_WEIGHTS.values()) == pytest.approx(1.0)
+
+
+def test_build_sql_site_filter_and_window_params():
+    sql, params = dqi.build_sql()
+    assert ":sites" not in sql and params == {}
+
+    sql, params = dqi.build_sql(sites=True)
+    assert ":sites" in sql
+
+    sql, params = dqi.build_sql(date_from=datetime.date(2024, 1, 1))
+    assert params == {"date_from": datetime.date(2024, 1, 1)}
+    assert ":date_from" in sql
@@ -0,0 +1,29 @@
+# backend/tests/test_excel_loader.py
+import io
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("dotenv")
+
+from backend.app.utils.excel_loader import SpreadsheetSource
+
+CSV = b"\nSubject,Site\n1001,A\n\n1002,B\n1003,C\n"
+
+
+def _rows(chunks):
+    return [list(row) for chunk in chunks for row in chunk.itertuples(index=False, name=None)]
+
+
+def test_chunks_skip_logical_rows_past_a_leading_blank_line():
+    source = SpreadsheetSource(io.BytesIO(CSV), "visits.csv")
+    assert list(source.preview("Sheet1").iloc[0]) == ["Subject", "Site"]
+
+    # header_idx 0 in the preview -> skip one row, not one physical line
+    assert _rows(source.iter_chunks(skiprows=1)) == [["1001", "A"], ["1002", "B"], ["1003", "C"]]
+
+
+def test_skipped_rows_can_span_several_chunks():
+    source = SpreadsheetSource(io.BytesIO(CSV), "visits.csv")
+    chunks = list(source.iter_chunks(skiprows=3, chunksize=2))
+    assert _rows(chunks) == [["1003", "C"]]
+    assert all(len(chunk) for chunk in chunks)
@@ -0,0 +1,65 @@
+# backend/tests/test_ingest_ledger.py
+import pytest
+
+pytest.importorskip("pandas")
+sqlalchemy = pytest.importorskip("sqlalchemy")
+pytest.importorskip("dotenv")
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+from backend.app.utils import ingest_ledger
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("""
+            CREATE TABLE ingest_ledger (
+                id INTEGER PRIMARY KEY, scope TEXT, content_hash TEXT, study_name TEXT, filename TEXT,
+                sheet_name TEXT, dataset_key TEXT, row_count INTEGER, load_id TEXT, target_table TEXT,
+                mode TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """))
+        conn.execute(text("CREATE TABLE raw_missing_pages (id INTEGER PRIMARY KEY, subject_id TEXT, load_id TEXT)"))
+    session = Session(engine)
+    yield session
+    session.close()
+
+
+def _load(db, load_id, filename, subjects, sheet="Missing Pages"):
+    ingest_ledger.record_entry(db, ingest_ledger.SHEET_SCOPE, f"hash-{load_id}", "Study 1", filename,
+                               sheet_name=sheet, dataset_key="raw_missing_pages", row_count=len(subjects),
+                               load_id=load_id, target_table="raw_missing_pages", mode="append")
+    for subject in subjects:
+        db.execute(text("INSERT INTO raw_missing_pages (subject_id, load_id) VALUES (:s, :l)"),
+                   {"s": subject, "l": load_id})
+    db.commit()
+
+
+def test_replace_removes_only_earlier_loads_of_the_same_sheet(db):
+    _load(db, "a1", "tracker.xlsx", ["1001", "1001", "1002"])
+    _load(db, "a2", "tracker.xlsx", ["1003", None])
+    _load(db, "b1", "other.xlsx", ["2001"])
+    _load(db, "c1", "tracker.xlsx", ["3001"], sheet="Another Sheet")
+
+    touched = set()
+    removed = ingest_ledger.replace_previous_loads(db, "Study 1", "tracker.xlsx", "Missing Pages",
+                                                   "raw_missing_pages", touched)
+    db.commit()
+
+    assert removed == 5
+    assert touched == {"1001", "1002", "1003"}
+    left = db.execute(text("SELECT subject_id FROM raw_missing_pages ORDER BY subject_id")).scalars().all()
+    assert left == ["2001", "3001"]
+    ledger = db.execute(text("SELECT load_id FROM ingest_ledger ORDER BY load_id")).scalars().all()
+    assert ledger == ["b1", "c1"]
+
+
+def test_replace_without_previous_loads_is_a_no_op(db):
+    _load(db, "b1", "other.xlsx", ["2001"])
+    touched = set()
+    assert ingest_ledger.replace_previous_loads(db, "Study 1", "tracker.xlsx", "Missing Pages",
+                                                "raw_missing_pages", touched) == 0
+    assert touched == set()
+    assert db.execute(text("SELECT COUNT(*) FROM raw_missing_pages")).scalar() == 1
@@ -0,0 +1,47 @@
+# backend/tests/test_parse_dates.py
+import pytest
+
+pd = pytest.importorskip("pandas")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("thefuzz")
+pytest.importorskip("dotenv")
+
+from backend.app.utils.ingest_excel import _parse_dates
+
+
+def _dates(values):
+    return [None if pd.isna(v) else v.strftime("%Y-%m-%d") for v in _parse_dates(pd.Series(values, dtype=object))]
+
+
+def test_day_first_column_is_parsed_day_first_throughout():
+    assert _dates(["05/03/2024", "25/03/2024"]) == ["2024-03-05", "2024-03-25"]
+
+
+def test_month_first_column_is_parsed_month_first_throughout():
+    assert _dates(["05/03/2024", "12/31/2024"]) == ["2024-05-03", "2024-12-31"]
+
+
+def test_dotted_day_first_dates():
+    assert _dates(["01.02.2024", "31.12.2024"]) == ["2024-02-01", "2024-12-31"]
+
+
+def test_ambiguous_column_stays_unparsed():
+    assert _dates(["05/03/2024", "06/04/2024"]) == [None, None]
+
+
+def test_contradictory_column_stays_unparsed():
+    assert _dates(["25/03/2024", "03/25/2024"]) == [None, None]
+
+
+def test_unambiguous_formats_and_excel_serials():
+    assert _dates(["2024-01-05", "05-Jan-2024", "2024-01-05 13:45:00", 45292, "45292"]) == \
+        ["2024-01-05", "2024-01-05", "2024-01-05", "2024-01-01", "2024-01-01"]
+
+
+def test_bare_years_blanks_and_text_become_nat():
+    assert _dates(["2024", "", None, "not a date", "2024-13-45"]) == [None, None, None, None, None]
+
+
+def test_datetime_input_is_normalized_to_midnight():
+    series = pd.Series(pd.to_datetime(["2024-01-05 13:45:00"]))
+    assert _parse_dates(series).iloc[0] == pd.Timestamp("2024-01-05")
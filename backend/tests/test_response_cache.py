@@ -0,0 +1,130 @@
+# backend/tests/test_response_cache.py
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("dotenv")
+
+from fastapi import Request, Response
+from backend.app.utils import response_cache
+
+
+@pytest.fixture
+def versions(monkeypatch):
+    """ Study data versions as response_cache sees them (normally read from study_data_versions) """
+    current = {"Study 1": 3, "Study 2": 1}
+    monkeypatch.setattr(response_cache.data_versions, "current",
+                        lambda db, study=None: sum(current.values()) if study is None else current.get(study, 0))
+    response_cache.clear()
+    yield current
+    response_cache.clear()
+
+
+def _request(if_none_match: str = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/api/analytics/sites-list",
+                    "query_string": b"", "headers": headers})
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"sites": ["Site 1"], "call": self.calls}
+
+
+def _serve(compute, if_none_match=None, study="Study 1", params=None):
+    response = Response()
+    result = response_cache.serve(_request(if_none_match), response, None, "sites-list",
+                                  params or {"study": study}, compute, study=study)
+    return result, response
+
+
+def test_second_request_is_served_from_cache_with_the_same_etag(versions):
+    compute = Counter()
+    first, first_response = _serve(compute)
+    second, second_response = _serve(compute)
+
+    assert compute.calls == 1
+    assert first == second == {"sites": ["Site 1"], "call": 1}
+    etag = first_response.headers["ETag"]
+    assert etag.startswith('W/"') and etag == second_response.headers["ETag"]
+    assert first_response.headers["Cache-Control"] == "private, no-cache"
+
+
+def test_matching_if_none_match_gets_304_without_computing(versions):
+    compute = Counter()
+    _, response = _serve(compute)
+    etag = response.headers["ETag"]
+
+    not_modified, _ = _serve(compute, if_none_match=f'"other", {etag}')
+    assert isinstance(not_modified, Response)
+    assert not_modified.status_code == 304
+    assert not_modified.headers["ETag"] == etag
+    assert compute.calls == 1
+    assert response_cache.stats()["not_modified"] >= 1
+
+
+def test_new_data_version_changes_etag_and_recomputes(versions):
+    compute = Counter()
+    _, before = _serve(compute)
+    versions["Study 1"] += 1
+    result, after = _serve(compute, if_none_match=before.headers["ETag"])
+
+    assert compute.calls == 2
+    assert result["call"] == 2
+    assert after.headers["ETag"] != before.headers["ETag"]
+
+
+def test_other_studies_and_params_do_not_share_entries(versions):
+    compute = Counter()
+    _serve(compute, study="Study 1")
+    _serve(compute, study="Study 2")
+    _serve(compute, study="Study 1", params={"study": "Study 1", "date_from": "2024-01-01"})
+    assert compute.calls == 3
+
+
+def test_unknown_versions_bypass_the_cache(monkeypatch):
+    monkeypatch.setattr(response_cache.data_versions, "current", lambda db, study=None: None)
+    compute = Counter()
+    _, response = _serve(compute)
+    _serve(compute)
+    assert compute.calls == 2
+    assert "ETag" not in response.headers
+
+
+def test_degraded_payloads_are_not_cached_or_tagged(versions):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        response_cache.mark_degraded("DQI query failed")
+        return {"kpis": {"total_subjects": 0}}
+
+    first, response = _serve(compute)
+    second, _ = _serve(compute)
+
+    assert first == second == {"kpis": {"total_subjects": 0}}
+    assert len(calls) == 2
+    assert "ETag" not in response.headers
+    assert response_cache.stats()["degraded"] >= 2
+
+
+def test_marks_from_a_copied_context_reach_serve(versions):
+    import contextvars
+    from concurrent.futures import ThreadPoolExecutor
+
+    def compute():
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            pool.submit(contextvars.copy_context().run, response_cache.mark_degraded, "section failed").result()
+        return {"errors": {"kpis": "boom"}}
+
+    _, response = _serve(compute)
+    assert "ETag" not in response.headers
+    assert response_cache.stats()["entries"] == 0
+
+
+def test_mark_degraded_outside_serve_is_ignored():
+    response_cache.mark_degraded("no request in flight")
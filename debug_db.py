@@ -1,23 +1,25 @@
 from backend.app.core.database import SessionLocal
-from sqlalchemy import text, inspect
+from backend.app.core import schema_registry
+from sqlalchemy import text
 
 def debug_database():
     db = SessionLocal()
-    inspector = inspect(db.get_bind())
+    # One catalog pass for all tables instead of an inspector call per table
+    catalog = schema_registry.load(db.get_bind())
     
     print("\n" + "="*50)
     print("🔎 DATABASE DIAGNOSTIC REPORT")
     print("="*50)
 
     # 1. LIST ALL TABLES AND ROW COUNTS
-    tables = inspector.get_table_names()
+    tables = sorted(catalog.keys())
     print(f"\nFound {len(tables)} tables: {tables}")
 
     for table in tables:
         print(f"\n--- Table: {table} ---")
         
         # Get Columns
-        columns = [col['name'] for col in inspector.get_columns(table)]
+        columns = list(catalog[table].keys())
         print(f"   Columns: {columns}")
         
         # Get Row Count
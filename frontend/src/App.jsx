@@ -26,7 +26,7 @@ import ClarityChat from './components/ClarityChat';
 import DataSources from './components/DataSources'; // <--- Ensure this is imported
 import AIGovernance from './components/AIGovernance';
 
-import api from  "./api/client"
+import api, { waitForUploadJob } from  "./api/client"
 
 export default function App() {
   return (
@@ -71,19 +71,6 @@ function DashboardShell({ userRole, onLogout }) {
   const [selectedFiles, setSelectedFiles] = useState([]);
   const [uploadStudy, setUploadStudy] = useState(study);
 
-  // --- FETCH SENTINEL ALERTS ---
-  useEffect(() => {
-    async function scanRisks() {
-        try {
-            const res = await api.get(`/api/sentinel/alerts?study=${study}`);
-            setAlerts(res.data.alerts || []);
-        } catch (e) {
-            console.error("Sentinel Offline");
-        }
-    }
-    if (study) scanRisks();
-  }, [study]);
-
   // --- LOAD STUDIES ---
   useEffect(() => {
     async function loadStudies() {
@@ -102,12 +89,14 @@ function DashboardShell({ userRole, onLogout }) {
     loadStudies();
   }, []);
 
-  // --- FETCH METRICS ---
+  // --- FETCH METRICS + SENTINEL ALERTS (one round trip) ---
   const fetchData = async () => {
     setLoading(true);
     try {
-      const response = await api.get(`/api/analytics/dashboard-metrics?study=${study}`);
-      setMetrics(response.data);
+      const response = await api.get(`/api/analytics/bundle?study=${study}&sections=kpis,alerts`);
+      if (response.data.kpis) setMetrics(response.data.kpis);
+      if (response.data.alerts) setAlerts(response.data.alerts.alerts || []);
+      else console.error("Sentinel Offline");
     } catch (err) {
       console.error(err);
     } finally {
@@ -134,7 +123,8 @@ function DashboardShell({ userRole, onLogout }) {
     formData.append("study_name", uploadStudy); 
 
     try {
-        await api.post("/api/upload", formData);
+        const res = await api.post("/api/upload", formData);
+        await waitForUploadJob(res.data.job_id);
         setShowConfirm(false); 
         setSelectedFiles([]);
         alert("✅ Ingestion Complete!");
@@ -286,7 +276,7 @@ function DashboardShell({ userRole, onLogout }) {
                 placeholder="Select Study" data={availableStudies} value={study} onChange={setStudy}
                 searchable w={200} variant="filled" leftSection={<Search size={14} />}
               />
-              <FileButton onChange={onFileSelect} multiple accept=".csv,.xlsx">
+              <FileButton onChange={onFileSelect} multiple accept=".csv,.xlsx,.zip,.tar.gz,.tgz">
                 {(props) => <Button {...props} loading={isUploading} leftSection={<Upload size={16}/>}>Ingest Data</Button>}
               </FileButton>
             </Group>
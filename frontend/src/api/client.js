@@ -4,4 +4,15 @@ const api = axios.create({
   baseURL: import.meta.env.VITE_API_BASE_URL,
 });
 
+// Uploads are processed in the background: poll the job until it finishes
+export const waitForUploadJob = async (jobId, intervalMs = 1500) => {
+  while (true) {
+    const res = await api.get(`/api/upload/jobs/${jobId}`);
+    if (res.data.status === 'completed') {
+      return res.data;
+    }
+    await new Promise((resolve) => setTimeout(resolve, intervalMs));
+  }
+};
+
 export default api;
@@ -20,14 +20,15 @@ export default function CRAWorkspace({ study, handleDraftEmail, onViewSite }) {
     async function loadWorkspaceData() {
         setLoading(true);
         try {
-            // A. Fetch Real Sites (Simulating "My Assigned Sites" by taking top 3)
-            const siteRes = await api.get(`/api/analytics/sites-list?study=${study}`);
-            const allSites = siteRes.data || [];
+            // Sites + clusters in one round trip
+            const res = await api.get(`/api/analytics/bundle?study=${study}&sections=sites,clusters`);
+
+            // A. Real Sites (Simulating "My Assigned Sites" by taking top 3)
+            const allSites = res.data.sites || [];
             setMySites(allSites.slice(0, 3)); 
 
-            // B. Fetch Smart Clusters for this Study (Real Agentic Logic)
-            const clusterRes = await api.get(`/api/agent/cluster-queries?study=${study}`);
-            setClusters(clusterRes.data || []);
+            // B. Smart Clusters for this Study (Real Agentic Logic)
+            setClusters(res.data.clusters || []);
         } catch (e) {
             console.error("Workspace Load Error:", e);
         } finally {
@@ -4,7 +4,7 @@ import {
   Paper, FileButton, List, ThemeIcon, Notification
 } from '@mantine/core';
 import { IconUpload, IconFileSpreadsheet, IconCheck, IconX } from '@tabler/icons-react';
-import api from  "../api/client"
+import api, { waitForUploadJob } from  "../api/client"
 
 export default function UploadData() {
   // State for the selected study and files
@@ -43,8 +43,9 @@ export default function UploadData() {
         },
       });
 
-      // 3. Process Logs
-      const results = response.data.summary;
+      // 3. Wait for the background ingestion job, then process logs
+      const job = await waitForUploadJob(response.data.job_id);
+      const results = job.summary;
       const newLogs = results.map((res) => {
         if (res.status === 'processed') {
             // Check the details array for success messages
@@ -52,6 +53,8 @@ export default function UploadData() {
                  return res.details.join(", "); 
             }
             return `✅ ${res.file} processed successfully for ${res.study}`;
+        } else if (res.status === 'unchanged') {
+            return res.details.join(", ");
         } else {
             return `❌ ${res.file} failed: ${res.reason || res.details}`;
         }
@@ -90,7 +93,7 @@ export default function UploadData() {
 
         {/* 2. File Picker */}
         <Group align="flex-end" mb="lg">
-          <FileButton onChange={setFiles} accept=".csv,.xlsx,.xls" multiple>
+          <FileButton onChange={setFiles} accept=".csv,.xlsx,.xls,.zip,.tar.gz,.tgz" multiple>
             {(props) => (
               <Button {...props} leftSection={<IconFileSpreadsheet size={18} />} variant="default">
                 Select Files ({files.length})